@@ -1,7 +1,7 @@
 # data_pipeline.py
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
+from data.indicator_registry import compute_selected_indicators
 
 def simulate_data(start_date="2022-01-01", periods=1000, freq="H"):
     """
@@ -43,7 +43,7 @@ def preprocess_data(df):
     df.dropna(inplace=True)
     return df
 
-def compute_indicators(df):
+def compute_indicators(df, columns=None, engine="pandas", dtype=np.float64):
     """
     Compute a variety of technical indicators and add them to the DataFrame.
     Indicators include:
@@ -60,9 +60,22 @@ def compute_indicators(df):
       - Ichimoku Cloud components (Tenkan_Sen, Kijun_Sen, Senkou_Span_A, Senkou_Span_B)
       - Stochastic Oscillator (%K and %D)
 
+    Parameters:
+        df (DataFrame): Preprocessed price data with 'close', 'high', 'low', 'volume'.
+        columns (iterable, optional): Only compute these indicator columns (plus the
+                      intermediates they depend on). Selection always uses the array engine.
+        engine (str): "pandas" (reference implementation) or "numpy" (array engine driven
+                      by the indicator registry; no temporary columns, shared rolling windows).
+        dtype: Output float dtype for the "numpy" engine (np.float64 or np.float32).
+
     Returns:
         DataFrame: DataFrame with the new indicator columns.
     """
+    if engine == "numpy" or columns is not None:
+        return compute_selected_indicators(df, columns=columns, dtype=dtype)
+    if engine != "pandas":
+        raise ValueError("engine must be 'pandas' or 'numpy'.")
+
     # RSI (14)
     def compute_RSI(series, period=14):
         delta = series.diff()
@@ -150,6 +163,7 @@ def compute_indicators(df):
     return df
 
 def visualize_data(df):
+    import matplotlib.pyplot as plt
     plt.figure(figsize=(12, 6))
     plt.plot(df.index, df["close"], label="Close Price")
     plt.plot(df.index, df["SMA_10"], label="SMA 10")
@@ -163,7 +177,19 @@ def visualize_data(df):
     plt.tight_layout()
     plt.show()
 
-def save_final_data(df, filename="final_indicators.csv"):
+def save_final_data(df, filename="final_indicators.csv", store_dir=None, symbol="SIM"):
+    """
+    Save the final indicator data.
+
+    By default writes a CSV file. When `store_dir` is given, the data goes into the binary
+    columnar store instead (see data/indicator_store.py), partitioned by symbol and month,
+    so consumers can memory-map selected columns and time ranges.
+    """
+    if store_dir is not None:
+        from data.indicator_store import write_indicator_store
+        write_indicator_store(df, store_dir, symbol)
+        print(f"Final data with indicators saved to {store_dir}/{symbol}")
+        return
     df.to_csv(filename)
     print(f"Final data with indicators saved to {filename}")
 
@@ -0,0 +1,227 @@
+# indicator_kernels.py
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+# Indicator columns in the order data_pipeline.compute_indicators emits them.
+INDICATOR_COLUMNS = [
+    "RSI_14",
+    "MACD", "MACD_signal", "MACD_hist",
+    "ROC_14",
+    "SMA_10", "SMA_50",
+    "BB_Middle", "BB_Std", "BB_Upper", "BB_Lower",
+    "TR", "ATR_14",
+    "Rolling_Mean_20", "Rolling_STD_20",
+    "Z_Score_20",
+    "VWAP",
+    "+DI14", "-DI14", "ADX_14",
+    "Tenkan_Sen", "Kijun_Sen", "Senkou_Span_A", "Senkou_Span_B",
+    "Stoch_%K", "Stoch_%D",
+]
+
+def _leading_nan_count(values):
+    """
+    Number of leading NaNs in a 1-D array (indicators like DX start with a NaN run).
+    """
+    valid = ~np.isnan(values)
+    return int(valid.argmax()) if valid.any() else len(values)
+
+def rolling_sum(values, window, out=None):
+    """
+    Rolling sum over a 1-D array, NaN until the window is full (pandas' rolling().sum()).
+
+    Uses a float64 prefix sum, so each output costs O(1) regardless of the window.
+    Leading NaNs are skipped; NaNs inside the series are not supported.
+
+    Parameters:
+        values (np.array): Input series.
+        window (int): Window length.
+        out (np.array, optional): Output buffer to write into.
+
+    Returns:
+        np.array: Rolling sums.
+    """
+    n = len(values)
+    if out is None:
+        out = np.empty(n, dtype=np.float64)
+    start = _leading_nan_count(values)
+    out[:min(start + window - 1, n)] = np.nan
+    if n - start >= window:
+        csum = np.cumsum(values[start:], dtype=np.float64)
+        out[start + window - 1] = csum[window - 1]
+        np.subtract(csum[window:], csum[:-window], out=out[start + window:])
+    return out
+
+def rolling_mean(values, window, out=None):
+    """
+    Rolling mean, NaN until the window is full (pandas' rolling().mean()).
+    """
+    out = rolling_sum(values, window, out=out)
+    out /= window
+    return out
+
+def rolling_mean_std(values, window):
+    """
+    Rolling mean and sample standard deviation (ddof=1) sharing one pass of prefix sums.
+
+    Values are centred on their overall mean before summing to keep the variance
+    numerically stable on long price histories.
+
+    Returns:
+        tuple: (mean, std) arrays.
+    """
+    shift = float(np.nanmean(values)) if len(values) else 0.0
+    centred = values - shift
+    sum_1 = rolling_sum(centred, window)
+    np.square(centred, out=centred)
+    sum_2 = rolling_sum(centred, window)
+    mean = sum_1 / window
+    # var = (sum(x^2) - sum(x)^2 / n) / (n - 1)
+    np.multiply(sum_1, mean, out=sum_1)
+    np.subtract(sum_2, sum_1, out=sum_2)
+    np.maximum(sum_2, 0.0, out=sum_2)
+    sum_2 /= (window - 1)
+    std = np.sqrt(sum_2, out=sum_2)
+    mean += shift
+    return mean, std
+
+class RollingExtrema:
+    """
+    Streaming rolling max or min over several window lengths at once.
+
+    Keeps one monotonic deque of (position, value) candidates per window: each pushed
+    value evicts the candidates it dominates from the back and expired positions from
+    the front, so every push is amortised O(1) per window and the current extremum is
+    always at the front.
+    """
+    def __init__(self, windows, mode="max"):
+        if mode not in ("max", "min"):
+            raise ValueError("mode must be 'max' or 'min'.")
+        self.windows = tuple(windows)
+        self.mode = mode
+        self.count = 0
+        self._deques = [deque() for _ in self.windows]
+
+    def push(self, x):
+        """
+        Add the next value and return the extremum of each window (NaN until the window is full).
+
+        Returns:
+            tuple: One value per window, in the order given at construction.
+        """
+        i = self.count
+        self.count += 1
+        result = []
+        is_max = self.mode == "max"
+        for window, dq in zip(self.windows, self._deques):
+            if is_max:
+                while dq and dq[-1][1] <= x:
+                    dq.pop()
+            else:
+                while dq and dq[-1][1] >= x:
+                    dq.pop()
+            dq.append((i, x))
+            if dq[0][0] <= i - window:
+                dq.popleft()
+            result.append(dq[0][1] if self.count >= window else np.nan)
+        return tuple(result)
+
+def rolling_extrema(values, windows, mode="max", method="blocks"):
+    """
+    Rolling max or min of one array for several window lengths in linear time.
+
+    method="blocks" (default) uses the van Herk/Gil-Werman scheme: the array is cut into
+    blocks of the window length, per-block prefix and suffix extrema are taken with
+    np.maximum/np.minimum.accumulate, and each window is the extremum of one suffix and
+    one prefix value. That is O(n) per window independent of the window length and runs
+    entirely in NumPy. method="deque" feeds the array through RollingExtrema (the same
+    primitive the streaming engine uses) in a single pass over all windows.
+
+    NaNs inside the series are not supported.
+
+    Parameters:
+        values (np.array): Input series.
+        windows (iterable of int): Window lengths.
+        mode (str): "max" or "min".
+        method (str): "blocks" or "deque".
+
+    Returns:
+        dict: window -> array of rolling extrema (NaN until the window is full).
+    """
+    if mode not in ("max", "min"):
+        raise ValueError("mode must be 'max' or 'min'.")
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    if method == "deque":
+        tracker = RollingExtrema(windows, mode)
+        stacked = np.array([tracker.push(x) for x in values.tolist()], dtype=np.float64).reshape(n, -1)
+        return {w: stacked[:, j].copy() for j, w in enumerate(tracker.windows)}
+    if method != "blocks":
+        raise ValueError("method must be 'blocks' or 'deque'.")
+
+    accumulate = np.maximum.accumulate if mode == "max" else np.minimum.accumulate
+    combine = np.maximum if mode == "max" else np.minimum
+    pad_value = -np.inf if mode == "max" else np.inf
+    results = {}
+    for window in windows:
+        out = np.full(n, np.nan)
+        if n >= window:
+            n_blocks = -(-n // window)
+            padded = np.full(n_blocks * window, pad_value)
+            padded[:n] = values
+            blocks = padded.reshape(n_blocks, window)
+            prefix = accumulate(blocks, axis=1).ravel()
+            suffix = accumulate(blocks[:, ::-1], axis=1)[:, ::-1].ravel()
+            # Window ending at i covers [i - window + 1, i]: a suffix of one block and a prefix of the next.
+            combine(suffix[:n - window + 1], prefix[window - 1:n], out=out[window - 1:])
+        results[window] = out
+    return results
+
+def rolling_max(values, window):
+    """
+    Rolling maximum, NaN until the window is full (pandas' rolling().max()).
+    """
+    return rolling_extrema(values, (window,), mode="max")[window]
+
+def rolling_min(values, window):
+    """
+    Rolling minimum, NaN until the window is full (pandas' rolling().min()).
+    """
+    return rolling_extrema(values, (window,), mode="min")[window]
+
+def ewm_mean(values, span):
+    """
+    Exponential moving average equivalent to ewm(span=span, adjust=False).mean().
+
+    The recursion itself runs in pandas' compiled ewm kernel on a Series view of the array.
+    """
+    return pd.Series(values, copy=False).ewm(span=span, adjust=False).mean().to_numpy()
+
+def shift(values, periods):
+    """
+    Shift a 1-D array forward by `periods`, filling the head with NaN.
+    """
+    out = np.empty(len(values), dtype=np.float64)
+    out[:periods] = np.nan
+    out[periods:] = values[:len(values) - periods]
+    return out
+
+def grouped_cumsum(values, group_start):
+    """
+    Cumulative sum that restarts wherever `group_start` is True (rows must be grouped contiguously).
+
+    Parameters:
+        values (np.array): Input series.
+        group_start (np.array of bool): True on the first row of each group.
+
+    Returns:
+        np.array: Per-group running sums.
+    """
+    csum = np.cumsum(values, dtype=np.float64)
+    starts = np.flatnonzero(group_start)
+    # Running total just before each group starts, broadcast to every row of the group.
+    offsets = csum[starts] - values[starts]
+    group_id = np.cumsum(group_start) - 1
+    csum -= offsets[group_id]
+    return csum
@@ -0,0 +1,281 @@
+# indicator_registry.py
+import numpy as np
+
+from data.indicator_kernels import (
+    INDICATOR_COLUMNS, rolling_sum, rolling_mean, rolling_mean_std,
+    rolling_max, rolling_min, ewm_mean, shift, grouped_cumsum,
+)
+
+# Raw inputs every computation starts from (float64 arrays, plus the DatetimeIndex).
+SOURCE_NODES = ("close", "high", "low", "volume", "index")
+
+# name -> (dependencies, function(ctx) -> array). Names in INDICATOR_COLUMNS are output
+# columns; everything else is a shared intermediate that is computed at most once.
+INDICATOR_REGISTRY = {}
+
+def indicator(name, deps):
+    """
+    Decorator registering an indicator (or intermediate) node and the nodes it reads.
+    """
+    def register(func):
+        INDICATOR_REGISTRY[name] = (tuple(deps), func)
+        return func
+    return register
+
+# ------------------------------
+# Shared intermediates
+# ------------------------------
+@indicator("prev_close", deps=("close",))
+def _prev_close(ctx):
+    return shift(ctx["close"], 1)
+
+@indicator("prev_high", deps=("high",))
+def _prev_high(ctx):
+    return shift(ctx["high"], 1)
+
+@indicator("prev_low", deps=("low",))
+def _prev_low(ctx):
+    return shift(ctx["low"], 1)
+
+@indicator("delta", deps=("close", "prev_close"))
+def _delta(ctx):
+    delta = ctx["close"] - ctx["prev_close"]
+    delta[:1] = 0.0
+    return delta
+
+@indicator("EMA_12", deps=("close",))
+def _ema_12(ctx):
+    return ewm_mean(ctx["close"], 12)
+
+@indicator("EMA_26", deps=("close",))
+def _ema_26(ctx):
+    return ewm_mean(ctx["close"], 26)
+
+@indicator("MeanStd_20", deps=("close",))
+def _mean_std_20(ctx):
+    return rolling_mean_std(ctx["close"], 20)
+
+@indicator("TR14", deps=("TR",))
+def _tr14(ctx):
+    return rolling_sum(ctx["TR"], 14)
+
+@indicator("UpMove", deps=("high", "prev_high"))
+def _up_move(ctx):
+    return ctx["high"] - ctx["prev_high"]
+
+@indicator("DownMove", deps=("low", "prev_low"))
+def _down_move(ctx):
+    return ctx["prev_low"] - ctx["low"]
+
+@indicator("DX", deps=("+DI14", "-DI14"))
+def _dx(ctx):
+    plus_di, minus_di = ctx["+DI14"], ctx["-DI14"]
+    return 100 * (np.abs(plus_di - minus_di) / (plus_di + minus_di + 1e-9))
+
+for _window in (9, 14, 26, 52):
+    indicator(f"HH_{_window}", deps=("high",))(lambda ctx, w=_window: rolling_max(ctx["high"], w))
+    indicator(f"LL_{_window}", deps=("low",))(lambda ctx, w=_window: rolling_min(ctx["low"], w))
+
+# ------------------------------
+# Output columns
+# ------------------------------
+@indicator("RSI_14", deps=("delta",))
+def _rsi_14(ctx):
+    delta = ctx["delta"]
+    avg_gain = rolling_mean(np.maximum(delta, 0.0), 14)
+    avg_loss = rolling_mean(np.maximum(-delta, 0.0), 14)
+    return 100 - (100 / (1 + avg_gain / (avg_loss + 1e-9)))
+
+@indicator("MACD", deps=("EMA_12", "EMA_26"))
+def _macd(ctx):
+    return ctx["EMA_12"] - ctx["EMA_26"]
+
+@indicator("MACD_signal", deps=("MACD",))
+def _macd_signal(ctx):
+    return ewm_mean(ctx["MACD"], 9)
+
+@indicator("MACD_hist", deps=("MACD", "MACD_signal"))
+def _macd_hist(ctx):
+    return ctx["MACD"] - ctx["MACD_signal"]
+
+@indicator("ROC_14", deps=("close",))
+def _roc_14(ctx):
+    return (ctx["close"] / shift(ctx["close"], 14) - 1) * 100
+
+@indicator("SMA_10", deps=("close",))
+def _sma_10(ctx):
+    return rolling_mean(ctx["close"], 10)
+
+@indicator("SMA_50", deps=("close",))
+def _sma_50(ctx):
+    return rolling_mean(ctx["close"], 50)
+
+@indicator("BB_Middle", deps=("MeanStd_20",))
+def _bb_middle(ctx):
+    return ctx["MeanStd_20"][0]
+
+@indicator("BB_Std", deps=("MeanStd_20",))
+def _bb_std(ctx):
+    return ctx["MeanStd_20"][1]
+
+@indicator("BB_Upper", deps=("MeanStd_20",))
+def _bb_upper(ctx):
+    mean, std = ctx["MeanStd_20"]
+    return mean + 2 * std
+
+@indicator("BB_Lower", deps=("MeanStd_20",))
+def _bb_lower(ctx):
+    mean, std = ctx["MeanStd_20"]
+    return mean - 2 * std
+
+@indicator("TR", deps=("high", "low", "prev_close"))
+def _tr(ctx):
+    # The first bar has no previous close, so TR is just high - low.
+    high, low, prev_close = ctx["high"], ctx["low"], ctx["prev_close"]
+    has_prev = ~np.isnan(prev_close)
+    tr = high - low
+    np.maximum(tr, np.abs(high - prev_close), out=tr, where=has_prev)
+    np.maximum(tr, np.abs(low - prev_close), out=tr, where=has_prev)
+    return tr
+
+@indicator("ATR_14", deps=("TR14",))
+def _atr_14(ctx):
+    return ctx["TR14"] / 14
+
+@indicator("Rolling_Mean_20", deps=("MeanStd_20",))
+def _rolling_mean_20(ctx):
+    return ctx["MeanStd_20"][0]
+
+@indicator("Rolling_STD_20", deps=("MeanStd_20",))
+def _rolling_std_20(ctx):
+    return ctx["MeanStd_20"][1]
+
+@indicator("Z_Score_20", deps=("close", "MeanStd_20"))
+def _z_score_20(ctx):
+    mean, std = ctx["MeanStd_20"]
+    return (ctx["close"] - mean) / std
+
+@indicator("VWAP", deps=("high", "low", "close", "volume", "index"))
+def _vwap(ctx):
+    high, low, close, volume = ctx["high"], ctx["low"], ctx["close"], ctx["volume"]
+    day = ctx["index"].normalize().asi8
+    new_day = np.empty(len(day), dtype=bool)
+    new_day[:1] = True
+    np.not_equal(day[1:], day[:-1], out=new_day[1:])
+    tpv = ((high + low + close) / 3) * volume
+    return grouped_cumsum(tpv, new_day) / grouped_cumsum(volume, new_day)
+
+@indicator("+DI14", deps=("UpMove", "DownMove", "TR14"))
+def _plus_di14(ctx):
+    up_move, down_move = ctx["UpMove"], ctx["DownMove"]
+    plus_dm = np.where((up_move > down_move) & (up_move > 0), up_move, 0.0)
+    return 100 * (rolling_sum(plus_dm, 14) / (ctx["TR14"] + 1e-9))
+
+@indicator("-DI14", deps=("UpMove", "DownMove", "TR14"))
+def _minus_di14(ctx):
+    up_move, down_move = ctx["UpMove"], ctx["DownMove"]
+    minus_dm = np.where((down_move > up_move) & (down_move > 0), down_move, 0.0)
+    return 100 * (rolling_sum(minus_dm, 14) / (ctx["TR14"] + 1e-9))
+
+@indicator("ADX_14", deps=("DX",))
+def _adx_14(ctx):
+    return rolling_mean(ctx["DX"], 14)
+
+@indicator("Tenkan_Sen", deps=("HH_9", "LL_9"))
+def _tenkan_sen(ctx):
+    return (ctx["HH_9"] + ctx["LL_9"]) / 2
+
+@indicator("Kijun_Sen", deps=("HH_26", "LL_26"))
+def _kijun_sen(ctx):
+    return (ctx["HH_26"] + ctx["LL_26"]) / 2
+
+@indicator("Senkou_Span_A", deps=("Tenkan_Sen", "Kijun_Sen"))
+def _senkou_span_a(ctx):
+    return shift((ctx["Tenkan_Sen"] + ctx["Kijun_Sen"]) / 2, 26)
+
+@indicator("Senkou_Span_B", deps=("HH_52", "LL_52"))
+def _senkou_span_b(ctx):
+    return shift((ctx["HH_52"] + ctx["LL_52"]) / 2, 26)
+
+@indicator("Stoch_%K", deps=("close", "HH_14", "LL_14"))
+def _stoch_k(ctx):
+    lowest_low = ctx["LL_14"]
+    return 100 * ((ctx["close"] - lowest_low) / (ctx["HH_14"] - lowest_low + 1e-9))
+
+@indicator("Stoch_%D", deps=("Stoch_%K",))
+def _stoch_d(ctx):
+    return rolling_mean(ctx["Stoch_%K"], 3)
+
+# ------------------------------
+# Graph resolution and evaluation
+# ------------------------------
+def resolve_indicator_graph(columns):
+    """
+    Return the registry nodes needed for `columns`, in dependency (topological) order.
+
+    Parameters:
+        columns (iterable): Requested indicator column names.
+
+    Returns:
+        list: Node names to evaluate; every dependency precedes its consumers.
+    """
+    # Internal nodes (MeanStd_20, TR14, EMA_12, ...) are not output columns; some return tuples.
+    unknown = [c for c in columns if c not in INDICATOR_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown indicator(s) {unknown}. Available: {INDICATOR_COLUMNS}")
+    order, visited = [], set(SOURCE_NODES)
+
+    def visit(name):
+        if name in visited:
+            return
+        visited.add(name)
+        for dep in INDICATOR_REGISTRY[name][0]:
+            visit(dep)
+        order.append(name)
+
+    for column in columns:
+        visit(column)
+    return order
+
+def compute_selected_indicators(df, columns=None, dtype=np.float64):
+    """
+    Compute only the requested indicator columns (and the subgraph they depend on).
+
+    Each intermediate is evaluated once, shared by every consumer, and released as soon
+    as its last consumer has run. The requested columns are written into the DataFrame
+    in a single assignment.
+
+    Parameters:
+        df (DataFrame): Preprocessed price data with 'close', 'high', 'low', 'volume'.
+        columns (iterable, optional): Indicator columns to add; default is all of INDICATOR_COLUMNS.
+        dtype: Output float dtype (np.float64 or np.float32).
+
+    Returns:
+        DataFrame: The input DataFrame with the requested indicator columns added.
+    """
+    columns = list(INDICATOR_COLUMNS if columns is None else dict.fromkeys(columns))
+    order = resolve_indicator_graph(columns)
+    remaining = {}
+    for name in order:
+        for dep in INDICATOR_REGISTRY[name][0]:
+            remaining[dep] = remaining.get(dep, 0) + 1
+
+    ctx = {c: np.ascontiguousarray(df[c].to_numpy(dtype=np.float64)) for c in SOURCE_NODES[:-1]}
+    ctx["index"] = df.index
+    # Column-major block: each indicator column is contiguous in memory.
+    out = np.empty((len(df), len(columns)), dtype=dtype, order="F")
+    position = {name: j for j, name in enumerate(columns)}
+    for name in order:
+        deps, func = INDICATOR_REGISTRY[name]
+        ctx[name] = func(ctx)
+        if name in position:
+            out[:, position[name]] = ctx[name]
+        if name not in remaining:
+            del ctx[name]
+        for dep in deps:
+            remaining[dep] -= 1
+            if remaining[dep] == 0 and dep not in SOURCE_NODES:
+                del ctx[dep]
+
+    df[columns] = out
+    return df
@@ -0,0 +1,168 @@
+# indicator_store.py
+import json
+import os
+import shutil
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+
+# Layout:
+#   <root>/<symbol>/_index.json            schema (columns, dtypes) + partition list
+#   <root>/<symbol>/<YYYY-MM>/__index__.npy int64 nanosecond timestamps
+#   <root>/<symbol>/<YYYY-MM>/<column>.npy  one raw array per column
+INDEX_FILE = "_index.json"
+TIMESTAMP_FILE = "__index__.npy"
+
+def _column_file(column):
+    # Column names such as "+DI14" or "Stoch_%K" are percent-encoded into safe file names.
+    return quote(column, safe="") + ".npy"
+
+def _read_meta(symbol_dir):
+    path = os.path.join(symbol_dir, INDEX_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def _write_meta(symbol_dir, meta):
+    path = os.path.join(symbol_dir, INDEX_FILE)
+    with open(path + ".tmp", "w") as f:
+        json.dump(meta, f, indent=1)
+    os.replace(path + ".tmp", path)
+
+def _write_partition(part_dir, timestamps, df):
+    tmp_dir = part_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    np.save(os.path.join(tmp_dir, TIMESTAMP_FILE), timestamps)
+    for column in df.columns:
+        np.save(os.path.join(tmp_dir, _column_file(column)), np.ascontiguousarray(df[column].to_numpy()))
+    shutil.rmtree(part_dir, ignore_errors=True)
+    os.replace(tmp_dir, part_dir)
+
+def write_indicator_store(df, root, symbol):
+    """
+    Write an indicator DataFrame into the columnar store, partitioned by symbol and month.
+
+    Each partition holds one raw .npy file per column plus the timestamps, so readers can
+    memory-map just the columns they need. Rows for timestamps already stored are
+    replaced; other partitions are left untouched.
+
+    Parameters:
+        df (DataFrame): Numeric columns with a (tz-naive) datetime index.
+        root (str): Store root directory.
+        symbol (str): Ticker symbol.
+
+    Returns:
+        dict: The updated symbol metadata index.
+    """
+    df = df.sort_index()
+    df = df[~df.index.duplicated(keep="last")]
+    symbol_dir = os.path.join(root, symbol)
+    os.makedirs(symbol_dir, exist_ok=True)
+    meta = _read_meta(symbol_dir)
+    dtypes = {c: df[c].dtype.str for c in df.columns}
+    if meta is None:
+        meta = {"symbol": symbol, "columns": list(df.columns), "dtypes": dtypes, "partitions": {}}
+    elif meta["columns"] != list(df.columns):
+        raise ValueError(f"Column mismatch for {symbol}: store has {meta['columns']}, got {list(df.columns)}")
+
+    months = df.index.to_period("M").astype(str)
+    for key, part in df.groupby(months, sort=True):
+        part_dir = os.path.join(symbol_dir, key)
+        if key in meta["partitions"]:
+            existing = load_indicator_frame(root, symbol, start=part.index[0].to_period("M").start_time,
+                                            end=part.index[0].to_period("M").end_time)
+            part = pd.concat([existing, part])
+            part = part[~part.index.duplicated(keep="last")].sort_index()
+        timestamps = part.index.asi8.astype(np.int64)
+        _write_partition(part_dir, timestamps, part)
+        meta["partitions"][key] = {"start": int(timestamps[0]), "end": int(timestamps[-1]), "rows": len(part)}
+    meta["partitions"] = dict(sorted(meta["partitions"].items()))
+    _write_meta(symbol_dir, meta)
+    return meta
+
+def list_store_symbols(root):
+    """
+    Return the symbols present in the store.
+    """
+    if not os.path.isdir(root):
+        return []
+    return sorted(s for s in os.listdir(root) if os.path.exists(os.path.join(root, s, INDEX_FILE)))
+
+def load_indicator_columns(root, symbol, columns=None, start=None, end=None):
+    """
+    Memory-map selected columns of one symbol over an optional time range.
+
+    Only the partitions overlapping [start, end] are opened, and only the requested
+    column files are mapped. When the range falls inside a single partition the
+    returned arrays are read-only views of the memory-mapped files (zero-copy, and
+    shared between processes through the OS page cache); ranges spanning several
+    partitions are concatenated into new arrays.
+
+    Parameters:
+        root (str): Store root directory.
+        symbol (str): Ticker symbol.
+        columns (list, optional): Columns to load; default is all stored columns.
+        start, end (optional): Inclusive time bounds (anything pd.Timestamp accepts).
+
+    Returns:
+        tuple: (timestamps as datetime64[ns] array, dict of column -> array)
+    """
+    symbol_dir = os.path.join(root, symbol)
+    meta = _read_meta(symbol_dir)
+    if meta is None:
+        raise FileNotFoundError(f"No stored data for {symbol} under {root}")
+    columns = meta["columns"] if columns is None else list(columns)
+    missing = [c for c in columns if c not in meta["columns"]]
+    if missing:
+        raise KeyError(f"Columns not in store for {symbol}: {missing}")
+    lo = pd.Timestamp(start).value if start is not None else np.iinfo(np.int64).min
+    hi = pd.Timestamp(end).value if end is not None else np.iinfo(np.int64).max
+
+    index_parts, column_parts = [], {c: [] for c in columns}
+    for key, info in meta["partitions"].items():
+        if info["end"] < lo or info["start"] > hi:
+            continue
+        part_dir = os.path.join(symbol_dir, key)
+        timestamps = np.load(os.path.join(part_dir, TIMESTAMP_FILE), mmap_mode="r")
+        i0 = int(np.searchsorted(timestamps, lo, side="left"))
+        i1 = int(np.searchsorted(timestamps, hi, side="right"))
+        if i0 >= i1:
+            continue
+        index_parts.append(timestamps[i0:i1])
+        for column in columns:
+            values = np.load(os.path.join(part_dir, _column_file(column)), mmap_mode="r")
+            column_parts[column].append(values[i0:i1])
+
+    def join(parts, dtype):
+        if not parts:
+            return np.empty(0, dtype=dtype)
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    timestamps = join(index_parts, np.int64).view("datetime64[ns]")
+    arrays = {c: join(column_parts[c], np.dtype(meta["dtypes"][c])) for c in columns}
+    return timestamps, arrays
+
+def load_indicator_frame(root, symbol, columns=None, start=None, end=None):
+    """
+    Load selected columns and a time range of one symbol as a DataFrame.
+
+    Convenience wrapper over load_indicator_columns; building the DataFrame copies the
+    selected data out of the memory map.
+    """
+    timestamps, arrays = load_indicator_columns(root, symbol, columns=columns, start=start, end=end)
+    return pd.DataFrame(arrays, index=pd.DatetimeIndex(timestamps))
+
+if __name__ == "__main__":
+    # Example usage: store the simulated indicator frame and load two columns back.
+    import tempfile
+    from data.data_pipeline import simulate_data, preprocess_data, compute_indicators
+
+    df = compute_indicators(preprocess_data(simulate_data(periods=2000)), engine="numpy")
+    root = tempfile.mkdtemp()
+    meta = write_indicator_store(df, root, "SIM")
+    print("Partitions:", list(meta["partitions"]))
+    ts, cols = load_indicator_columns(root, "SIM", columns=["close", "RSI_14"], start="2022-02-01", end="2022-02-28 23:00")
+    print("Loaded", len(ts), "rows; memory-mapped:", isinstance(cols["close"], np.memmap))
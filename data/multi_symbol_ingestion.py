@@ -0,0 +1,238 @@
+# multi_symbol_ingestion.py
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from data.realtime_data_pipeline import (
+    ALPHA_VANTAGE_URL, fetch_alpha_vantage_data, fetch_alpha_vantage_data_incremental,
+    preprocess_stock_data, compute_technical_indicators,
+)
+
+# Alpha Vantage throttling notes are a few hundred bytes; larger bodies are never parsed for them.
+THROTTLE_BODY_LIMIT = 2048
+
+class TokenBucket:
+    """
+    Thread-safe token bucket enforcing a calls-per-minute budget.
+
+    Tokens refill continuously at calls_per_minute / 60 per second up to `burst`;
+    acquire() blocks until a token is available.
+    """
+    def __init__(self, calls_per_minute, burst=None, clock=time.monotonic, sleep=time.sleep):
+        """
+        Parameters:
+            calls_per_minute (float): Sustained request budget.
+            burst (int, optional): Bucket capacity (defaults to 1, i.e. evenly spaced calls).
+            clock (callable): Monotonic time source in seconds (injectable for testing).
+            sleep (callable): Sleep function (injectable for testing).
+        """
+        if calls_per_minute <= 0:
+            raise ValueError("calls_per_minute must be positive.")
+        self.rate = calls_per_minute / 60.0
+        self.capacity = float(burst if burst is not None else 1)
+        self.tokens = self.capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Take one token, blocking until the budget allows it.
+        """
+        while True:
+            with self.lock:
+                now = self.clock()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return
+                wait = (1.0 - self.tokens) / self.rate
+            self.sleep(wait)
+
+class RateLimitedSession(requests.Session):
+    """
+    requests.Session with pooled keep-alive connections, a shared token bucket and retries.
+
+    Every request (including retries) takes a token from the bucket. Network errors and
+    timeouts, HTTP 429/5xx responses and Alpha Vantage throttling notes ("Note"/"Information"
+    payloads) are retried with exponential backoff and jitter.
+    """
+    def __init__(self, bucket, pool_size=10, max_retries=3, backoff=1.0, timeout=30, sleep=None):
+        """
+        Parameters:
+            bucket (TokenBucket): Shared rate limiter.
+            pool_size (int): Maximum number of pooled connections per host.
+            max_retries (int): Retries after the first attempt.
+            backoff (float): Base backoff in seconds (doubled on every retry).
+            timeout (float): Per-request timeout in seconds.
+            sleep (callable, optional): Sleep function for backoff (default: the bucket's).
+        """
+        super(RateLimitedSession, self).__init__()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.mount("http://", adapter)
+        self.mount("https://", adapter)
+        self.bucket = bucket
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.sleep = sleep if sleep is not None else bucket.sleep
+
+    @staticmethod
+    def _is_throttled(response):
+        if response.status_code == 429 or response.status_code >= 500:
+            return True
+        if len(response.content) > THROTTLE_BODY_LIMIT:
+            return False
+        try:
+            payload = response.json()
+        except ValueError:
+            return False
+        return isinstance(payload, dict) and len(payload) == 1 and ("Note" in payload or "Information" in payload)
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            try:
+                response = super(RateLimitedSession, self).request(method, url, **kwargs)
+                if not self._is_throttled(response):
+                    return response
+                error = f"HTTP {response.status_code}: {response.text[:200]}"
+            except requests.RequestException as e:
+                error = e
+            if attempt == self.max_retries:
+                break
+            self.sleep(self.backoff * (2 ** attempt) * (1 + random.random()))
+        raise RuntimeError(f"Request to {url} failed after {self.max_retries + 1} attempts: {error}")
+
+def run_multi_symbol_pipeline(api_key, symbols, calls_per_minute=75, max_workers=8, columns=("SMA_10", "RSI_14"),
+                              interval="60min", outputsize="full", cache_dir=None, max_retries=3, backoff=1.0,
+                              base_url=ALPHA_VANTAGE_URL, raise_errors=False):
+    """
+    Fetch, preprocess and compute indicators for many symbols concurrently.
+
+    Requests run on a thread pool over one RateLimitedSession, so they share pooled
+    keep-alive connections and a single calls-per-minute budget. Processed frames are
+    yielded as soon as each symbol completes (not in input order).
+
+    Parameters:
+        api_key (str): Your Alpha Vantage API key.
+        symbols (iterable): Ticker symbols.
+        calls_per_minute (float): API budget shared by all workers.
+        max_workers (int): Number of concurrent fetches.
+        columns (iterable): Indicator columns to compute (see compute_technical_indicators).
+        interval (str): Data interval; for 1-hour data, use "60min".
+        outputsize (str): "full" or "compact" (ignored when cache_dir is given).
+        cache_dir (str, optional): Use the incremental local bar cache in this directory.
+        max_retries (int): Retries per request.
+        backoff (float): Base retry backoff in seconds.
+        base_url (str): Query endpoint (override to point at a local stub).
+        raise_errors (bool): Re-raise the first failure instead of reporting and skipping it.
+
+    Yields:
+        tuple: (symbol, DataFrame) for each symbol that was processed successfully.
+    """
+    symbols = list(dict.fromkeys(symbols))
+    bucket = TokenBucket(calls_per_minute)
+    session = RateLimitedSession(bucket, pool_size=max_workers, max_retries=max_retries, backoff=backoff)
+
+    def process(symbol):
+        if cache_dir is not None:
+            df_raw = fetch_alpha_vantage_data_incremental(api_key, symbol, cache_dir=cache_dir, interval=interval,
+                                                          session=session, base_url=base_url)
+        else:
+            df_raw = fetch_alpha_vantage_data(api_key, symbol, interval=interval, outputsize=outputsize,
+                                              session=session, base_url=base_url)
+        return compute_technical_indicators(preprocess_stock_data(df_raw), columns=columns)
+
+    failures = []
+    with session, ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(process, symbol): symbol for symbol in symbols}
+        for future in as_completed(futures):
+            symbol = futures[future]
+            try:
+                df = future.result()
+            except Exception as e:
+                if raise_errors:
+                    for pending in futures:
+                        pending.cancel()
+                    raise
+                print(f"Error processing {symbol}: {e}")
+                failures.append(symbol)
+                continue
+            yield symbol, df
+    if failures:
+        print(f"Failed symbols ({len(failures)}): {', '.join(failures)}")
+
+def serve_alpha_vantage_stub(bars=200, interval="60min", throttle_every=0, host="127.0.0.1", port=0):
+    """
+    Serve synthetic TIME_SERIES_INTRADAY responses on a local HTTP server, so the
+    pipeline can be exercised offline (pass the returned URL as base_url).
+
+    Every symbol gets a deterministic random-walk series of `bars` bars. With
+    throttle_every=n, every n-th request is answered with an Alpha Vantage "Note"
+    throttling payload instead.
+
+    Returns:
+        tuple: (server, base_url); call server.shutdown() when done.
+    """
+    counter = {"requests": 0}
+    lock = threading.Lock()
+
+    def payload(symbol):
+        rng = random.Random(symbol)
+        close, series = 100.0, {}
+        start = time.mktime((2024, 1, 2, 4, 0, 0, 0, 0, -1))
+        step = int(interval.replace("min", "")) * 60
+        for i in range(bars):
+            open_ = close
+            close = max(open_ * (1 + rng.gauss(0, 0.01)), 0.01)
+            stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(start + i * step))
+            series[stamp] = {"1. open": f"{open_:.4f}", "2. high": f"{max(open_, close) * 1.002:.4f}",
+                             "3. low": f"{min(open_, close) * 0.998:.4f}", "4. close": f"{close:.4f}",
+                             "5. volume": str(rng.randint(1000, 100000))}
+        return {"Meta Data": {"2. Symbol": symbol, "4. Interval": interval}, f"Time Series ({interval})": series}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            with lock:
+                counter["requests"] += 1
+                throttled = throttle_every and counter["requests"] % throttle_every == 0
+            query = parse_qs(urlparse(self.path).query)
+            if throttled:
+                body = {"Note": "Thank you for using Alpha Vantage! Please slow down."}
+            else:
+                body = payload(query.get("symbol", ["DEMO"])[0])
+            data = json.dumps(body).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.requests = counter
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/query"
+
+if __name__ == "__main__":
+    # Example usage: run offline against the local stub (every 2nd request throttled).
+    # For live data drop base_url and pass your Alpha Vantage API key.
+    server, base_url = serve_alpha_vantage_stub(throttle_every=2)
+    for symbol, df in run_multi_symbol_pipeline("demo", ["AAPL", "MSFT", "NVDA"], calls_per_minute=600,
+                                                max_workers=3, backoff=0.1, base_url=base_url):
+        print(f"{symbol}: {len(df)} rows, last close {df['close'].iloc[-1]:.2f}")
+    print(f"{server.requests['requests']} requests served")
+    server.shutdown()
@@ -1,10 +1,16 @@
 # realtime_data_pipeline.py
+import os
 import requests
 import pandas as pd
 import numpy as np
 from datetime import datetime
+from data.indicator_registry import compute_selected_indicators
+from data.streaming_indicators import StreamingIndicatorEngine
 
-def fetch_alpha_vantage_data(api_key, symbol, function="TIME_SERIES_INTRADAY", interval="60min", outputsize="full"):
+ALPHA_VANTAGE_URL = "https://www.alphavantage.co/query"
+
+def fetch_alpha_vantage_data(api_key, symbol, function="TIME_SERIES_INTRADAY", interval="60min", outputsize="full",
+                             session=None, base_url=ALPHA_VANTAGE_URL):
     """
     Fetch intraday stock data from Alpha Vantage.
     
@@ -14,11 +20,12 @@ def fetch_alpha_vantage_data(api_key, symbol, function="TIME_SERIES_INTRADAY", i
         function (str): API function; default is "TIME_SERIES_INTRADAY".
         interval (str): Data interval; for 1-hour data, use "60min".
         outputsize (str): "full" for all data, "compact" for the latest 100 data points.
+        session (requests.Session, optional): Session to reuse pooled connections.
+        base_url (str): Query endpoint (override to point at a local stub).
     
     Returns:
         DataFrame: Stock data with a datetime index.
     """
-    url = "https://www.alphavantage.co/query"
     params = {
         "function": function,
         "symbol": symbol,
@@ -27,9 +34,21 @@ def fetch_alpha_vantage_data(api_key, symbol, function="TIME_SERIES_INTRADAY", i
         "outputsize": outputsize,
         "datatype": "json"
     }
-    response = requests.get(url, params=params)
+    response = (session or requests).get(base_url, params=params)
     data = response.json()
-    
+    return parse_alpha_vantage_time_series(data, interval)
+
+def parse_alpha_vantage_time_series(data, interval="60min"):
+    """
+    Convert an Alpha Vantage intraday JSON payload into an OHLCV DataFrame.
+
+    Parameters:
+        data (dict): Decoded JSON response.
+        interval (str): Data interval used in the request (e.g., "60min").
+
+    Returns:
+        DataFrame: Stock data with a sorted datetime index.
+    """
     # For intraday data, the key is formatted like "Time Series (60min)"
     ts_key = f"Time Series ({interval})"
     if ts_key not in data:
@@ -48,6 +67,83 @@ def fetch_alpha_vantage_data(api_key, symbol, function="TIME_SERIES_INTRADAY", i
     df.sort_index(inplace=True)
     return df
 
+def _bar_cache_path(cache_dir, symbol, interval):
+    return os.path.join(cache_dir, f"{symbol}_{interval}.pkl")
+
+def load_cached_bars(symbol, cache_dir="data/bar_cache", interval="60min"):
+    """
+    Load the locally stored raw bars for a symbol, or None if there is no cache yet.
+    """
+    path = _bar_cache_path(cache_dir, symbol, interval)
+    if not os.path.exists(path):
+        return None
+    return pd.read_pickle(path)
+
+def save_cached_bars(df, symbol, cache_dir="data/bar_cache", interval="60min"):
+    """
+    Store raw bars for a symbol in the local bar cache (binary pickle, one file per symbol).
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    path = _bar_cache_path(cache_dir, symbol, interval)
+    tmp_path = path + ".tmp"
+    df.to_pickle(tmp_path)
+    os.replace(tmp_path, path)
+
+def merge_bars(cached, new_bars):
+    """
+    Merge newly fetched bars into the cached history by timestamp.
+
+    Bars present in both keep the newly fetched values (the latest bar may have been
+    revised since it was cached).
+
+    Returns:
+        DataFrame: Deduplicated bars sorted by timestamp.
+    """
+    merged = pd.concat([cached, new_bars])
+    merged = merged[~merged.index.duplicated(keep="last")]
+    merged.sort_index(inplace=True)
+    return merged
+
+def fetch_alpha_vantage_data_incremental(api_key, symbol, cache_dir="data/bar_cache", interval="60min",
+                                         function="TIME_SERIES_INTRADAY", session=None, base_url=ALPHA_VANTAGE_URL):
+    """
+    Fetch intraday bars using a local per-symbol bar cache.
+
+    - Cold start (no cache): request the full history and store it.
+    - Warm cache: request only the "compact" output (latest 100 bars) and merge it
+      into the cache by timestamp.
+    - Gap detected (the compact window does not reach back to the last cached bar,
+      so bars in between would be missing): fall back to the full history.
+
+    Parameters:
+        api_key (str): Your Alpha Vantage API key.
+        symbol (str): Stock ticker symbol.
+        cache_dir (str): Directory of the local bar store.
+        interval (str): Data interval; for 1-hour data, use "60min".
+        function (str): API function; default is "TIME_SERIES_INTRADAY".
+        session (requests.Session, optional): Session to reuse pooled connections.
+        base_url (str): Query endpoint (override to point at a local stub).
+
+    Returns:
+        DataFrame: Full raw bar history for the symbol with a datetime index.
+    """
+    request_kwargs = {"function": function, "interval": interval, "session": session, "base_url": base_url}
+    cached = load_cached_bars(symbol, cache_dir, interval)
+    if cached is None or cached.empty:
+        print(f"No cached bars for {symbol}; fetching full history")
+        bars = fetch_alpha_vantage_data(api_key, symbol, outputsize="full", **request_kwargs)
+    else:
+        latest = fetch_alpha_vantage_data(api_key, symbol, outputsize="compact", **request_kwargs)
+        if latest.empty or latest.index.min() > cached.index.max():
+            print(f"Gap between cached bars and latest data for {symbol}; fetching full history")
+            full = fetch_alpha_vantage_data(api_key, symbol, outputsize="full", **request_kwargs)
+            bars = merge_bars(cached, full)
+        else:
+            bars = merge_bars(cached, latest)
+            print(f"Merged {len(bars) - len(cached)} new bar(s) into the {symbol} cache")
+    save_cached_bars(bars, symbol, cache_dir, interval)
+    return bars.copy()
+
 def preprocess_stock_data(df):
     """
     Preprocess the stock DataFrame:
@@ -58,49 +154,59 @@ def preprocess_stock_data(df):
     df.dropna(inplace=True)
     return df
 
-def compute_technical_indicators(df):
+def compute_technical_indicators(df, columns=("SMA_10", "RSI_14")):
     """
     Compute technical indicators and add them as columns to the DataFrame.
     
-    Here we compute:
+    By default we compute only what the live consumers read:
       - SMA_10 (10-period Simple Moving Average)
       - RSI_14 (14-period Relative Strength Index)
+    Any other column from data_pipeline.compute_indicators can be requested; only the
+    part of the indicator graph those columns depend on is evaluated.
       
     Returns:
         DataFrame: DataFrame with additional indicator columns.
     """
-    # SMA_10
-    df["SMA_10"] = df["close"].rolling(window=10).mean()
-    
-    # RSI_14
-    def compute_RSI(series, period=14):
-        delta = series.diff()
-        gain = delta.where(delta > 0, 0)
-        loss = -delta.where(delta < 0, 0)
-        avg_gain = gain.rolling(window=period, min_periods=period).mean()
-        avg_loss = loss.rolling(window=period, min_periods=period).mean()
-        rs = avg_gain / (avg_loss + 1e-9)
-        return 100 - (100 / (1 + rs))
-    
-    df["RSI_14"] = compute_RSI(df["close"], period=14)
-    # (Add more indicators as needed)
-    return df
+    return compute_selected_indicators(df, columns=columns)
 
-def run_realtime_data_pipeline(api_key, symbol):
+def run_realtime_data_pipeline(api_key, symbol, columns=("SMA_10", "RSI_14"), cache_dir=None):
     """
     Run the complete real-time data pipeline:
-      1. Fetch intraday (1hr) data from Alpha Vantage.
+      1. Fetch intraday (1hr) data from Alpha Vantage (incrementally through the local
+         bar cache when `cache_dir` is given).
       2. Preprocess the data.
-      3. Compute technical indicators.
+      3. Compute technical indicators (only the requested `columns`).
     
     Returns:
         DataFrame: Processed DataFrame with computed indicators.
     """
-    df_raw = fetch_alpha_vantage_data(api_key, symbol, function="TIME_SERIES_INTRADAY", interval="60min", outputsize="full")
+    if cache_dir is not None:
+        df_raw = fetch_alpha_vantage_data_incremental(api_key, symbol, cache_dir=cache_dir, interval="60min")
+    else:
+        df_raw = fetch_alpha_vantage_data(api_key, symbol, function="TIME_SERIES_INTRADAY", interval="60min", outputsize="full")
     df_clean = preprocess_stock_data(df_raw)
-    df_indicators = compute_technical_indicators(df_clean)
+    df_indicators = compute_technical_indicators(df_clean, columns=columns)
     return df_indicators
 
+def update_realtime_indicators(engine, df_bars):
+    """
+    Incrementally update indicators with bars the streaming engine has not seen yet.
+
+    Unlike run_realtime_data_pipeline, which recomputes every rolling window over the
+    whole history, this feeds only the new bars through a StreamingIndicatorEngine,
+    so the cost per bar stays flat as the history grows.
+
+    Parameters:
+        engine (StreamingIndicatorEngine): Engine holding the indicator state.
+        df_bars (DataFrame): Raw OHLCV bars (datetime index); may overlap bars already seen.
+
+    Returns:
+        DataFrame: Indicator rows for the new bars only.
+    """
+    if engine.last_timestamp is not None:
+        df_bars = df_bars[df_bars.index > engine.last_timestamp]
+    return engine.update_frame(df_bars.sort_index())
+
 if __name__ == "__main__":
     # Example usage:
     api_key = "W5LXPX0X4CVPIHLX"  # Replace with your actual API key
@@ -0,0 +1,281 @@
+# streaming_indicators.py
+import math
+from collections import deque
+
+import numpy as np
+import pandas as pd
+from data.indicator_kernels import INDICATOR_COLUMNS, RollingExtrema
+
+NAN = float("nan")
+
+class _RollingWindow:
+    """
+    Fixed-size ring buffer that keeps a running mean and sum of squared deviations
+    (sliding Welford update), so mean/sum/std of the last `size` values are O(1).
+    """
+    # Recompute the running state from the buffer every so often to stop float drift.
+    RESYNC_EVERY = 4096
+
+    def __init__(self, size):
+        self.size = size
+        self.buffer = [0.0] * size
+        self.count = 0
+        self.pos = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.pushes = 0
+
+    def push(self, x):
+        if self.count < self.size:
+            self.count += 1
+            delta = x - self.mean
+            self.mean += delta / self.count
+            self.m2 += delta * (x - self.mean)
+        else:
+            old = self.buffer[self.pos]
+            old_mean = self.mean
+            self.mean += (x - old) / self.size
+            self.m2 += (x - old) * (x - self.mean + old - old_mean)
+        self.buffer[self.pos] = x
+        self.pos = (self.pos + 1) % self.size
+        self.pushes += 1
+        if self.pushes % self.RESYNC_EVERY == 0:
+            self._resync()
+
+    def _resync(self):
+        values = self.buffer if self.count == self.size else self.buffer[:self.count]
+        self.mean = math.fsum(values) / self.count
+        self.m2 = math.fsum((v - self.mean) ** 2 for v in values)
+
+    @property
+    def full(self):
+        return self.count == self.size
+
+    def mean_value(self):
+        return self.mean if self.full else NAN
+
+    def sum_value(self):
+        return self.mean * self.size if self.full else NAN
+
+    def std_value(self):
+        # Sample standard deviation (ddof=1), as pandas' rolling().std().
+        if not self.full:
+            return NAN
+        return math.sqrt(max(self.m2, 0.0) / (self.size - 1))
+
+class _EMA:
+    """
+    Exponential moving average equivalent to pandas' ewm(span=span, adjust=False).
+    """
+    def __init__(self, span):
+        self.alpha = 2.0 / (span + 1.0)
+        self.value = None
+
+    def push(self, x):
+        if self.value is None:
+            self.value = x
+        else:
+            self.value = self.alpha * x + (1.0 - self.alpha) * self.value
+        return self.value
+
+class StreamingIndicatorEngine:
+    """
+    Stateful, incremental version of preprocess_data + compute_indicators.
+
+    Each call to `update` takes one new OHLCV bar and returns the indicator row for
+    that bar in constant time (independent of how much history has been seen). The
+    values match the batch pipeline to within float tolerance, including its warm-up
+    behaviour: the very first bar only seeds the return calculation (batch drops it
+    via dropna), and every rolling indicator is NaN until its window is full.
+    """
+    def __init__(self):
+        self.last_timestamp = None
+        self.bars_seen = 0
+        self._raw_prev_close = None
+        self._prev_close = None
+        self._prev_high = None
+        self._prev_low = None
+
+        self._gain = _RollingWindow(14)
+        self._loss = _RollingWindow(14)
+        self._ema12 = _EMA(12)
+        self._ema26 = _EMA(26)
+        self._macd_signal = _EMA(9)
+        self._closes = deque(maxlen=15)
+        self._close_10 = _RollingWindow(10)
+        self._close_20 = _RollingWindow(20)
+        self._close_50 = _RollingWindow(50)
+        self._tr_14 = _RollingWindow(14)
+        self._plus_dm_14 = _RollingWindow(14)
+        self._minus_dm_14 = _RollingWindow(14)
+        self._dx_14 = _RollingWindow(14)
+        # Highest high / lowest low over 9, 14, 26 and 52 bars via monotonic deques.
+        self._highest = RollingExtrema((9, 14, 26, 52), mode="max")
+        self._lowest = RollingExtrema((9, 14, 26, 52), mode="min")
+        self._stoch_k_3 = _RollingWindow(3)
+        # Unshifted Ichimoku midpoints; Senkou spans read the value from 26 bars ago.
+        self._span_a_history = deque(maxlen=27)
+        self._span_b_history = deque(maxlen=27)
+
+        self._vwap_date = None
+        self._cum_tpv = 0.0
+        self._cum_volume = 0
+
+    def update(self, timestamp, high, low, close, volume, open=None):
+        """
+        Feed one new bar into the engine.
+
+        Parameters:
+            timestamp: Bar timestamp (anything pd.Timestamp accepts).
+            high, low, close (float): Bar prices.
+            volume (int): Bar volume.
+            open (float, optional): Opening price, passed through to the output row.
+
+        Returns:
+            dict or None: Indicator row (same column names as compute_indicators), or
+                          None for the first bar, which has no return yet.
+        """
+        timestamp = pd.Timestamp(timestamp)
+        if self.last_timestamp is not None and timestamp <= self.last_timestamp:
+            raise ValueError(f"Bars must arrive in increasing time order: {timestamp} <= {self.last_timestamp}")
+        self.last_timestamp = timestamp
+        high, low, close = float(high), float(low), float(close)
+
+        if self._raw_prev_close is None:
+            self._raw_prev_close = close
+            return None
+        ret = close / self._raw_prev_close - 1.0
+        self._raw_prev_close = close
+
+        row = {}
+        if open is not None:
+            row["open"] = float(open)
+        row.update({"high": high, "low": low, "close": close, "volume": volume, "return": ret})
+
+        prev_close, prev_high, prev_low = self._prev_close, self._prev_high, self._prev_low
+        first = prev_close is None
+
+        # RSI (14): the first diff is NaN and counts as zero gain/loss, as in the batch version.
+        delta = 0.0 if first else close - prev_close
+        self._gain.push(delta if delta > 0 else 0.0)
+        self._loss.push(-delta if delta < 0 else 0.0)
+        avg_gain, avg_loss = self._gain.mean_value(), self._loss.mean_value()
+        rs = avg_gain / (avg_loss + 1e-9)
+        row["RSI_14"] = 100 - (100 / (1 + rs))
+
+        # MACD (12,26,9)
+        macd = self._ema12.push(close) - self._ema26.push(close)
+        macd_signal = self._macd_signal.push(macd)
+        row["MACD"] = macd
+        row["MACD_signal"] = macd_signal
+        row["MACD_hist"] = macd - macd_signal
+
+        # ROC (14)
+        self._closes.append(close)
+        row["ROC_14"] = (close / self._closes[0] - 1.0) * 100 if len(self._closes) == 15 else NAN
+
+        # Moving Averages, Bollinger Bands, Rolling Mean/STD and Z Score share the windows.
+        self._close_10.push(close)
+        self._close_20.push(close)
+        self._close_50.push(close)
+        row["SMA_10"] = self._close_10.mean_value()
+        row["SMA_50"] = self._close_50.mean_value()
+        mean_20, std_20 = self._close_20.mean_value(), self._close_20.std_value()
+        row["BB_Middle"] = mean_20
+        row["BB_Std"] = std_20
+        row["BB_Upper"] = mean_20 + 2 * std_20
+        row["BB_Lower"] = mean_20 - 2 * std_20
+
+        # ATR (14)
+        tr = high - low if first else max(high - low, abs(high - prev_close), abs(low - prev_close))
+        self._tr_14.push(tr)
+        row["TR"] = tr
+        row["ATR_14"] = self._tr_14.mean_value()
+
+        row["Rolling_Mean_20"] = mean_20
+        row["Rolling_STD_20"] = std_20
+        row["Z_Score_20"] = (close - mean_20) / std_20 if self._close_20.full else NAN
+
+        # VWAP (Intraday): cumulative sums reset at each new calendar date.
+        bar_date = timestamp.date()
+        if bar_date != self._vwap_date:
+            self._vwap_date = bar_date
+            self._cum_tpv = 0.0
+            self._cum_volume = 0
+        self._cum_tpv += ((high + low + close) / 3) * volume
+        self._cum_volume += volume
+        row["VWAP"] = self._cum_tpv / self._cum_volume
+
+        # ADX (14) with +DI and -DI
+        up_move = 0.0 if first else high - prev_high
+        down_move = 0.0 if first else prev_low - low
+        self._plus_dm_14.push(up_move if (up_move > down_move and up_move > 0) else 0.0)
+        self._minus_dm_14.push(down_move if (down_move > up_move and down_move > 0) else 0.0)
+        if self._tr_14.full:
+            tr14 = self._tr_14.sum_value()
+            plus_di = 100 * (self._plus_dm_14.sum_value() / (tr14 + 1e-9))
+            minus_di = 100 * (self._minus_dm_14.sum_value() / (tr14 + 1e-9))
+            self._dx_14.push(100 * (abs(plus_di - minus_di) / (plus_di + minus_di + 1e-9)))
+        else:
+            plus_di = minus_di = NAN
+        row["+DI14"] = plus_di
+        row["-DI14"] = minus_di
+        row["ADX_14"] = self._dx_14.mean_value()
+
+        # Ichimoku Cloud Components
+        high_9, high_14, high_26, high_52 = self._highest.push(high)
+        low_9, low_14, low_26, low_52 = self._lowest.push(low)
+        tenkan = (high_9 + low_9) / 2
+        kijun = (high_26 + low_26) / 2
+        self._span_a_history.append((tenkan + kijun) / 2)
+        self._span_b_history.append((high_52 + low_52) / 2)
+        row["Tenkan_Sen"] = tenkan
+        row["Kijun_Sen"] = kijun
+        row["Senkou_Span_A"] = self._span_a_history[0] if len(self._span_a_history) == 27 else NAN
+        row["Senkou_Span_B"] = self._span_b_history[0] if len(self._span_b_history) == 27 else NAN
+
+        # Stochastic Oscillator (%K and %D, 14/3)
+        if self._highest.count >= 14:
+            stoch_k = 100 * ((close - low_14) / (high_14 - low_14 + 1e-9))
+            self._stoch_k_3.push(stoch_k)
+        else:
+            stoch_k = NAN
+        row["Stoch_%K"] = stoch_k
+        row["Stoch_%D"] = self._stoch_k_3.mean_value()
+
+        self._prev_close, self._prev_high, self._prev_low = close, high, low
+        self.bars_seen += 1
+        return row
+
+    def update_frame(self, df):
+        """
+        Feed every bar of an OHLCV DataFrame (datetime index) through the engine.
+
+        Parameters:
+            df (DataFrame): Raw bars with 'high', 'low', 'close', 'volume' (and optionally 'open').
+
+        Returns:
+            DataFrame: One indicator row per emitted bar, indexed by timestamp.
+        """
+        has_open = "open" in df.columns
+        rows, index = [], []
+        columns = [df[c].tolist() for c in ("high", "low", "close", "volume")]
+        opens = df["open"].tolist() if has_open else [None] * len(df)
+        for ts, high, low, close, volume, open_ in zip(df.index, *columns, opens):
+            row = self.update(ts, high, low, close, volume, open=open_)
+            if row is not None:
+                rows.append(row)
+                index.append(ts)
+        return pd.DataFrame(rows, index=pd.DatetimeIndex(index, name=df.index.name))
+
+if __name__ == "__main__":
+    # Example usage: check the streaming engine against the batch pipeline.
+    from data.data_pipeline import simulate_data, preprocess_data, compute_indicators
+
+    df_raw = simulate_data(periods=500)
+    batch = compute_indicators(preprocess_data(df_raw.copy()))
+    engine = StreamingIndicatorEngine()
+    streamed = engine.update_frame(df_raw)
+    max_err = np.nanmax(np.abs(streamed[INDICATOR_COLUMNS].values - batch[INDICATOR_COLUMNS].values))
+    print("Bars streamed:", engine.bars_seen)
+    print("Max abs difference vs batch compute_indicators:", max_err)
@@ -0,0 +1,239 @@
+# feeds.py
+import time
+
+import numpy as np
+import pandas as pd
+
+# A bar is (timestamp, high, low, close, volume, open) - the argument order of
+# StreamingIndicatorEngine.update; open may be None.
+
+class SystemClock:
+    """
+    Wall clock: now() is the current time (naive local time, or aware in `tz`) and
+    sleep_until() really waits.
+    """
+    def __init__(self, tz=None):
+        self.tz = tz
+
+    def now(self):
+        return pd.Timestamp.now(tz=self.tz)
+
+    def sleep_until(self, timestamp):
+        # A naive timestamp is wall time in self.tz; an aware one is compared as an instant.
+        timestamp = pd.Timestamp(timestamp)
+        if timestamp.tz is not None:
+            now = pd.Timestamp.now(tz=timestamp.tz)
+        else:
+            now = pd.Timestamp.now(tz=self.tz).tz_localize(None)
+        delay = (timestamp - now).total_seconds()
+        if delay > 0:
+            time.sleep(delay)
+
+class SimulatedClock:
+    """
+    Clock for offline runs: sleep_until() jumps straight to the requested time, so a
+    recorded feed is replayed as fast as the loop can process it, deterministically.
+    """
+    def __init__(self, start=None):
+        self.current = pd.Timestamp(start) if start is not None else None
+
+    def now(self):
+        return self.current
+
+    def sleep_until(self, timestamp):
+        timestamp = pd.Timestamp(timestamp)
+        if self.current is None or timestamp > self.current:
+            self.current = timestamp
+
+class ScaledClock(SimulatedClock):
+    """
+    Simulated clock that runs `speedup` times faster than real time: sleep_until() waits
+    (target - now) / speedup real seconds before jumping to the target.
+    """
+    def __init__(self, speedup, start=None):
+        super().__init__(start)
+        self.speedup = float(speedup)
+
+    def sleep_until(self, timestamp):
+        timestamp = pd.Timestamp(timestamp)
+        if self.current is not None and timestamp > self.current:
+            time.sleep((timestamp - self.current).total_seconds() / self.speedup)
+        super().sleep_until(timestamp)
+
+class RecordedFeed:
+    """
+    Replays recorded OHLCV bars for several symbols.
+
+    A bar stamped t becomes available at t + availability_delay (the time the vendor
+    would publish it). Use it with SimulatedClock for deterministic offline runs, or with
+    SystemClock to pace bars in real time.
+    """
+    def __init__(self, frames, availability_delay="0s"):
+        """
+        Parameters:
+            frames (dict): Symbol -> raw bar DataFrame (datetime index; 'high', 'low',
+                           'close', 'volume' and optionally 'open' columns).
+            availability_delay (str or Timedelta): Publication delay after the bar timestamp.
+        """
+        self.delay = pd.Timedelta(availability_delay)
+        self._bars = {}
+        self._times = {}
+        self._next = {}
+        for symbol, df in frames.items():
+            df = df.sort_index()
+            opens = df["open"].tolist() if "open" in df.columns else [None] * len(df)
+            self._bars[symbol] = list(zip(df.index, df["high"].tolist(), df["low"].tolist(), df["close"].tolist(),
+                                          df["volume"].tolist(), opens))
+            self._times[symbol] = (df.index + self.delay).values
+            self._next[symbol] = 0
+
+    @property
+    def symbols(self):
+        return list(self._bars)
+
+    def next_bar_time(self):
+        """
+        Time at which the next unseen bar becomes available, or None when the recording is exhausted.
+        """
+        pending = [self._times[s][i] for s, i in self._next.items() if i < len(self._times[s])]
+        return pd.Timestamp(min(pending)) if pending else None
+
+    def poll(self, now):
+        """
+        Return {symbol: [bar, ...]} with the bars that became available up to `now`.
+        """
+        now = np.datetime64(pd.Timestamp(now))
+        new_bars = {}
+        for symbol, start in self._next.items():
+            end = int(np.searchsorted(self._times[symbol], now, side="right"))
+            if end > start:
+                new_bars[symbol] = self._bars[symbol][start:end]
+                self._next[symbol] = end
+        return new_bars
+
+class AlphaVantageFeed:
+    """
+    Polls Alpha Vantage for new intraday bars through the local bar cache
+    (fetch_alpha_vantage_data_incremental), once per expected bar.
+
+    Alpha Vantage stamps intraday bars in US/Eastern without a time zone; the feed
+    localises them to `timezone` and schedules on a timezone-aware clock, so the host's
+    own time zone does not matter. Symbols are fetched concurrently through the
+    multi-symbol scheduler (TokenBucket + RateLimitedSession on a thread pool), sharing
+    one calls-per-minute budget; a symbol whose fetch fails is reported and retried on
+    the next poll.
+
+    The next poll is due `poll_delay` after the next bar should close; if that bar is not
+    published yet, polling retries every `retry_interval`. A symbol's first poll returns
+    only its latest bar - call history() first to prime the loop with the earlier bars.
+    """
+    def __init__(self, api_key, symbols, interval="60min", cache_dir="data/bar_cache", poll_delay="2min",
+                 retry_interval="1min", session=None, clock=None, timezone="America/New_York",
+                 calls_per_minute=75, max_workers=8):
+        """
+        Parameters:
+            api_key (str): Your Alpha Vantage API key.
+            symbols (iterable): Ticker symbols.
+            interval (str): Bar interval, e.g. "60min".
+            cache_dir (str): Local bar cache directory.
+            poll_delay (str or Timedelta): Wait after the expected bar close before polling.
+            retry_interval (str or Timedelta): Wait between polls while a bar is late.
+            session (requests.Session, optional): Session to fetch with (default: a
+                     RateLimitedSession limited to calls_per_minute).
+            clock (optional): Clock for scheduling (default: SystemClock in `timezone`).
+            timezone (str): Exchange time zone of the vendor timestamps.
+            calls_per_minute (float): API budget of the default session.
+            max_workers (int): Concurrent fetches per poll.
+        """
+        from data.multi_symbol_ingestion import TokenBucket, RateLimitedSession
+        self.api_key = api_key
+        self.symbols = list(dict.fromkeys(symbols))
+        self.interval = interval
+        self.cache_dir = cache_dir
+        self.bar_length = pd.Timedelta(interval)
+        self.poll_delay = pd.Timedelta(poll_delay)
+        self.retry_interval = pd.Timedelta(retry_interval)
+        self.timezone = timezone
+        self.session = session if session is not None else RateLimitedSession(
+            TokenBucket(calls_per_minute), pool_size=max_workers)
+        self.max_workers = max_workers
+        self.clock = clock if clock is not None else SystemClock(tz=timezone)
+        self.last_seen = {symbol: None for symbol in self.symbols}
+        self._next_poll = None
+
+    def _aware(self, timestamp):
+        # Naive times are taken as exchange-local wall time.
+        timestamp = pd.Timestamp(timestamp)
+        return timestamp.tz_localize(self.timezone) if timestamp.tz is None else timestamp.tz_convert(self.timezone)
+
+    def _fetch(self, symbols):
+        # {symbol: raw bars with an exchange-time index}, fetched concurrently; failures are skipped.
+        from concurrent.futures import ThreadPoolExecutor
+        from data.realtime_data_pipeline import fetch_alpha_vantage_data_incremental
+
+        def fetch(symbol):
+            df = fetch_alpha_vantage_data_incremental(self.api_key, symbol, self.cache_dir, self.interval,
+                                                      session=self.session)
+            if df.index.tz is None:
+                df = df.tz_localize(self.timezone, ambiguous="NaT", nonexistent="NaT")
+                df = df[df.index.notna()]
+            return df.tz_convert(self.timezone)
+
+        frames = {}
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(symbols)) or 1) as executor:
+            futures = {symbol: executor.submit(fetch, symbol) for symbol in symbols}
+            for symbol, future in futures.items():
+                try:
+                    frames[symbol] = future.result()
+                except Exception as e:
+                    print(f"Error fetching {symbol}: {e}")
+        return frames
+
+    def history(self):
+        """
+        Fetch every symbol's cached history and mark it as seen.
+
+        Returns:
+            dict: Symbol -> raw bar DataFrame, e.g. for LiveTradingLoop.prime; later polls
+                  only return bars after these.
+        """
+        frames = self._fetch(self.symbols)
+        for symbol, df in frames.items():
+            if not df.empty:
+                self.last_seen[symbol] = df.index[-1]
+        return frames
+
+    def next_bar_time(self):
+        if self._next_poll is None:
+            return self.clock.now()
+        return self._next_poll
+
+    def poll(self, now):
+        new_bars = {}
+        for symbol, df in self._fetch(self.symbols).items():
+            last = self.last_seen[symbol]
+            df = df[df.index > last] if last is not None else df.iloc[-1:]
+            if df.empty:
+                continue
+            opens = df["open"].tolist() if "open" in df.columns else [None] * len(df)
+            new_bars[symbol] = list(zip(df.index, df["high"].tolist(), df["low"].tolist(), df["close"].tolist(),
+                                        df["volume"].tolist(), opens))
+            self.last_seen[symbol] = df.index[-1]
+        seen = [ts for ts in self.last_seen.values() if ts is not None]
+        expected = max(seen) + self.bar_length + self.poll_delay if seen else None
+        now = self._aware(now)
+        self._next_poll = expected if expected is not None and expected > now else now + self.retry_interval
+        return new_bars
+
+    def close(self):
+        self.session.close()
+
+if __name__ == "__main__":
+    # Example usage: replay two simulated symbols on a simulated clock.
+    from data.data_pipeline import simulate_data
+
+    feed = RecordedFeed({"AAA": simulate_data(periods=5), "BBB": simulate_data(periods=3)})
+    clock = SimulatedClock()
+    while (t := feed.next_bar_time()) is not None:
+        clock.sleep_until(t)
+        print(clock.now(), {s: len(b) for s, b in feed.poll(clock.now()).items()})
@@ -0,0 +1,316 @@
+# live_loop.py
+import math
+import time
+from collections import deque
+
+import numpy as np
+
+from live.feeds import SimulatedClock, SystemClock
+
+STAGES = ("indicators", "features", "risk", "rl", "strategies", "transformer", "ensemble")
+
+class _SymbolState:
+    """
+    Per-symbol live state: streaming indicators, transformer feature window and the
+    risk-managed book the symbol's decisions are settled against.
+    """
+    def __init__(self, lookback, sentiment_score, initial_balance, position_size_pct):
+        from data.streaming_indicators import StreamingIndicatorEngine
+        from models.transformer_model import TransformerFeatureBuffer
+        self.engine = StreamingIndicatorEngine()
+        self.features = TransformerFeatureBuffer(lookback, sentiment_score)
+        self.state = None
+        self.last_timestamp = None
+        self.pending_action = 0
+        self.balance = float(initial_balance)
+        self.peak_balance = self.balance
+        self.position_size_pct = position_size_pct
+
+class LiveTradingLoop:
+    """
+    Event-driven trading loop: sleeps until the feed has a new bar, then updates each
+    symbol incrementally and asks the ensemble for a decision.
+
+    Per tick (all bars that became available at the same time):
+      1. indicators - each new bar goes through the symbol's StreamingIndicatorEngine;
+      2. risk       - the decision taken on the previous bar is settled against the new
+                      bar's return with the rules of run_risk_managed_backtest;
+      3. features   - the bar's row is appended to the symbol's TransformerFeatureBuffer;
+      4. rl / strategies / transformer / ensemble - one batched call per component over
+         every symbol that got a bar, combined with combine_ensemble_actions.
+    If a symbol receives several bars in one tick (catch-up after a gap), only the last
+    one is decided; the earlier ones update state and are held flat.
+
+    Time and data are injected: `clock` provides now()/sleep_until() and `feed` provides
+    next_bar_time()/poll(now) (see live.feeds), so a RecordedFeed on a SimulatedClock
+    drives the loop deterministically offline. Processing time is measured with `timer`;
+    ticks slower than latency_budget_ms are counted as overruns and reported.
+    """
+    def __init__(self, feed, rl_model=None, clock=None, transformer=None, lookback=20, rl_weight=0.33,
+                 strategy_weight=0.33, transformer_weight=0.34, threshold=0.2, risk_params="medium",
+                 initial_balance=10000, scaling=1000, latency_budget_ms=500.0, sentiment_score=0.0,
+                 on_decision=None, on_overrun=None, timer=time.perf_counter, history=10000, seed=None):
+        """
+        Parameters:
+            feed: Bar source (RecordedFeed, AlphaVantageFeed, ...).
+            rl_model: Trained DQN model; without one the RL component votes Hold.
+            clock: SystemClock or SimulatedClock (default: the feed's clock, else SystemClock).
+            transformer (TransformerMetaModelWithProfit, optional): Defaults to the shared
+                      meta-model; it is run through its batch-first fast-path copy.
+            lookback (int): Transformer window length.
+            rl_weight, strategy_weight, transformer_weight (float): Ensemble weights.
+            threshold (float): Vote threshold of the ensemble.
+            risk_params (str or dict): Risk profile name or parameters.
+            initial_balance (float): Starting balance of each symbol's book.
+            scaling (float): Scaling factor to convert returns into monetary terms.
+            latency_budget_ms (float): Processing budget per tick.
+            sentiment_score (float): Initial sentiment feature for every symbol.
+            on_decision (callable, optional): Called with each decision dict.
+            on_overrun (callable, optional): Called with each overrun dict (default: print).
+            timer (callable): Monotonic timer in seconds used for latency measurement.
+            history (int): Decisions, overruns and per-tick timings kept in memory.
+            seed (int, optional): Seed for the placeholder random strategies.
+        """
+        from risk.risk_management import get_risk_profile
+        from models.transformer_model import get_transformer_model
+        from models.transformer_export import build_fastpath_model
+
+        self.feed = feed
+        self.clock = clock if clock is not None else getattr(feed, "clock", None) or SystemClock()
+        self.rl_model = rl_model
+        self.transformer = build_fastpath_model(transformer if transformer is not None else get_transformer_model())
+        self.lookback = lookback
+        self.weights = (rl_weight, strategy_weight, transformer_weight)
+        self.threshold = threshold
+        self.risk_params = get_risk_profile(risk_params) if isinstance(risk_params, str) else dict(risk_params)
+        self.initial_balance = initial_balance
+        self.scaling = scaling
+        self.sentiment_score = sentiment_score
+        self.latency_budget = latency_budget_ms / 1000.0
+        self.on_decision = on_decision
+        self.on_overrun = on_overrun if on_overrun is not None else self._print_overrun
+        self.timer = timer
+        self.rng = np.random.default_rng(seed)
+        self.symbols = {}
+
+        self.ticks = 0
+        self.bars = 0
+        self.decision_count = 0
+        self.overrun_count = 0
+        self.decisions = deque(maxlen=history)
+        self.overruns = deque(maxlen=history)
+        self.tick_latencies = deque(maxlen=history)
+        self.tick_bars = deque(maxlen=history)
+        self.stage_timings = {stage: deque(maxlen=history) for stage in STAGES}
+
+    def _symbol(self, symbol):
+        state = self.symbols.get(symbol)
+        if state is None:
+            state = _SymbolState(self.lookback, self.sentiment_score, self.initial_balance,
+                                 float(self.risk_params["position_size_pct"]))
+            self.symbols[symbol] = state
+        return state
+
+    def prime(self, symbol, df_bars):
+        """
+        Warm a symbol up from historical raw bars (no decisions, no P&L), so the first
+        live bar already has full indicator and transformer windows.
+        """
+        state = self._symbol(symbol)
+        rows = state.engine.update_frame(df_bars.sort_index())
+        for rsi, ret in zip(rows["RSI_14"].iloc[-self.lookback:].tolist(), rows["return"].iloc[-self.lookback:].tolist()):
+            state.features.append(rsi, ret)
+        if len(rows):
+            last = rows.iloc[-1]
+            state.state = (last["close"], last["SMA_10"], last["RSI_14"])
+            state.last_timestamp = rows.index[-1]
+
+    def set_sentiment(self, symbol, sentiment_score):
+        self._symbol(symbol).features.set_sentiment(sentiment_score)
+
+    def _settle(self, state, ret):
+        # One step of run_risk_managed_backtest for the position held over this bar.
+        p = self.risk_params
+        raw_pnl = state.pending_action * ret * self.scaling
+        trade_size = state.balance * state.position_size_pct
+        max_loss = -trade_size * p["stop_loss_pct"]
+        max_gain = trade_size * p["take_profit_pct"]
+        actual_pnl = min(max(raw_pnl, max_loss), max_gain)
+        state.balance += actual_pnl
+        if state.balance > state.peak_balance:
+            state.peak_balance = state.balance
+        if 1.0 - (state.balance / state.peak_balance) > p["max_drawdown_pct"]:
+            state.position_size_pct = max(state.position_size_pct - 0.005, 0.01)
+        return actual_pnl
+
+    def process_bars(self, new_bars, now=None):
+        """
+        Run one tick over {symbol: [bar, ...]} and return the list of decision dicts.
+        """
+        import torch
+        from models.rl_model import get_rl_predictions
+        from strategies.ensemble import compute_strategy_votes, combine_ensemble_actions
+
+        timer = self.timer
+        start = timer()
+        elapsed = dict.fromkeys(STAGES, 0.0)
+        ready = []
+        for symbol, bars in new_bars.items():
+            state = self._symbol(symbol)
+            for bar in bars:
+                t0 = timer()
+                row = state.engine.update(*bar[:5], open=bar[5] if len(bar) > 5 else None)
+                t1 = timer()
+                elapsed["indicators"] += t1 - t0
+                self.bars += 1
+                if row is None:
+                    continue
+                self._settle(state, row["return"])
+                state.pending_action = 0
+                t2 = timer()
+                elapsed["risk"] += t2 - t1
+                state.features.append(row["RSI_14"], row["return"])
+                state.state = (row["close"], row["SMA_10"], row["RSI_14"])
+                state.last_timestamp = bar[0]
+                elapsed["features"] += timer() - t2
+            if state.features.ready and state.state is not None and all(map(math.isfinite, state.state)):
+                ready.append(symbol)
+
+        decisions = []
+        if ready:
+            states = np.array([self.symbols[s].state for s in ready], dtype=np.float64)
+            t0 = timer()
+            if self.rl_model is not None:
+                rl_actions = get_rl_predictions(self.rl_model, states)
+            else:
+                rl_actions = np.zeros(len(ready), dtype=np.int8)
+            t1 = timer()
+            _, strategy_actions = compute_strategy_votes(states, rng=self.rng)
+            t2 = timer()
+            windows = torch.cat([self.symbols[s].features.tensor() for s in ready])
+            with torch.inference_mode():
+                decision_logits, _ = self.transformer(windows)
+            transformer_actions = decision_logits.argmax(dim=1).numpy().astype(np.int8) - 1
+            t3 = timer()
+            actions = combine_ensemble_actions(rl_actions, strategy_actions, transformer_actions, *self.weights,
+                                               threshold=self.threshold)
+            for i, symbol in enumerate(ready):
+                state = self.symbols[symbol]
+                state.pending_action = int(actions[i])
+                decisions.append({
+                    "symbol": symbol,
+                    "timestamp": state.last_timestamp,
+                    "decided_at": now,
+                    "action": int(actions[i]),
+                    "rl": int(rl_actions[i]),
+                    "strategy": int(strategy_actions[i]),
+                    "transformer": int(transformer_actions[i]),
+                    "balance": state.balance,
+                })
+            t4 = timer()
+            elapsed["rl"] += t1 - t0
+            elapsed["strategies"] += t2 - t1
+            elapsed["transformer"] += t3 - t2
+            elapsed["ensemble"] += t4 - t3
+
+        latency = timer() - start
+        self.ticks += 1
+        self.decision_count += len(decisions)
+        self.tick_latencies.append(latency * 1e3)
+        self.tick_bars.append(sum(len(bars) for bars in new_bars.values()))
+        for stage, seconds in elapsed.items():
+            self.stage_timings[stage].append(seconds * 1e3)
+        for decision in decisions:
+            decision["latency_ms"] = latency * 1e3
+            self.decisions.append(decision)
+            if self.on_decision is not None:
+                self.on_decision(decision)
+        if latency > self.latency_budget:
+            self.overrun_count += 1
+            overrun = {
+                "tick": self.ticks,
+                "time": now,
+                "latency_ms": latency * 1e3,
+                "budget_ms": self.latency_budget * 1e3,
+                "symbols": len(new_bars),
+                "stages_ms": {stage: seconds * 1e3 for stage, seconds in elapsed.items()},
+            }
+            self.overruns.append(overrun)
+            self.on_overrun(overrun)
+        return decisions
+
+    @staticmethod
+    def _print_overrun(overrun):
+        slowest = max(overrun["stages_ms"], key=overrun["stages_ms"].get)
+        print(f"[LATENCY] tick {overrun['tick']} at {overrun['time']}: {overrun['latency_ms']:.1f} ms "
+              f"> {overrun['budget_ms']:.1f} ms budget ({overrun['symbols']} symbols, slowest stage: {slowest})")
+
+    def step(self):
+        """
+        Wait for the next bar(s) and process them. Returns False when the feed is exhausted.
+        """
+        due = self.feed.next_bar_time()
+        if due is None:
+            return False
+        self.clock.sleep_until(due)
+        now = self.clock.now()
+        new_bars = self.feed.poll(now)
+        if new_bars:
+            self.process_bars(new_bars, now)
+        return True
+
+    def run(self, max_ticks=None, until=None):
+        """
+        Run until the feed is exhausted, `max_ticks` ticks were processed or the clock passes `until`.
+        """
+        import pandas as pd
+        until = pd.Timestamp(until) if until is not None else None
+        start_ticks = self.ticks
+        while max_ticks is None or self.ticks - start_ticks < max_ticks:
+            if until is not None and self.clock.now() is not None and self.clock.now() >= until:
+                break
+            if not self.step():
+                break
+        return self.report()
+
+    def report(self):
+        """
+        Summary of the run: counts, overruns and per-stage latency statistics in ms.
+        """
+        def stats(values):
+            values = np.asarray(values, dtype=np.float64)
+            if not len(values):
+                return {"mean": 0.0, "p50": 0.0, "p99": 0.0, "max": 0.0}
+            p50, p99 = np.percentile(values, [50, 99])
+            return {"mean": float(values.mean()), "p50": float(p50), "p99": float(p99), "max": float(values.max())}
+
+        return {
+            "ticks": self.ticks,
+            "bars": self.bars,
+            "decisions": self.decision_count,
+            "overruns": self.overrun_count,
+            "budget_ms": self.latency_budget * 1e3,
+            "tick_ms": stats(self.tick_latencies),
+            "stages_ms": {stage: stats(values) for stage, values in self.stage_timings.items()},
+            "balances": {symbol: state.balance for symbol, state in self.symbols.items()},
+        }
+
+if __name__ == "__main__":
+    # Example usage: drive the loop offline from recorded bars of three simulated symbols.
+    # For live trading use AlphaVantageFeed(api_key, symbols) (it brings its exchange-time clock)
+    # and prime each symbol from feed.history().
+    from data.data_pipeline import simulate_data
+    from live.feeds import RecordedFeed
+
+    history = simulate_data(periods=600)
+    frames = {symbol: history.sample(frac=1.0, random_state=i).set_axis(history.index) for i, symbol in
+              enumerate(("AAA", "BBB", "CCC"))}
+    loop = LiveTradingLoop(RecordedFeed({s: df.iloc[100:] for s, df in frames.items()}), clock=SimulatedClock(),
+                           latency_budget_ms=50.0, seed=0)
+    for symbol, df in frames.items():
+        loop.prime(symbol, df.iloc[:100])
+    report = loop.run()
+    print({k: v for k, v in report.items() if k != "stages_ms"})
+    for stage, values in report["stages_ms"].items():
+        print(f"{stage:12s} p50={values['p50']:.3f} ms  p99={values['p99']:.3f} ms")
+    print(list(loop.decisions)[-3:])
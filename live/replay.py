@@ -0,0 +1,163 @@
+# replay.py
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from live.feeds import RecordedFeed, ScaledClock, SimulatedClock
+from live.live_loop import STAGES, LiveTradingLoop
+
+RAW_COLUMNS = ["open", "high", "low", "close", "volume"]
+
+def load_replay_frames(source="final_indicators.csv", n_symbols=1, periods=None):
+    """
+    Raw OHLCV bars for the replay, one frame per synthetic symbol.
+
+    Symbol i replays the source bars circularly shifted by i * len / n_symbols rows
+    (same timestamps), so symbols differ while sharing one realistic price series.
+    Indicator columns in the source are dropped: the live path recomputes them.
+
+    Parameters:
+        source (str): A CSV of bars (e.g. final_indicators.csv) or "simulate" for simulate_data.
+        n_symbols (int): Number of symbols to replay.
+        periods (int, optional): Bars per symbol (default: the whole CSV, or 1000 simulated).
+
+    Returns:
+        dict: Symbol -> raw bar DataFrame.
+    """
+    if source == "simulate":
+        from data.data_pipeline import simulate_data
+        df = simulate_data(periods=periods or 1000)
+    else:
+        df = pd.read_csv(source, index_col=0, parse_dates=True)
+        if periods is not None:
+            df = df.iloc[:periods]
+    df = df[[c for c in RAW_COLUMNS if c in df.columns]].sort_index()
+    frames = {}
+    for i in range(n_symbols):
+        shift = (i * len(df)) // n_symbols
+        frames[f"SYM{i:03d}"] = pd.DataFrame(np.roll(df.to_numpy(), -shift, axis=0), index=df.index,
+                                             columns=df.columns).astype(df.dtypes.to_dict())
+    return frames
+
+def _rss_mb():
+    # Current resident set size; falls back to the peak on systems without /proc.
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def run_replay(frames, rl_model=None, warmup_bars=100, speedup=None, latency_budget_ms=500.0, memory_every=100,
+               trace_python_memory=False, history=100000, seed=0, **loop_kwargs):
+    """
+    Stream recorded bars through the full live decision path and measure it.
+
+    The first warmup_bars of each frame prime the symbols (LiveTradingLoop.prime); the
+    rest are replayed through a RecordedFeed - as fast as possible on a SimulatedClock,
+    or on a ScaledClock `speedup` times faster than real time. Every tick runs
+    indicators, features, risk, DQN, strategies, transformer and ensemble.
+
+    Parameters:
+        frames (dict): Symbol -> raw bar DataFrame (see load_replay_frames).
+        rl_model: Trained DQN model (None: the RL component votes Hold and costs nothing).
+        warmup_bars (int): Bars per symbol used for priming, not measured.
+        speedup (float, optional): Pace the replay at this multiple of real time.
+        latency_budget_ms (float): Per-tick budget for overrun counting.
+        memory_every (int): Sample the resident set size every this many ticks.
+        trace_python_memory (bool): Also report the largest Python allocation growth
+                                    (tracemalloc; slows the replay down noticeably).
+        history (int): Per-tick timings kept for the percentiles.
+        seed (int): Seed for the placeholder random strategies.
+        **loop_kwargs: Further LiveTradingLoop arguments.
+
+    Returns:
+        dict: Throughput, p50/p99 latency per stage (per tick and per symbol-bar),
+              overruns and memory growth; "loop" holds the LiveTradingLoop.
+    """
+    feed = RecordedFeed({symbol: df.iloc[warmup_bars:] for symbol, df in frames.items()})
+    clock = SimulatedClock() if speedup is None else ScaledClock(speedup)
+    loop = LiveTradingLoop(feed, rl_model=rl_model, clock=clock, latency_budget_ms=latency_budget_ms,
+                           on_overrun=lambda overrun: None, history=history, seed=seed, **loop_kwargs)
+    for symbol, df in frames.items():
+        loop.prime(symbol, df.iloc[:warmup_bars])
+
+    if trace_python_memory:
+        import tracemalloc
+        tracemalloc.start()
+        snapshot_start = tracemalloc.take_snapshot()
+    memory = [(0, _rss_mb())]
+    start = time.perf_counter()
+    while loop.step():
+        if loop.ticks % memory_every == 0:
+            memory.append((loop.ticks, _rss_mb()))
+    wall = time.perf_counter() - start
+    memory.append((loop.ticks, _rss_mb()))
+
+    report = loop.report()
+    tick_bars = np.maximum(np.asarray(loop.tick_bars, dtype=np.float64), 1.0)
+    per_bar = {}
+    for stage in STAGES + ("total",):
+        values = loop.tick_latencies if stage == "total" else loop.stage_timings[stage]
+        values = np.asarray(values, dtype=np.float64) / tick_bars
+        p50, p99 = np.percentile(values, [50, 99]) if len(values) else (0.0, 0.0)
+        per_bar[stage] = {"p50": float(p50), "p99": float(p99)}
+
+    ticks, rss = np.array(memory).T
+    # Growth after the first sample past 10% of the run, so start-up allocations do not count.
+    settled = int(np.searchsorted(ticks, ticks[-1] * 0.1))
+    slope = np.polyfit(ticks[settled:], rss[settled:], 1)[0] * 1000 if len(ticks) - settled > 1 else 0.0
+    result = {
+        "symbols": len(frames),
+        "ticks": report["ticks"],
+        "symbol_bars": report["bars"],
+        "decisions": report["decisions"],
+        "wall_seconds": wall,
+        "symbol_bars_per_s": report["bars"] / wall if wall else float("inf"),
+        "decisions_per_s": report["decisions"] / wall if wall else float("inf"),
+        "overruns": report["overruns"],
+        "tick_ms": report["tick_ms"],
+        "stages_tick_ms": report["stages_ms"],
+        "stages_bar_ms": per_bar,
+        "rss_start_mb": float(rss[0]),
+        "rss_end_mb": float(rss[-1]),
+        "rss_growth_mb": float(rss[-1] - rss[settled]),
+        "rss_mb_per_1000_ticks": float(slope),
+        "memory_samples": memory,
+        "loop": loop,
+    }
+    if trace_python_memory:
+        stats = tracemalloc.take_snapshot().compare_to(snapshot_start, "lineno")
+        tracemalloc.stop()
+        result["python_memory_growth"] = [(str(s.traceback), s.size_diff) for s in stats[:5]]
+    return result
+
+def print_replay_report(result):
+    """
+    Print a run_replay result as a short table.
+    """
+    print(f"{result['symbols']} symbols, {result['ticks']} ticks, {result['symbol_bars']} symbol-bars "
+          f"in {result['wall_seconds']:.2f}s")
+    print(f"Throughput: {result['symbol_bars_per_s']:.0f} symbol-bars/s, {result['decisions_per_s']:.0f} decisions/s")
+    print(f"Tick latency: p50={result['tick_ms']['p50']:.3f} ms  p99={result['tick_ms']['p99']:.3f} ms  "
+          f"overruns={result['overruns']}")
+    print(f"{'stage':12s} {'tick p50':>10s} {'tick p99':>10s} {'bar p50':>10s} {'bar p99':>10s}  (ms)")
+    for stage in STAGES + ("total",):
+        tick = result["stages_tick_ms"].get(stage, result["tick_ms"])
+        bar = result["stages_bar_ms"][stage]
+        print(f"{stage:12s} {tick['p50']:10.4f} {tick['p99']:10.4f} {bar['p50']:10.4f} {bar['p99']:10.4f}")
+    print(f"RSS: {result['rss_start_mb']:.1f} MB -> {result['rss_end_mb']:.1f} MB "
+          f"({result['rss_mb_per_1000_ticks']:+.3f} MB per 1000 ticks after warm-up)")
+    for location, size in result.get("python_memory_growth", []):
+        print(f"  {size / 1024:+.1f} KiB  {location}")
+
+if __name__ == "__main__":
+    # Example usage: replay final_indicators.csv as 20 symbols through the full stack.
+    rl_model = None
+    if os.path.exists("models/trained_rl_model_final.zip"):
+        from stable_baselines3 import DQN
+        rl_model = DQN.load("models/trained_rl_model_final.zip", device="cpu")
+    frames = load_replay_frames("final_indicators.csv", n_symbols=20, periods=2000)
+    print_replay_report(run_replay(frames, rl_model=rl_model))
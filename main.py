@@ -1,11 +1,12 @@
 # main.py
+import os
+import time
 from data.realtime_data_pipeline import run_realtime_data_pipeline
 from sentiment.sentiment_analysis import run_perplexity_sentiment_pipeline
-from models.rl_model import load_or_train_rl_model, get_rl_prediction
-from models.transformer_model import transformer_model, get_transformer_decision
-from strategies.ensemble import ensemble_final_decision
+from models.rl_model import load_or_train_rl_model
 from risk.risk_management import get_risk_profile, simulate_ensemble_profit_with_risk
-from utils.visualisation import plot_balance_history
+from risk.trade_journal import TradeJournal
+from utils.startup import warm_up, startup_report
 
 def main():
     print("=== Real-Time Data Pipeline ===")
@@ -34,6 +35,10 @@ def main():
     model_path = "models/trained_rl_model_final.zip"
     rl_model = load_or_train_rl_model(X_rl, returns_rl, initial_balance=10000, total_timesteps=50000, model_path=model_path)
     
+    # Build the transformer meta-model before the simulation loop rather than on its first bar.
+    warm_up(transformer=True)
+    startup_report()
+    
     print("\n=== Risk-Managed Ensemble Trading Simulation ===")
     risk_input = input("Enter risk profile (high, medium, low): ").strip()
     risk_params = get_risk_profile(risk_input)
@@ -42,21 +47,26 @@ def main():
         print(f"  {key}: {value}")
     
     # Run the ensemble simulation. The ensemble decision function uses the full DataFrame and current index.
-    final_balance, ensemble_history = simulate_ensemble_profit_with_risk(
-        df_data=final_df,
-        rl_model=rl_model,
-        rl_weight=0.33,
-        strategy_weight=0.33,
-        transformer_weight=0.34,
-        initial_balance=10000,
-        scaling=1000,
-        risk_params=risk_params,
-        lookback=20
-    )
+    # Every step is journaled to logs/trade_journal/<run time> (read it back with risk.trade_journal.read_journal).
+    journal_dir = os.path.join("logs", "trade_journal", time.strftime("%Y%m%d_%H%M%S"))
+    with TradeJournal(journal_dir) as journal:
+        final_balance, ensemble_history = simulate_ensemble_profit_with_risk(
+            df_data=final_df,
+            rl_model=rl_model,
+            rl_weight=0.33,
+            strategy_weight=0.33,
+            transformer_weight=0.34,
+            initial_balance=10000,
+            scaling=1000,
+            risk_params=risk_params,
+            lookback=20,
+            journal=journal
+        )
     profit = final_balance - 10000
     print(f"\nRisk-Managed Ensemble Final Balance: {final_balance:.2f}, Profit: {profit:.2f}")
     
     print("\n=== Visualisation ===")
+    from utils.visualisation import plot_balance_history
     plot_balance_history(ensemble_history, title="Ensemble Trading Account Balance")
 
 if __name__ == "__main__":
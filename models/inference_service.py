@@ -0,0 +1,384 @@
+# inference_service.py
+import json
+import os
+import queue
+import socket
+import socketserver
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+import pandas as pd
+
+# Wire protocol: one JSON object per line in each direction.
+#   request:  {"symbol": "AAPL", "state": [close, SMA_10, RSI_14],
+#              "rsi": [...lookback values], "returns": [...lookback values], "sentiment": 0.0}
+#             ("window": lookback x 29 transformer features may replace rsi/returns/sentiment),
+#             or {"requests": [request, ...]} to submit many symbols in one message.
+#   response: {"symbol", "decision", "rl", "strategy", "transformer", "profit", "timing"}
+#             (or {"results": [...]}); failures come back as {"error": "..."}.
+
+class InferenceEngine:
+    """
+    Holds the RL and transformer models in memory and evaluates whole batches of requests.
+
+    Each batch runs the three ensemble components with their batch paths (Q-network
+    forward, vectorized strategy signal matrix, one transformer forward) and combines
+    them with the same weighted vote as ensemble_final_decision.
+    """
+    def __init__(self, rl_model=None, rl_model_path=None, transformer=None, lookback=20, rl_weight=0.33,
+                 strategy_weight=0.33, transformer_weight=0.34, threshold=0.2, seed=None):
+        """
+        Parameters:
+            rl_model: Trained DQN model (or give rl_model_path). Without one the RL
+                      component votes Hold.
+            rl_model_path (str, optional): DQN zip to load.
+            transformer (TransformerMetaModelWithProfit, optional): Defaults to the shared
+                      meta-model; it is served through its batch-first fast-path copy.
+            lookback (int): Transformer window length.
+            rl_weight, strategy_weight, transformer_weight (float): Ensemble weights.
+            threshold (float): Vote threshold of the ensemble.
+            seed (int, optional): Seed for the placeholder random strategies.
+        """
+        import torch
+        from models.transformer_model import get_transformer_model
+        from models.transformer_export import build_fastpath_model
+
+        if rl_model is None and rl_model_path is not None:
+            from stable_baselines3 import DQN
+            rl_model = DQN.load(rl_model_path, device="cpu")
+        self.rl_model = rl_model
+        self.transformer = build_fastpath_model(transformer if transformer is not None else get_transformer_model())
+        self.lookback = lookback
+        self.weights = (rl_weight, strategy_weight, transformer_weight)
+        self.threshold = threshold
+        self.rng = np.random.default_rng(seed)
+        self.state_dim = rl_model.observation_space.shape[0] if rl_model is not None else 3
+        self._torch = torch
+        self._decision_map = torch.tensor([-1, 0, 1], dtype=torch.int8)
+
+    def validate(self, request):
+        """
+        Check one request before it is batched, so a malformed request fails on its own
+        instead of failing every request coalesced with it. Raises ValueError.
+        """
+        state = np.asarray(request.get("state", ()), dtype=np.float64)
+        if state.shape != (self.state_dim,):
+            raise ValueError(f"'state' needs {self.state_dim} values, got shape {state.shape}.")
+        if "window" in request:
+            size = np.asarray(request["window"], dtype=np.float32).size
+            if size != self.lookback * 29:
+                raise ValueError(f"'window' needs {self.lookback} x 29 values, got {size}.")
+        else:
+            for key in ("rsi", "returns"):
+                if len(request.get(key, ())) < self.lookback:
+                    raise ValueError(f"'{key}' needs at least {self.lookback} values.")
+
+    def _transformer_inputs(self, requests):
+        from models.transformer_model import build_transformer_feature_matrix
+        lookback = self.lookback
+        windows = np.empty((len(requests), lookback, 29), dtype=np.float32)
+        series = [i for i, r in enumerate(requests) if "window" not in r]
+        for i, r in enumerate(requests):
+            if "window" in r:
+                windows[i] = np.asarray(r["window"], dtype=np.float32).reshape(lookback, 29)
+        if series:
+            rsi = np.concatenate([np.asarray(requests[i]["rsi"], dtype=np.float64)[-lookback:] for i in series])
+            returns = np.concatenate([np.asarray(requests[i]["returns"], dtype=np.float64)[-lookback:] for i in series])
+            if len(rsi) != len(series) * lookback or len(returns) != len(rsi):
+                raise ValueError(f"rsi and returns need {lookback} values per request.")
+            frame = pd.DataFrame({"RSI_14": rsi, "return": returns})
+            features = build_transformer_feature_matrix(frame).reshape(len(series), lookback, 29)
+            features[:, :, 28] = np.array([requests[i].get("sentiment", 0.0) for i in series], dtype=np.float32)[:, None]
+            windows[series] = features
+        return windows
+
+    def infer(self, requests):
+        """
+        Evaluate a batch of request dicts.
+
+        Returns:
+            list: One result dict per request, in order.
+        """
+        from models.rl_model import get_rl_predictions
+        from strategies.ensemble import compute_strategy_votes, combine_ensemble_actions
+        torch = self._torch
+
+        states = np.array([r["state"] for r in requests], dtype=np.float64)
+        if states.ndim != 2:
+            raise ValueError("Every request needs a 'state' vector of the same length.")
+        if self.rl_model is not None:
+            rl_actions = get_rl_predictions(self.rl_model, states)
+        else:
+            rl_actions = np.zeros(len(requests), dtype=np.int8)
+        _, strategy_actions = compute_strategy_votes(states, rng=self.rng)
+        windows = torch.from_numpy(self._transformer_inputs(requests))
+        with torch.inference_mode():
+            decision_logits, profit_output = self.transformer(windows)
+        transformer_actions = self._decision_map[decision_logits.argmax(dim=1)].numpy()
+        profits = profit_output[:, 0].numpy()
+        decisions = combine_ensemble_actions(rl_actions, strategy_actions, transformer_actions, *self.weights,
+                                             threshold=self.threshold)
+        return [
+            {
+                "symbol": r.get("symbol"),
+                "decision": int(decisions[i]),
+                "rl": int(rl_actions[i]),
+                "strategy": int(strategy_actions[i]),
+                "transformer": int(transformer_actions[i]),
+                "profit": float(profits[i]),
+            }
+            for i, r in enumerate(requests)
+        ]
+
+class MicroBatcher:
+    """
+    Coalesces requests submitted from many threads into batches for one worker thread.
+
+    The worker takes the first waiting request, then keeps collecting until either
+    max_batch_size requests are queued or max_latency_ms has passed since that first
+    request arrived, and evaluates them with one call of `infer_batch`.
+
+    Requests failing `validate` are rejected at submit time. If a batch still raises,
+    its requests are retried one by one so only the failing ones get the exception.
+    """
+    def __init__(self, infer_batch, max_batch_size=256, max_latency_ms=5.0, validate=None):
+        self.infer_batch = infer_batch
+        self.validate = validate
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency_ms / 1000.0
+        self._queue = queue.Queue()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, request):
+        """
+        Queue one request; returns a Future resolving to (result, timing dict).
+        """
+        future = Future()
+        if self._stop.is_set():
+            future.set_exception(RuntimeError("MicroBatcher is closed."))
+            return future
+        if self.validate is not None:
+            try:
+                self.validate(request)
+            except Exception as e:
+                future.set_exception(e)
+                return future
+        self._queue.put((request, future, time.perf_counter()))
+        return future
+
+    def _collect(self):
+        try:
+            first = self._queue.get(timeout=0.1)
+        except queue.Empty:
+            return []
+        batch = [first]
+        deadline = first[2] + self.max_latency
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._collect()
+            if not batch:
+                continue
+            start = time.perf_counter()
+            try:
+                results = self.infer_batch([request for request, _, _ in batch])
+            except Exception:
+                results = None
+            if results is None:
+                # Isolate the failing request(s): evaluate the batch item by item.
+                for request, future, submitted in batch:
+                    item_start = time.perf_counter()
+                    try:
+                        result = self.infer_batch([request])[0]
+                    except Exception as e:
+                        future.set_exception(e)
+                        continue
+                    timing = {"queue_ms": (item_start - submitted) * 1e3,
+                              "inference_ms": (time.perf_counter() - item_start) * 1e3, "batch_size": 1}
+                    future.set_result((result, timing))
+                continue
+            inference_ms = (time.perf_counter() - start) * 1e3
+            for (_, future, submitted), result in zip(batch, results):
+                timing = {"queue_ms": (start - submitted) * 1e3, "inference_ms": inference_ms, "batch_size": len(batch)}
+                future.set_result((result, timing))
+
+    def close(self):
+        """
+        Stop the worker; requests still queued fail with RuntimeError.
+        """
+        self._stop.set()
+        self._thread.join()
+        while True:
+            try:
+                _, future, _ = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            future.set_exception(RuntimeError("MicroBatcher closed before the request was evaluated."))
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def _answer(self, request, received):
+        result, timing = self.server.batcher.submit(request).result()
+        return dict(result, timing=dict(timing, server_ms=(time.perf_counter() - received) * 1e3))
+
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            received = time.perf_counter()
+            try:
+                message = json.loads(line)
+                if "requests" in message:
+                    # Submit the whole list before waiting so it lands in as few batches as possible.
+                    futures = [self.server.batcher.submit(r) for r in message["requests"]]
+                    results = []
+                    for request, future in zip(message["requests"], futures):
+                        try:
+                            result, timing = future.result()
+                        except Exception as e:
+                            results.append({"symbol": request.get("symbol"), "error": f"{type(e).__name__}: {e}"})
+                            continue
+                        results.append(dict(result, timing=dict(timing, server_ms=(time.perf_counter() - received) * 1e3)))
+                    response = {"results": results}
+                else:
+                    response = self._answer(message, received)
+            except Exception as e:
+                response = {"error": f"{type(e).__name__}: {e}"}
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+            self.wfile.flush()
+
+class _ThreadingUnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+class _ThreadingTCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+class InferenceServer:
+    """
+    Persistent local inference server keeping the models warm between requests.
+
+    Listens on a Unix socket (address is a path) or on TCP (address is (host, port);
+    use localhost). Every connection is served by its own thread; all of them feed one
+    MicroBatcher, so concurrent per-symbol requests share forward passes. Everything
+    runs offline: models are loaded from local files once at start-up.
+    """
+    def __init__(self, engine, address="/tmp/straddleai_inference.sock", max_batch_size=256, max_latency_ms=5.0):
+        self.engine = engine
+        self.address = address
+        if isinstance(address, str):
+            if os.path.exists(address):
+                os.remove(address)
+            self._server = _ThreadingUnixServer(address, _RequestHandler)
+        else:
+            self._server = _ThreadingTCPServer(tuple(address), _RequestHandler)
+        self._server.batcher = MicroBatcher(engine.infer, max_batch_size, max_latency_ms,
+                                            validate=getattr(engine, "validate", None))
+        self._thread = None
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def start(self):
+        """
+        Serve in a background thread and return immediately.
+        """
+        self._thread = threading.Thread(target=self.serve_forever, name="inference-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def shutdown(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._server.batcher.close()
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.remove(self.address)
+
+class InferenceClient:
+    """
+    Client for InferenceServer. One client holds one connection; use one per thread.
+    """
+    def __init__(self, address="/tmp/straddleai_inference.sock", timeout=30.0):
+        if isinstance(address, str):
+            self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            address = tuple(address)
+        self._sock.settimeout(timeout)
+        self._sock.connect(address)
+        self._file = self._sock.makefile("rwb")
+
+    def _call(self, message):
+        self._file.write(json.dumps(message).encode() + b"\n")
+        self._file.flush()
+        response = json.loads(self._file.readline())
+        if "error" in response:
+            raise RuntimeError(response["error"])
+        return response
+
+    def decide(self, symbol, state, rsi=None, returns=None, sentiment=0.0, window=None):
+        """
+        Request one ensemble decision.
+
+        Parameters:
+            symbol (str): Ticker symbol (echoed back).
+            state (list): [close, SMA_10, RSI_14] for the latest bar.
+            rsi, returns (list): RSI_14 and return of the last `lookback` bars.
+            sentiment (float): Sentiment score.
+            window (list, optional): Ready-made lookback x 29 transformer input instead.
+
+        Returns:
+            dict: decision, component decisions, profit estimate and timing (ms).
+        """
+        return self._call(self._request(symbol, state, rsi, returns, sentiment, window))
+
+    def decide_many(self, requests):
+        """
+        Request decisions for many symbols in one round trip.
+
+        Parameters:
+            requests (list): Dicts with the keyword arguments of decide().
+
+        Returns:
+            list: One result dict per request, in order; a request that failed has an
+                  "error" entry instead of a decision.
+        """
+        return self._call({"requests": [self._request(**r) for r in requests]})["results"]
+
+    @staticmethod
+    def _request(symbol, state, rsi=None, returns=None, sentiment=0.0, window=None):
+        request = {"symbol": symbol, "state": [float(x) for x in state]}
+        if window is not None:
+            request["window"] = np.asarray(window, dtype=np.float32).tolist()
+        else:
+            request.update(rsi=[float(x) for x in rsi], returns=[float(x) for x in returns], sentiment=float(sentiment))
+        return request
+
+    def close(self):
+        self._file.close()
+        self._sock.close()
+
+if __name__ == "__main__":
+    # Example usage: serve on a Unix socket and request decisions for a few symbols.
+    rng = np.random.default_rng(0)
+    server = InferenceServer(InferenceEngine(seed=0), max_latency_ms=2.0).start()
+    client = InferenceClient()
+    print(client.decide("AAPL", [135.0, 130.0, 55.0], rsi=rng.uniform(30, 70, 20), returns=rng.normal(0, 0.01, 20)))
+    symbols = [{"symbol": f"SYM{i}", "state": [135.0, 130.0, 55.0], "rsi": rng.uniform(30, 70, 20),
+                "returns": rng.normal(0, 0.01, 20)} for i in range(200)]
+    start = time.perf_counter()
+    results = client.decide_many(symbols)
+    print(f"{len(results)} decisions in {(time.perf_counter() - start) * 1e3:.1f} ms; "
+          f"batch sizes: {sorted({r['timing']['batch_size'] for r in results})}")
+    client.close()
+    server.shutdown()
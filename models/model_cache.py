@@ -0,0 +1,157 @@
+# model_cache.py
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+
+# Layout:
+#   <cache_dir>/<key>/<data digest>.zip   model saved with model.save
+#   <cache_dir>/<key>/<data digest>.json  rows, digest, total timesteps trained, parent entry
+# <key> hashes the feature schema and the hyperparameters; entries under one key differ
+# only in the data they were trained on.
+CACHE_VERSION = 1
+
+def data_digest(X, returns, rows=None):
+    """
+    SHA-256 of the first `rows` rows (default: all) of X and returns, including shape and dtype.
+    """
+    rows = len(X) if rows is None else rows
+    h = hashlib.sha256()
+    for array in (X[:rows], returns[:rows]):
+        array = np.ascontiguousarray(array)
+        h.update(f"{array.dtype.str}{array.shape}".encode())
+        h.update(memoryview(array).cast("B"))
+    return h.hexdigest()
+
+def model_cache_key(X, hyperparams, feature_names=None):
+    """
+    Hash of the feature schema (column count, dtype, optional names) and the training
+    hyperparameters, identifying which cached models are interchangeable.
+    """
+    schema = {
+        "version": CACHE_VERSION,
+        "n_features": int(X.shape[1]),
+        "dtype": np.asarray(X).dtype.str,
+        "feature_names": list(feature_names) if feature_names is not None else None,
+        "hyperparams": hyperparams,
+    }
+    return hashlib.sha256(json.dumps(schema, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+def list_cache_entries(cache_dir, key):
+    """
+    Return the metadata of every model cached under `key`, largest training set first.
+    """
+    key_dir = os.path.join(cache_dir, key)
+    if not os.path.isdir(key_dir):
+        return []
+    entries = []
+    for name in os.listdir(key_dir):
+        if name.endswith(".json"):
+            with open(os.path.join(key_dir, name)) as f:
+                meta = json.load(f)
+            if os.path.exists(os.path.join(key_dir, meta["digest"] + ".zip")):
+                entries.append(meta)
+    return sorted(entries, key=lambda m: (m["rows"], m["created"]), reverse=True)
+
+def find_cached_model(cache_dir, key, X, returns):
+    """
+    Find the best starting point in the cache for training on (X, returns).
+
+    Returns:
+        tuple: (metadata, exact) - an entry trained on exactly this data (exact=True), or
+               the entry trained on the longest prefix of it (exact=False), or (None, False).
+    """
+    digest = data_digest(X, returns)
+    entries = list_cache_entries(cache_dir, key)
+    for meta in entries:
+        if meta["rows"] == len(X) and meta["digest"] == digest:
+            return meta, True
+    for meta in entries:
+        if meta["rows"] < len(X) and meta["digest"] == data_digest(X, returns, meta["rows"]):
+            return meta, False
+    return None, False
+
+def _save_entry(model, cache_dir, key, meta, max_entries):
+    key_dir = os.path.join(cache_dir, key)
+    os.makedirs(key_dir, exist_ok=True)
+    model.save(os.path.join(key_dir, meta["digest"] + ".zip"))
+    path = os.path.join(key_dir, meta["digest"] + ".json")
+    with open(path + ".tmp", "w") as f:
+        json.dump(meta, f, indent=1)
+    os.replace(path + ".tmp", path)
+    # Keep only the newest entries per key; older prefixes are superseded by their extensions.
+    for old in sorted(list_cache_entries(cache_dir, key), key=lambda m: m["created"], reverse=True)[max_entries:]:
+        for ext in (".zip", ".json"):
+            try:
+                os.remove(os.path.join(key_dir, old["digest"] + ext))
+            except FileNotFoundError:
+                pass
+
+def load_or_train_cached_rl_model(X, returns, cache_dir, initial_balance=10000, total_timesteps=50000,
+                                  learning_rate=1e-3, n_envs=None, feature_names=None, finetune_context=500,
+                                  min_finetune_timesteps=1000, max_entries=3):
+    """
+    Content-addressed version of load_or_train_rl_model.
+
+    - Cached model trained on exactly this data and these settings: load it.
+    - Cached model trained on a prefix of this data (only new bars were appended): load
+      it and fine-tune on the new bars plus `finetune_context` preceding rows, for a
+      share of total_timesteps proportional to the new rows (at least
+      min_finetune_timesteps), continuing its timestep counter.
+    - Otherwise: train from scratch.
+    Every newly trained or fine-tuned model is stored under its data digest.
+
+    Parameters:
+        X (np.array): Feature array (shape: [num_steps, num_features]).
+        returns (np.array): Array of returns for each time step.
+        cache_dir (str): Cache root directory.
+        feature_names (list, optional): Column names of X, made part of the cache key.
+        finetune_context (int): Rows before the new bars to include when fine-tuning.
+        min_finetune_timesteps (int): Lower bound on fine-tuning timesteps.
+        max_entries (int): Cached models kept per key.
+
+    Returns:
+        DQN: The loaded, fine-tuned or newly trained model.
+    """
+    from stable_baselines3 import DQN
+    from models.rl_model import make_env, train_rl_model
+
+    X = np.asarray(X)
+    returns = np.asarray(returns)
+    hyperparams = {"initial_balance": initial_balance, "total_timesteps": total_timesteps,
+                   "learning_rate": learning_rate, "n_envs": n_envs}
+    key = model_cache_key(X, hyperparams, feature_names)
+    meta, exact = find_cached_model(cache_dir, key, X, returns)
+    key_dir = os.path.join(cache_dir, key)
+
+    if meta is not None and exact:
+        print(f"Loading cached model {key}/{meta['digest'][:12]} ({meta['rows']} rows)")
+        return DQN.load(os.path.join(key_dir, meta["digest"] + ".zip"), env=make_env(X, returns, initial_balance, n_envs=n_envs))
+
+    start = time.perf_counter()
+    if meta is not None:
+        new_rows = len(X) - meta["rows"]
+        first = max(0, meta["rows"] - finetune_context)
+        env = make_env(X[first:], returns[first:], initial_balance, n_envs=n_envs)
+        timesteps = max(min_finetune_timesteps, int(round(total_timesteps * new_rows / len(X))))
+        print(f"Fine-tuning cached model ({meta['rows']} rows) on {new_rows} new rows for {timesteps} timesteps...")
+        model = DQN.load(os.path.join(key_dir, meta["digest"] + ".zip"), env=env)
+        model.learn(total_timesteps=timesteps, reset_num_timesteps=False)
+        parent = meta["digest"]
+    else:
+        print("No cached model for this data. Training a new model...")
+        model = train_rl_model(X, returns, initial_balance, total_timesteps, learning_rate, n_envs=n_envs)
+        parent = None
+
+    new_meta = {
+        "digest": data_digest(X, returns),
+        "rows": len(X),
+        "timesteps": int(model.num_timesteps),
+        "parent": parent,
+        "train_seconds": time.perf_counter() - start,
+        "created": time.time(),
+    }
+    _save_entry(model, cache_dir, key, new_meta, max_entries)
+    return model
@@ -4,8 +4,8 @@ import gym
 from gym import spaces
 import numpy as np
 import random
-from stable_baselines3 import DQN
-from stable_baselines3.common.vec_env import DummyVecEnv
+# torch and stable_baselines3 are imported where they are used: together they account for
+# most of this module's import time, and the environment itself only needs gym.
 
 class TradingEnv(gym.Env):
     """
@@ -77,35 +77,64 @@ class TradingEnv(gym.Env):
     def render(self, mode='human'):
         print(f"Step: {self.current_step}, Balance: {self.balance:.2f}")
 
-def make_env(X, returns, initial_balance=10000):
+def make_env(X, returns, initial_balance=10000, n_envs=None, seed=None):
     """
     Create a TradingEnv instance and wrap it with DummyVecEnv.
+
+    If n_envs is given, return a VectorizedTradingEnv (models/vec_trading_env.py) stepping
+    n_envs episodes at once over shared float32 arrays instead.
     """
+    if n_envs is not None:
+        from models.vec_trading_env import VectorizedTradingEnv
+        return VectorizedTradingEnv(X, returns, n_envs=n_envs, initial_balance=initial_balance, seed=seed)
+    from stable_baselines3.common.vec_env import DummyVecEnv
     env = TradingEnv(X, returns, initial_balance=initial_balance)
     env = DummyVecEnv([lambda: env])
     return env
 
-def train_rl_model(X, returns, initial_balance=10000, total_timesteps=50000, learning_rate=1e-3):
+def train_rl_model(X, returns, initial_balance=10000, total_timesteps=50000, learning_rate=1e-3, n_envs=None, env=None,
+                   verbose=1, **dqn_kwargs):
     """
     Train a DQN agent on the TradingEnv.
+
+    n_envs selects the vectorized environment (see make_env); a ready-made VecEnv can also
+    be passed as `env`. With N environments every DQN step collects N transitions, so the
+    same total_timesteps takes N times fewer environment calls. DQN's train_freq counts
+    those steps, so gradient_steps defaults to N to keep one gradient update per
+    4 transitions as with a single environment; pass gradient_steps=1 to do N times
+    fewer updates (faster, but not equivalent training). Extra keyword arguments (seed,
+    buffer_size, ...) are passed to the DQN constructor.
     """
-    env = make_env(X, returns, initial_balance)
-    model = DQN("MlpPolicy", env, verbose=1, learning_rate=learning_rate)
+    from stable_baselines3 import DQN
+    if env is None:
+        env = make_env(X, returns, initial_balance, n_envs=n_envs, seed=dqn_kwargs.get("seed"))
+    dqn_kwargs.setdefault("gradient_steps", env.num_envs)
+    model = DQN("MlpPolicy", env, verbose=verbose, learning_rate=learning_rate, **dqn_kwargs)
     model.learn(total_timesteps=total_timesteps)
     return model
 
 def load_or_train_rl_model(X, returns, initial_balance=10000, total_timesteps=50000,
-                           learning_rate=1e-3, model_path="models/trained_rl_model_final.zip"):
+                           learning_rate=1e-3, model_path="models/trained_rl_model_final.zip", n_envs=None,
+                           cache_dir=None, feature_names=None):
     """
     Load a pre-trained DQN model from disk if it exists; otherwise, train a new one and save it.
+
+    If cache_dir is given, model_path is not used: models are cached by a hash of the
+    feature schema, the hyperparameters and the data, and a model trained on a prefix of
+    the data is fine-tuned on the new bars instead of retraining (see models/model_cache.py).
     """
-    env = make_env(X, returns, initial_balance)
+    if cache_dir is not None:
+        from models.model_cache import load_or_train_cached_rl_model
+        return load_or_train_cached_rl_model(X, returns, cache_dir, initial_balance, total_timesteps,
+                                             learning_rate, n_envs=n_envs, feature_names=feature_names)
+    from stable_baselines3 import DQN
+    env = make_env(X, returns, initial_balance, n_envs=n_envs)
     if os.path.exists(model_path):
         print(f"Loading pre-trained model from {model_path}")
         model = DQN.load(model_path, env=env)
     else:
         print("No pre-trained model found. Training a new model...")
-        model = train_rl_model(X, returns, initial_balance, total_timesteps, learning_rate)
+        model = train_rl_model(X, returns, initial_balance, total_timesteps, learning_rate, env=env)
         model.save(model_path)
     return model
 
@@ -131,6 +160,39 @@ def get_rl_prediction(model, state):
         raise ValueError(f"Unexpected RL action: {action}")
     return mapped_action
 
+# DQN action index {0: Sell, 1: Hold, 2: Buy} -> trading direction {-1, 0, 1}.
+RL_ACTION_MAP = np.array([-1, 0, 1], dtype=np.int8)
+
+def get_rl_predictions(model, states, batch_size=4096):
+    """
+    Batch version of get_rl_prediction over a whole feature matrix.
+
+    Evaluates the DQN's Q-network directly on chunks of `states` in one no-grad forward
+    per chunk and takes the greedy action, which is what model.predict(...,
+    deterministic=True) does for a Box observation space, without the per-call
+    preprocessing overhead.
+
+    Parameters:
+        model: Trained DQN model.
+        states (np.array): State matrix of shape (N, features).
+        batch_size (int): Rows per forward pass.
+
+    Returns:
+        np.array: int8 array of mapped actions (-1, 0, or 1), one per row.
+    """
+    import torch
+    states = np.asarray(states, dtype=np.float32)
+    if states.ndim == 1:
+        states = states.reshape(1, -1)
+    model.policy.set_training_mode(False)
+    actions = np.empty(len(states), dtype=np.int64)
+    with torch.no_grad():
+        for start in range(0, len(states), batch_size):
+            obs = torch.as_tensor(states[start:start + batch_size], device=model.device)
+            q_values = model.q_net(obs)
+            actions[start:start + batch_size] = q_values.argmax(dim=1).cpu().numpy()
+    return RL_ACTION_MAP[actions]
+
 if __name__ == "__main__":
     # --- Example usage: simulate dummy data for demonstration.
     dummy_X = np.random.uniform(low=100, high=200, size=(100, 3))
@@ -0,0 +1,186 @@
+# rl_sweep.py
+import itertools
+import multiprocessing
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+# Set in each worker process by _init_worker.
+_WORKER_ARRAYS = {}
+
+def build_sweep_grid(seeds=(0,), learning_rates=(1e-3,), buffer_sizes=(1000000,), feature_subsets=None):
+    """
+    Cartesian product of candidate settings as a list of config dicts.
+
+    Parameters:
+        seeds (iterable): Random seeds.
+        learning_rates (iterable): DQN learning rates.
+        buffer_sizes (iterable): Replay buffer sizes.
+        feature_subsets (iterable of tuples, optional): Column indices of X to train on;
+            default is all columns.
+
+    Returns:
+        list: One dict per candidate with keys seed, learning_rate, buffer_size, features.
+    """
+    feature_subsets = [None] if feature_subsets is None else [tuple(f) for f in feature_subsets]
+    return [
+        {"seed": seed, "learning_rate": lr, "buffer_size": buffer_size, "features": features}
+        for features, lr, buffer_size, seed in itertools.product(feature_subsets, learning_rates, buffer_sizes, seeds)
+    ]
+
+def _share_array(array):
+    """
+    Copy an array into a new shared memory block; returns (block, spec for _attach_array).
+    """
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+    return block, {"name": block.name, "shape": array.shape, "dtype": array.dtype.str}
+
+def _attach_array(spec):
+    # Pool workers share the parent's resource tracker, so the parent's unlink covers this too.
+    block = shared_memory.SharedMemory(name=spec["name"])
+    array = np.ndarray(spec["shape"], dtype=np.dtype(spec["dtype"]), buffer=block.buf)
+    array.flags.writeable = False
+    return block, array
+
+def _init_worker(specs, torch_threads):
+    import torch
+    torch.set_num_threads(torch_threads)
+    for key, spec in specs.items():
+        _WORKER_ARRAYS[key] = _attach_array(spec)
+
+def _train_candidate(index, config, split, total_timesteps, n_envs, initial_balance, scaling, sweep_dir):
+    from models.rl_model import train_rl_model, get_rl_predictions
+    from risk.risk_management import compute_sharpe_ratio, compute_max_drawdown
+
+    X = _WORKER_ARRAYS["X"][1]
+    returns = _WORKER_ARRAYS["returns"][1]
+    if config["features"] is not None:
+        X = X[:, list(config["features"])]
+
+    start = time.perf_counter()
+    model = train_rl_model(X[:split], returns[:split], initial_balance, total_timesteps,
+                           learning_rate=config["learning_rate"], n_envs=n_envs, verbose=0,
+                           seed=config["seed"], buffer_size=config["buffer_size"])
+    train_seconds = time.perf_counter() - start
+
+    # Out-of-sample backtest: trade every test bar at the model's greedy action.
+    actions = get_rl_predictions(model, X[split:])
+    pnl = actions * returns[split:] * scaling
+    balance_history = initial_balance + np.concatenate(([0.0], np.cumsum(pnl)))
+    model_path = os.path.join(sweep_dir, f"candidate_{index:04d}.zip")
+    model.save(model_path)
+    return {
+        "candidate": index,
+        **config,
+        "oos_pnl": float(balance_history[-1] - initial_balance),
+        "oos_sharpe": float(compute_sharpe_ratio(balance_history)),
+        "oos_max_drawdown": float(compute_max_drawdown(balance_history)),
+        "oos_trades": int(np.count_nonzero(actions)),
+        "train_seconds": train_seconds,
+        "model_path": model_path,
+    }
+
+def run_rl_sweep(X, returns, configs, test_fraction=0.2, total_timesteps=50000, n_envs=None, initial_balance=10000,
+                 scaling=1000, max_workers=None, torch_threads=1, sweep_dir="models/rl_sweep",
+                 model_path="models/rl_sweep/best_model.zip", keep_candidates=False):
+    """
+    Train many DQN candidates in parallel and rank them by out-of-sample P&L.
+
+    X and returns are copied once into shared memory; worker processes map them
+    read-only instead of receiving a pickled copy per task. Each candidate trains on the
+    first (1 - test_fraction) of the rows and is backtested on the rest (greedy actions,
+    P&L = action * return * scaling). The winner is copied to model_path, which by default
+    stays inside the untracked sweep directory; pass
+    model_path="models/trained_rl_model_final.zip" to have load_or_train_rl_model pick it
+    up. A candidate that fails is listed with its exception in the "error" column instead
+    of aborting the sweep.
+
+    Parameters:
+        X (np.array): Feature array (shape: [num_steps, num_features]).
+        returns (np.array): Array of returns for each time step.
+        configs (list): Candidate configs, e.g. from build_sweep_grid.
+        test_fraction (float): Share of rows held out for the backtest.
+        total_timesteps (int): Training timesteps per candidate.
+        n_envs (int, optional): Use the vectorized environment with this many episodes.
+        initial_balance (float): Starting balance for training and the backtest.
+        scaling (float): Scaling factor to convert returns into monetary terms.
+        max_workers (int, optional): Worker processes (default: CPU count).
+        torch_threads (int): torch threads per worker (keep at 1 when workers fill all cores).
+        sweep_dir (str): Directory for candidate models.
+        model_path (str, optional): Where the best model is copied (None: not copied).
+        keep_candidates (bool): Keep every candidate's model file in sweep_dir.
+
+    Returns:
+        DataFrame: Leaderboard, best candidate first and failed candidates last.
+    """
+    if not configs:
+        raise ValueError("No candidate configs given.")
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    returns = np.ascontiguousarray(returns, dtype=np.float32)
+    split = int(len(X) * (1 - test_fraction))
+    if split < 4 or split >= len(X):
+        raise ValueError("test_fraction leaves too little data for training or testing.")
+    os.makedirs(sweep_dir, exist_ok=True)
+    max_workers = max_workers or os.cpu_count() or 1
+
+    blocks, specs = [], {}
+    try:
+        for key, array in (("X", X), ("returns", returns)):
+            block, specs[key] = _share_array(array)
+            blocks.append(block)
+        results = []
+        # spawn: forked workers would inherit the parent's torch thread pools.
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=context, initializer=_init_worker,
+                                 initargs=(specs, torch_threads)) as executor:
+            futures = {
+                executor.submit(_train_candidate, i, config, split, total_timesteps, n_envs,
+                                initial_balance, scaling, sweep_dir): (i, config)
+                for i, config in enumerate(configs)
+            }
+            for future in as_completed(futures):
+                try:
+                    result = dict(future.result(), error=None)
+                except Exception as e:
+                    index, config = futures[future]
+                    print(f"Candidate {index} failed: {e!r}")
+                    results.append({"candidate": index, **config, "oos_pnl": np.nan, "model_path": None,
+                                    "error": repr(e)})
+                    continue
+                print(f"Candidate {result['candidate']}: oos_pnl={result['oos_pnl']:.2f} "
+                      f"({result['train_seconds']:.1f}s)")
+                results.append(result)
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+    leaderboard = (pd.DataFrame(results).sort_values(["oos_pnl", "candidate"], ascending=[False, True],
+                                                     na_position="last").reset_index(drop=True))
+    succeeded = leaderboard[leaderboard["error"].isna()]
+    if not len(succeeded):
+        print("Every candidate failed; no model saved.")
+    elif model_path is not None:
+        best = succeeded.iloc[0]
+        os.makedirs(os.path.dirname(model_path) or ".", exist_ok=True)
+        shutil.copyfile(best["model_path"], model_path)
+        print(f"Best candidate {best['candidate']} saved to {model_path}")
+    if not keep_candidates:
+        for path in succeeded["model_path"]:
+            os.remove(path)
+        leaderboard["model_path"] = None
+    return leaderboard
+
+if __name__ == "__main__":
+    # Example usage: sweep seeds and learning rates on dummy data.
+    dummy_X = np.random.uniform(low=100, high=200, size=(2000, 3))
+    dummy_returns = np.random.uniform(low=-0.01, high=0.01, size=2000)
+    grid = build_sweep_grid(seeds=(0, 1), learning_rates=(1e-3, 1e-4), feature_subsets=[(0, 1, 2), (0, 2)])
+    board = run_rl_sweep(dummy_X, dummy_returns, grid, total_timesteps=5000, n_envs=8)
+    print(board.drop(columns="model_path"))
@@ -0,0 +1,240 @@
+# transformer_export.py
+import copy
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+
+from models.transformer_model import TransformerMetaModelWithProfit
+
+DEFAULT_BATCH_SIZES = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+def build_fastpath_model(model):
+    """
+    Copy a TransformerMetaModelWithProfit into an eval-mode, batch_first model.
+
+    With batch_first=True, eval mode and no autograd (torch.inference_mode), PyTorch runs
+    nn.TransformerEncoder through its fused "fast path" kernels. Weights are copied as-is.
+
+    Returns:
+        TransformerMetaModelWithProfit: Inference copy of the model.
+    """
+    config = dict(model.config, batch_first=True)
+    fast = TransformerMetaModelWithProfit(**config)
+    fast.load_state_dict(model.state_dict())
+    return fast.eval()
+
+class _DecomposedEncoderLayer(nn.Module):
+    """
+    Inference-only equivalent of nn.TransformerEncoderLayer (post-norm, ReLU) whose
+    attention projections are plain nn.Linear modules, so dynamic quantization reaches
+    them (nn.MultiheadAttention keeps its input projection as a raw parameter).
+    """
+    def __init__(self, layer):
+        super(_DecomposedEncoderLayer, self).__init__()
+        attn = layer.self_attn
+        embed_dim = attn.embed_dim
+        self.nhead = attn.num_heads
+        self.in_proj = nn.Linear(embed_dim, 3 * embed_dim)
+        self.in_proj.weight.data.copy_(attn.in_proj_weight.data)
+        self.in_proj.bias.data.copy_(attn.in_proj_bias.data)
+        self.out_proj = nn.Linear(embed_dim, embed_dim)
+        self.out_proj.load_state_dict(attn.out_proj.state_dict())
+        self.linear1, self.linear2 = layer.linear1, layer.linear2
+        self.norm1, self.norm2 = layer.norm1, layer.norm2
+
+    def forward(self, x):
+        # x: (batch, seq_len, embed_dim)
+        batch, seq_len, embed_dim = x.shape
+        qkv = self.in_proj(x).view(batch, seq_len, 3, self.nhead, embed_dim // self.nhead)
+        q, k, v = qkv.permute(2, 0, 3, 1, 4)
+        attn = F.scaled_dot_product_attention(q, k, v)
+        attn = attn.transpose(1, 2).reshape(batch, seq_len, embed_dim)
+        x = self.norm1(x + self.out_proj(attn))
+        return self.norm2(x + self.linear2(F.relu(self.linear1(x))))
+
+class _DecomposedMetaModel(nn.Module):
+    """
+    Inference-only, batch-first re-implementation of TransformerMetaModelWithProfit built
+    from nn.Linear layers only (see _DecomposedEncoderLayer).
+    """
+    def __init__(self, model):
+        super(_DecomposedMetaModel, self).__init__()
+        self.embedding = model.embedding
+        self.register_buffer('pe', model.pos_encoder.pe.clone())
+        self.layers = nn.ModuleList(_DecomposedEncoderLayer(layer) for layer in model.transformer_encoder.layers)
+        self.fc_decision = model.fc_decision
+        self.fc_profit = model.fc_profit
+
+    def forward(self, x):
+        x = self.embedding(x) + self.pe[:, :x.size(1)]
+        for layer in self.layers:
+            x = layer(x)
+        pooled = x.mean(dim=1)
+        return self.fc_decision(pooled), self.fc_profit(pooled)
+
+def build_quantized_model(model):
+    """
+    Dynamic int8 quantization of every Linear layer, including the attention projections.
+
+    The model is first rebuilt as _DecomposedMetaModel so the attention input/output
+    projections are nn.Linear modules, then torch.ao.quantization.quantize_dynamic
+    converts all of them (embedding, Q/K/V and output projections, feed-forward layers and
+    both heads) to int8 weights with dynamically quantized activations.
+
+    Returns:
+        nn.Module: Quantized eval-mode model with the same (decision_logits, profit) outputs.
+    """
+    decomposed = _DecomposedMetaModel(copy.deepcopy(model).eval()).eval()
+    return torch.ao.quantization.quantize_dynamic(decomposed, {nn.Linear}, dtype=torch.qint8)
+
+def trace_model(model, lookback=20, path=None):
+    """
+    TorchScript-trace a model on a (1, lookback, input_dim) example and optionally save it.
+
+    The trace is taken under torch.no_grad on an eval-mode copy (the caller's model keeps
+    its training flag); traced models accept any batch size.
+
+    Returns:
+        torch.jit.ScriptModule: Traced (and frozen) model.
+    """
+    model = copy.deepcopy(model).eval()
+    input_dim = model.embedding.in_features
+    example = torch.zeros(1, lookback, input_dim)
+    with torch.no_grad():
+        traced = torch.jit.freeze(torch.jit.trace(model, example, check_trace=False))
+    if path is not None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        torch.jit.save(traced, path)
+    return traced
+
+def load_traced_model(path):
+    """
+    Load a TorchScript model saved by trace_model for CPU serving.
+    """
+    return torch.jit.load(path, map_location="cpu").eval()
+
+def compile_model(model, mode="max-autotune-no-cudagraphs"):
+    """
+    Wrap an eval-mode copy of a model with torch.compile (dynamic batch dimension).
+    """
+    return torch.compile(copy.deepcopy(model).eval(), mode=mode, dynamic=True)
+
+def check_parity(reference, candidate, lookback=20, batch_size=256, atol=1e-4, seed=0):
+    """
+    Compare a serving variant against the eager model on random inputs.
+
+    Parameters:
+        reference (nn.Module): Eager fp32 model (evaluated in eval mode).
+        candidate (callable): Exported/optimised model.
+        atol (float): Tolerance on logits and profit outputs for `ok`.
+
+    Returns:
+        dict: max_logit_diff, max_profit_diff, decision_agreement and ok.
+    """
+    generator = torch.Generator().manual_seed(seed)
+    x = torch.randn(batch_size, lookback, reference.embedding.in_features, generator=generator)
+    was_training = reference.training
+    reference.eval()
+    try:
+        with torch.inference_mode():
+            ref_logits, ref_profit = reference(x)
+            logits, profit = candidate(x)
+    finally:
+        reference.train(was_training)
+    logit_diff = (logits - ref_logits).abs().max().item()
+    profit_diff = (profit - ref_profit).abs().max().item()
+    agreement = (logits.argmax(dim=1) == ref_logits.argmax(dim=1)).float().mean().item()
+    return {
+        "max_logit_diff": logit_diff,
+        "max_profit_diff": profit_diff,
+        "decision_agreement": agreement,
+        "ok": logit_diff <= atol and profit_diff <= atol,
+    }
+
+def benchmark_inference(models, lookback=20, batch_sizes=DEFAULT_BATCH_SIZES, repeats=20, warmup=3, num_threads=None):
+    """
+    Latency/throughput report for one or more model variants on CPU.
+
+    Parameters:
+        models (dict): Variant name -> callable model.
+        lookback (int): Window length of the synthetic inputs.
+        batch_sizes (iterable): Batch sizes to measure (1 to 1024 by default).
+        repeats (int): Timed forward passes per (variant, batch size); the median is reported.
+        warmup (int): Untimed passes first (tracing/compilation, allocator warm-up).
+        num_threads (int, optional): torch.set_num_threads for the run.
+
+    Returns:
+        DataFrame: One row per (variant, batch_size) with median and p90 latency in ms and
+                   windows per second.
+    """
+    if num_threads is not None:
+        torch.set_num_threads(num_threads)
+    rows = []
+    for name, model in models.items():
+        input_dim = model.embedding.in_features if hasattr(model, "embedding") else 29
+        for batch_size in batch_sizes:
+            x = torch.randn(batch_size, lookback, input_dim)
+            timings = []
+            with torch.inference_mode():
+                for i in range(warmup + repeats):
+                    start = time.perf_counter()
+                    model(x)
+                    if i >= warmup:
+                        timings.append(time.perf_counter() - start)
+            median = float(np.median(timings))
+            rows.append({
+                "variant": name,
+                "batch_size": batch_size,
+                "latency_ms": median * 1e3,
+                "p90_latency_ms": float(np.percentile(timings, 90)) * 1e3,
+                "windows_per_s": batch_size / median,
+            })
+    return pd.DataFrame(rows)
+
+def export_transformer_for_cpu(model, out_dir="models/export", lookback=20, batch_sizes=DEFAULT_BATCH_SIZES,
+                               use_compile=False, repeats=20):
+    """
+    Build the CPU serving variants of a TransformerMetaModelWithProfit, check them against
+    the eager model and report latency/throughput.
+
+    Variants:
+      - eager:      an eval-mode copy of the original model (baseline)
+      - fastpath:   batch_first copy using nn.TransformerEncoder's fused inference path
+      - torchscript: traced + frozen fast-path model (saved to out_dir/transformer_traced.pt)
+      - int8:       dynamic int8 quantization of all Linear and attention projections
+      - compiled:   torch.compile of the fast-path model (only if use_compile=True)
+
+    Returns:
+        tuple: (parity dict per variant, benchmark DataFrame)
+    """
+    # An eval-mode copy, so the caller's (possibly shared) model keeps its training flag.
+    eager = copy.deepcopy(model).eval()
+    fast = build_fastpath_model(model)
+    variants = {
+        "eager": eager,
+        "fastpath": fast,
+        "torchscript": trace_model(fast, lookback, path=os.path.join(out_dir, "transformer_traced.pt")),
+        "int8": build_quantized_model(model),
+    }
+    if use_compile:
+        variants["compiled"] = compile_model(build_fastpath_model(model))
+
+    parity = {}
+    for name, variant in variants.items():
+        # int8 weights/activations are not bit-exact; judge them on decision agreement too.
+        atol = 5e-2 if name == "int8" else 1e-4
+        parity[name] = check_parity(eager, variant, lookback=lookback, atol=atol)
+        print(f"Parity {name}: {parity[name]}")
+    report = benchmark_inference(variants, lookback=lookback, batch_sizes=batch_sizes, repeats=repeats)
+    print(report.pivot(index="batch_size", columns="variant", values="latency_ms").round(3))
+    return parity, report
+
+if __name__ == "__main__":
+    # Example usage: export the meta-model and print the parity and latency reports.
+    from models.transformer_model import get_transformer_model
+    export_transformer_for_cpu(get_transformer_model(), batch_sizes=(1, 16, 256, 1024), repeats=10)
@@ -31,7 +31,7 @@ class PositionalEncoding(nn.Module):
         return self.dropout(x)
 
 class TransformerMetaModelWithProfit(nn.Module):
-    def __init__(self, input_dim=29, embed_dim=64, nhead=8, num_layers=3, dropout=0.1, num_classes=3):
+    def __init__(self, input_dim=29, embed_dim=64, nhead=8, num_layers=3, dropout=0.1, num_classes=3, batch_first=False):
         """
         Transformer meta‑model that fuses multiple signals to produce a trading decision 
         and an estimated profitability.
@@ -43,11 +43,18 @@ class TransformerMetaModelWithProfit(nn.Module):
             num_layers (int): Number of transformer encoder layers.
             dropout (float): Dropout rate.
             num_classes (int): Number of classes for classification (e.g., 3 for Sell, Hold, Buy).
+            batch_first (bool): Run the encoder on (batch, seq, embed) tensors. Required for
+                PyTorch's fused inference fast path; the parameters are the same either way,
+                so state dicts load into both layouts.
         """
         super(TransformerMetaModelWithProfit, self).__init__()
+        self.config = dict(input_dim=input_dim, embed_dim=embed_dim, nhead=nhead, num_layers=num_layers,
+                           dropout=dropout, num_classes=num_classes, batch_first=batch_first)
+        self.batch_first = batch_first
         self.embedding = nn.Linear(input_dim, embed_dim)
         self.pos_encoder = PositionalEncoding(embed_dim, dropout)
-        encoder_layer = nn.TransformerEncoderLayer(d_model=embed_dim, nhead=nhead, dropout=dropout)
+        encoder_layer = nn.TransformerEncoderLayer(d_model=embed_dim, nhead=nhead, dropout=dropout,
+                                                   batch_first=batch_first)
         self.transformer_encoder = nn.TransformerEncoder(encoder_layer, num_layers=num_layers)
         self.fc_decision = nn.Linear(embed_dim, num_classes)  # Classification head (decision)
         self.fc_profit = nn.Linear(embed_dim, 1)              # Regression head (profitability)
@@ -65,15 +72,41 @@ class TransformerMetaModelWithProfit(nn.Module):
         """
         x = self.embedding(x)           # (batch, seq_len, embed_dim)
         x = self.pos_encoder(x)         # (batch, seq_len, embed_dim)
-        x = x.transpose(0, 1)           # (seq_len, batch, embed_dim) for transformer
-        transformer_out = self.transformer_encoder(x)  # (seq_len, batch, embed_dim)
-        pooled = transformer_out.mean(dim=0)           # (batch, embed_dim) via mean pooling
+        if self.batch_first:
+            transformer_out = self.transformer_encoder(x)  # (batch, seq_len, embed_dim)
+            pooled = transformer_out.mean(dim=1)           # (batch, embed_dim) via mean pooling
+        else:
+            x = x.transpose(0, 1)           # (seq_len, batch, embed_dim) for transformer
+            transformer_out = self.transformer_encoder(x)  # (seq_len, batch, embed_dim)
+            pooled = transformer_out.mean(dim=0)           # (batch, embed_dim) via mean pooling
         decision_logits = self.fc_decision(pooled)       # (batch, num_classes)
         profit_output = self.fc_profit(pooled)           # (batch, 1)
         return decision_logits, profit_output
 
-# Instantiate the transformer meta-model.
-transformer_model = TransformerMetaModelWithProfit()
+_transformer_model = None
+
+def get_transformer_model():
+    """
+    Return the shared transformer meta-model, constructing it on first use.
+    """
+    global _transformer_model
+    if _transformer_model is None:
+        _transformer_model = TransformerMetaModelWithProfit()
+    return _transformer_model
+
+def set_transformer_model(model):
+    """
+    Replace the shared transformer meta-model (e.g. with a trained checkpoint).
+    """
+    global _transformer_model
+    _transformer_model = model
+
+def __getattr__(name):
+    # Keep `from models.transformer_model import transformer_model` working without
+    # building the model at import time.
+    if name == "transformer_model":
+        return get_transformer_model()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def get_transformer_input(df, index, lookback=20, sentiment_score=0.0):
     """
@@ -111,19 +144,177 @@ def get_transformer_input(df, index, lookback=20, sentiment_score=0.0):
     # Convert to tensor and add batch dimension: (1, lookback, 29)
     return torch.tensor(input_array).unsqueeze(0)
 
-def get_transformer_decision(df, index, lookback=20, sentiment_score=0.0):
+class TransformerFeatureBuffer:
+    """
+    Rolling buffer of transformer feature rows for one symbol in live mode.
+
+    Each new bar appends a single 29-dim row (the same row get_transformer_input would
+    build for it) instead of rebuilding the whole lookback window from the DataFrame.
+    Rows are stored twice in a (2 * lookback, 29) array - at position p and p + lookback -
+    so the latest `lookback` rows are always one contiguous slice, and `tensor()` can
+    return a ready-to-run (1, lookback, 29) view without copying. Keep one buffer per symbol.
+    """
+    def __init__(self, lookback=20, sentiment_score=0.0):
+        self.lookback = lookback
+        self.sentiment_score = sentiment_score
+        self.count = 0
+        self._pos = 0
+        self._buffer = np.zeros((2 * lookback, 29), dtype=np.float32)
+        self._tensor = torch.from_numpy(self._buffer)
+
+    @classmethod
+    def from_frame(cls, df, lookback=20, sentiment_score=0.0):
+        """
+        Create a buffer pre-filled with the last `lookback` rows of df.
+        """
+        buffer = cls(lookback, sentiment_score)
+        for rsi, ret in zip(df['RSI_14'].iloc[-lookback:].tolist(), df['return'].iloc[-lookback:].tolist()):
+            buffer.append(rsi, ret)
+        return buffer
+
+    @property
+    def ready(self):
+        return self.count >= self.lookback
+
+    def append(self, rsi, ret):
+        """
+        Append the feature row for one new bar.
+
+        Parameters:
+            rsi (float): The bar's RSI_14.
+            ret (float): The bar's return.
+        """
+        row = self._buffer[self._pos]
+        row[:14] = 1.0 if rsi > 50 else -1.0
+        row[14:28] = ret
+        row[28] = self.sentiment_score
+        self._buffer[self._pos + self.lookback] = row
+        self._pos = (self._pos + 1) % self.lookback
+        self.count += 1
+
+    def set_sentiment(self, sentiment_score):
+        """
+        Update the sentiment feature of every buffered row.
+        """
+        self.sentiment_score = sentiment_score
+        self._buffer[:, 28] = sentiment_score
+
+    def tensor(self):
+        """
+        Return the current window as a (1, lookback, 29) tensor, oldest row first.
+
+        The tensor is a view into the buffer and is overwritten by later appends; clone it
+        if it has to outlive the next bar.
+        """
+        if not self.ready:
+            raise ValueError(f"Feature buffer holds {self.count} rows; {self.lookback} are needed.")
+        return self._tensor[self._pos:self._pos + self.lookback].unsqueeze(0)
+
+def get_transformer_decision(df, index, lookback=20, sentiment_score=0.0, feature_buffer=None):
     """
     Run the transformer model on a lookback window ending at 'index' and return a trading decision.
+
+    If a TransformerFeatureBuffer is given, its current window is used directly and
+    df/index are ignored (live mode).
     
     Returns:
         int: Decision mapping: -1 (Sell), 0 (Hold), or 1 (Buy).
     """
-    transformer_input = get_transformer_input(df, index, lookback, sentiment_score)
-    decision_logits, _ = transformer_model(transformer_input)
+    if feature_buffer is not None:
+        transformer_input = feature_buffer.tensor()
+    else:
+        transformer_input = get_transformer_input(df, index, lookback, sentiment_score)
+    decision_logits, _ = get_transformer_model()(transformer_input)
     decision_class = torch.argmax(decision_logits, dim=1).item()
     mapping = {0: -1, 1: 0, 2: 1}
     return mapping.get(decision_class, 0)
 
+def build_transformer_feature_matrix(df, sentiment_score=0.0, out=None):
+    """
+    Build the 29-dimensional per-bar feature vector for every row of df at once.
+
+    Row i holds exactly what get_transformer_input builds for time step i:
+      - 14 strategy signals (sign(RSI_14 - 50): 1 if RSI_14 > 50 else -1),
+      - 14 profitability metrics (the 'return' value),
+      - 1 sentiment score.
+
+    Parameters:
+        df (DataFrame): DataFrame with 'RSI_14' and 'return' columns.
+        sentiment_score (float): Sentiment score to include.
+        out (np.array, optional): float32 buffer of shape (len(df), 29) to fill.
+
+    Returns:
+        np.array: float32 feature matrix of shape (len(df), 29).
+    """
+    rsi = df['RSI_14'].to_numpy(dtype=np.float64)
+    returns = df['return'].to_numpy(dtype=np.float32)
+    if out is None:
+        out = np.empty((len(df), 29), dtype=np.float32)
+    out[:, :14] = np.where(rsi > 50, 1.0, -1.0)[:, None]
+    out[:, 14:28] = returns[:, None]
+    out[:, 28] = sentiment_score
+    return out
+
+def build_transformer_windows(df, lookback=20, sentiment_score=0.0):
+    """
+    Build every lookback window of df as one strided tensor view (no per-window copies).
+
+    The per-bar feature matrix is written once into a buffer with lookback - 1 extra
+    leading rows; window i is then buffer rows [i, i + lookback), exposed through
+    torch.as_strided. The leading rows repeat the last rows of df, because
+    get_transformer_input reads the tail of the frame (negative iloc positions) for
+    windows that start before the first bar, and the batch path reproduces that.
+
+    Returns:
+        Tensor: float32 tensor of shape (len(df), lookback, 29) viewing a shared buffer.
+    """
+    n = len(df)
+    if n < lookback - 1:
+        raise ValueError(f"Need at least {lookback - 1} rows for a lookback of {lookback}, got {n}.")
+    buffer = np.empty((n + lookback - 1, 29), dtype=np.float32)
+    build_transformer_feature_matrix(df, sentiment_score, out=buffer[lookback - 1:])
+    buffer[:lookback - 1] = buffer[n:]
+    features = torch.from_numpy(buffer)
+    return features.as_strided((n, lookback, 29), (29, 29, 1))
+
+def get_transformer_decisions(df, lookback=20, sentiment_score=0.0, batch_size=512, model=None):
+    """
+    Batch version of get_transformer_decision: run the transformer on the lookback window
+    ending at every index of df.
+
+    Windows come from build_transformer_windows and are evaluated in chunks of
+    `batch_size` under torch.inference_mode with the model in eval mode (dropout off);
+    the model's previous train/eval mode is restored afterwards.
+
+    Parameters:
+        df (DataFrame): DataFrame with 'RSI_14' and 'return' columns.
+        lookback (int): Number of time steps per window.
+        sentiment_score (float): Sentiment score to include.
+        batch_size (int): Windows per forward pass.
+        model (TransformerMetaModelWithProfit, optional): Defaults to get_transformer_model().
+
+    Returns:
+        tuple: (decisions, profits) - int8 array of -1/0/1 decisions and float32 array of
+               profitability estimates, one per row of df.
+    """
+    model = get_transformer_model() if model is None else model
+    windows = build_transformer_windows(df, lookback, sentiment_score)
+    n = len(df)
+    decisions = np.empty(n, dtype=np.int8)
+    profits = np.empty(n, dtype=np.float32)
+    mapping = torch.tensor([-1, 0, 1], dtype=torch.int8)
+    was_training = model.training
+    model.eval()
+    try:
+        with torch.inference_mode():
+            for start in range(0, n, batch_size):
+                decision_logits, profit_output = model(windows[start:start + batch_size])
+                decisions[start:start + batch_size] = mapping[decision_logits.argmax(dim=1)].numpy()
+                profits[start:start + batch_size] = profit_output[:, 0].numpy()
+    finally:
+        model.train(was_training)
+    return decisions, profits
+
 if __name__ == "__main__":
     # Example usage:
     # Create a dummy DataFrame with necessary columns
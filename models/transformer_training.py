@@ -0,0 +1,276 @@
+# transformer_training.py
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import torch
+import torch.nn as nn
+from torch.utils.data import DataLoader, Dataset, Subset
+
+from models.transformer_model import TransformerMetaModelWithProfit, build_transformer_feature_matrix
+
+FEATURES_FILE = "features.npy"
+LABELS_FILE = "labels.npy"
+TARGETS_FILE = "targets.npy"
+META_FILE = "meta.json"
+
+def write_training_arrays(df, out_dir, sentiment_score=0.0, horizon=1, threshold=0.0, chunk_size=100000):
+    """
+    Write the per-bar transformer features and training targets of df as .npy files.
+
+    Features are the 29-dimensional vectors of build_transformer_feature_matrix, written
+    chunk by chunk straight into a memory-mapped file, so frames far larger than RAM can
+    be converted in pieces. Targets describe what follows each bar:
+      - labels: 2 (Buy) if the `horizon`-bar forward return exceeds `threshold`,
+                0 (Sell) if it is below -threshold, else 1 (Hold) - the class order the
+                decision head uses ({0: -1, 1: 0, 2: 1});
+      - targets: the forward return itself, for the profit head.
+    The last `horizon` bars have no forward return; they get label -1 and NaN target.
+
+    Parameters:
+        df (DataFrame): DataFrame with 'close', 'RSI_14' and 'return' columns.
+        out_dir (str): Output directory.
+        sentiment_score (float): Sentiment score to include in the features.
+        horizon (int): Bars ahead for the forward return.
+        threshold (float): Minimum absolute forward return for a Buy/Sell label.
+        chunk_size (int): Rows converted per chunk.
+
+    Returns:
+        dict: The metadata written to meta.json.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    n = len(df)
+    features = np.lib.format.open_memmap(os.path.join(out_dir, FEATURES_FILE), mode="w+", dtype=np.float32, shape=(n, 29))
+    for start in range(0, n, chunk_size):
+        build_transformer_feature_matrix(df.iloc[start:start + chunk_size], sentiment_score,
+                                         out=features[start:start + chunk_size])
+    features.flush()
+    del features
+
+    close = df["close"].to_numpy(dtype=np.float64)
+    forward = np.full(n, np.nan)
+    forward[:n - horizon] = close[horizon:] / close[:n - horizon] - 1.0
+    labels = np.ones(n, dtype=np.int64)
+    labels[forward > threshold] = 2
+    labels[forward < -threshold] = 0
+    labels[np.isnan(forward)] = -1
+    np.save(os.path.join(out_dir, LABELS_FILE), labels)
+    np.save(os.path.join(out_dir, TARGETS_FILE), forward.astype(np.float32))
+
+    meta = {"rows": n, "horizon": horizon, "threshold": threshold, "sentiment_score": sentiment_score,
+            "class_counts": np.bincount(labels[labels >= 0], minlength=3).tolist()}
+    with open(os.path.join(out_dir, META_FILE), "w") as f:
+        json.dump(meta, f, indent=1)
+    return meta
+
+class WindowDataset(Dataset):
+    """
+    Lookback windows served from memory-mapped arrays written by write_training_arrays.
+
+    Sample i is the window of feature rows [i, i + lookback) with the label and forward
+    return of its last row. Nothing is loaded up front: the arrays are memory-mapped
+    (lazily, once per DataLoader worker, so workers never receive a pickled copy) and a
+    window is a zero-copy view into the map. __getitems__ gathers a whole batch of windows
+    with one fancy-indexing read, so the only copy is the batch tensor itself.
+    """
+    def __init__(self, data_dir, lookback=20):
+        self.data_dir = data_dir
+        self.lookback = lookback
+        with open(os.path.join(data_dir, META_FILE)) as f:
+            meta = json.load(f)
+        # Windows whose last row has a forward return.
+        self.length = max(0, meta["rows"] - meta["horizon"] - lookback + 1)
+        self._arrays = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_arrays"] = None
+        return state
+
+    def _open(self):
+        if self._arrays is None:
+            # Copy-on-write maps are writable views of the file, which torch.from_numpy accepts
+            # without a copy; nothing is ever written back.
+            self._arrays = tuple(np.load(os.path.join(self.data_dir, name), mmap_mode="c")
+                                 for name in (FEATURES_FILE, LABELS_FILE, TARGETS_FILE))
+        return self._arrays
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, i):
+        features, labels, targets = self._open()
+        end = i + self.lookback
+        return torch.from_numpy(features[i:end]), int(labels[end - 1]), float(targets[end - 1])
+
+    def __getitems__(self, indices):
+        features, labels, targets = self._open()
+        idx = np.asarray(indices, dtype=np.int64)
+        rows = idx[:, None] + np.arange(self.lookback)
+        last = idx + self.lookback - 1
+        return (torch.from_numpy(features[rows]), torch.from_numpy(labels[last]),
+                torch.from_numpy(targets[last]))
+
+def collate_windows(batch):
+    """
+    collate_fn for WindowDataset: batches from __getitems__ are already stacked tensors.
+    """
+    if isinstance(batch, tuple):
+        return batch
+    windows, labels, targets = zip(*batch)
+    return torch.stack(windows), torch.tensor(labels), torch.tensor(targets)
+
+def make_window_loader(dataset, batch_size=512, shuffle=True, num_workers=2):
+    """
+    DataLoader over a WindowDataset (or a Subset of one) with worker processes.
+    """
+    return DataLoader(dataset, batch_size=batch_size, shuffle=shuffle, num_workers=num_workers,
+                      collate_fn=collate_windows, persistent_workers=num_workers > 0,
+                      prefetch_factor=4 if num_workers > 0 else None)
+
+def joint_loss(decision_logits, profit_output, labels, targets, profit_weight=1.0, profit_scale=100.0):
+    """
+    Cross-entropy on the decision head plus weighted MSE on the profit head.
+
+    Forward returns are multiplied by profit_scale (percent by default) so the
+    regression term is on a scale comparable to the classification term.
+
+    Returns:
+        tuple: (total loss, cross-entropy, MSE)
+    """
+    ce = nn.functional.cross_entropy(decision_logits.float(), labels)
+    mse = nn.functional.mse_loss(profit_output[:, 0].float(), targets * profit_scale)
+    return ce + profit_weight * mse, ce, mse
+
+def save_checkpoint(path, model, optimizer, epoch, history):
+    """
+    Atomically write model/optimizer state, the model config and the training history.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    checkpoint = {
+        "model": model.state_dict(),
+        "optimizer": optimizer.state_dict(),
+        "config": model.config,
+        "epoch": epoch,
+        "history": history,
+    }
+    torch.save(checkpoint, path + ".tmp")
+    os.replace(path + ".tmp", path)
+
+def load_transformer_checkpoint(path):
+    """
+    Rebuild a TransformerMetaModelWithProfit from a checkpoint, in eval mode.
+
+    Pass the result to transformer_model.set_transformer_model to use it for decisions.
+    """
+    checkpoint = torch.load(path, map_location="cpu")
+    model = TransformerMetaModelWithProfit(**checkpoint["config"])
+    model.load_state_dict(checkpoint["model"])
+    return model.eval()
+
+def _run_epoch(model, loader, optimizer, profit_weight, bf16):
+    training = optimizer is not None
+    model.train(training)
+    totals = np.zeros(4)
+    with torch.set_grad_enabled(training):
+        for windows, labels, targets in loader:
+            with torch.autocast("cpu", dtype=torch.bfloat16, enabled=bf16):
+                decision_logits, profit_output = model(windows)
+            loss, ce, mse = joint_loss(decision_logits, profit_output, labels, targets, profit_weight)
+            if training:
+                optimizer.zero_grad(set_to_none=True)
+                loss.backward()
+                optimizer.step()
+            n = len(labels)
+            correct = (decision_logits.argmax(dim=1) == labels).sum().item()
+            totals += (loss.item() * n, ce.item() * n, correct, n)
+    n = max(totals[3], 1)
+    # Plain floats keep the history in checkpoints loadable by torch.load(weights_only=True).
+    return {"loss": float(totals[0] / n), "ce": float(totals[1] / n), "accuracy": float(totals[2] / n)}
+
+def train_transformer_model(data_dir, lookback=20, epochs=5, batch_size=512, learning_rate=1e-3, val_fraction=0.1,
+                            num_workers=2, bf16=False, profit_weight=1.0, checkpoint_path="models/transformer_checkpoint.pt",
+                            resume=True, model=None):
+    """
+    Train TransformerMetaModelWithProfit on windows from write_training_arrays output.
+
+    The last val_fraction of windows (chronologically) is held out for validation.
+    After every epoch a checkpoint is written; with resume=True an existing checkpoint
+    at checkpoint_path restores the model, optimizer and history and training continues
+    from the next epoch.
+
+    Parameters:
+        data_dir (str): Directory written by write_training_arrays.
+        lookback (int): Window length.
+        epochs (int): Total number of epochs (including resumed ones).
+        batch_size (int): Windows per batch.
+        learning_rate (float): AdamW learning rate.
+        val_fraction (float): Share of windows used for validation.
+        num_workers (int): DataLoader worker processes.
+        bf16 (bool): Run forward passes under CPU bfloat16 autocast.
+        profit_weight (float): Weight of the profit regression term in the loss.
+        checkpoint_path (str): Checkpoint file.
+        resume (bool): Continue from checkpoint_path if it exists.
+        model (TransformerMetaModelWithProfit, optional): Model to train; by default a new
+              one, built from the checkpoint's config when resuming. A given model must
+              match the checkpoint's config.
+
+    Returns:
+        tuple: (trained model in eval mode, history DataFrame with one row per epoch)
+    """
+    dataset = WindowDataset(data_dir, lookback)
+    n_val = int(len(dataset) * val_fraction)
+    n_train = len(dataset) - n_val
+    if n_train <= 0:
+        raise ValueError(f"Not enough windows to train: {len(dataset)}")
+    train_loader = make_window_loader(Subset(dataset, range(n_train)), batch_size, shuffle=True, num_workers=num_workers)
+    val_loader = None
+    if n_val:
+        val_loader = make_window_loader(Subset(dataset, range(n_train, len(dataset))), batch_size,
+                                        shuffle=False, num_workers=num_workers)
+
+    checkpoint = None
+    if resume and checkpoint_path and os.path.exists(checkpoint_path):
+        checkpoint = torch.load(checkpoint_path, map_location="cpu")
+    if model is None:
+        # As in load_transformer_checkpoint: a resumed model takes the checkpoint's architecture.
+        config = checkpoint["config"] if checkpoint is not None else {"batch_first": True}
+        model = TransformerMetaModelWithProfit(**config)
+    elif checkpoint is not None and model.config != checkpoint["config"]:
+        raise ValueError(f"Model config {model.config} does not match checkpoint {checkpoint_path} "
+                         f"({checkpoint['config']}).")
+    optimizer = torch.optim.AdamW(model.parameters(), lr=learning_rate)
+    history, first_epoch = [], 0
+    if checkpoint is not None:
+        model.load_state_dict(checkpoint["model"])
+        optimizer.load_state_dict(checkpoint["optimizer"])
+        history = checkpoint["history"]
+        first_epoch = checkpoint["epoch"] + 1
+        print(f"Resuming from {checkpoint_path} at epoch {first_epoch}")
+
+    for epoch in range(first_epoch, epochs):
+        start = time.perf_counter()
+        row = {"epoch": epoch}
+        row.update({f"train_{k}": v for k, v in _run_epoch(model, train_loader, optimizer, profit_weight, bf16).items()})
+        if val_loader is not None:
+            row.update({f"val_{k}": v for k, v in _run_epoch(model, val_loader, None, profit_weight, bf16).items()})
+        row["seconds"] = time.perf_counter() - start
+        row["windows_per_s"] = n_train / row["seconds"]
+        history.append(row)
+        print(", ".join(f"{k}={v:.4f}" if isinstance(v, float) else f"{k}={v}" for k, v in row.items()))
+        if checkpoint_path:
+            save_checkpoint(checkpoint_path, model, optimizer, epoch, history)
+    return model.eval(), pd.DataFrame(history)
+
+if __name__ == "__main__":
+    # Example usage: train on simulated bars.
+    import tempfile
+    from data.data_pipeline import simulate_data, preprocess_data, compute_indicators
+
+    df = compute_indicators(preprocess_data(simulate_data(periods=5000)), columns=["RSI_14"]).dropna()
+    data_dir = tempfile.mkdtemp()
+    print(write_training_arrays(df, data_dir))
+    model, history = train_transformer_model(data_dir, epochs=2, checkpoint_path=os.path.join(data_dir, "checkpoint.pt"))
+    print(history)
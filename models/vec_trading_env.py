@@ -0,0 +1,137 @@
+# vec_trading_env.py
+import numpy as np
+from gymnasium import spaces
+from stable_baselines3.common.vec_env import VecEnv
+
+# Action index {0: Sell, 1: Hold, 2: Buy} -> trading direction, as in TradingEnv.step.
+ACTION_SIGN = np.array([-1.0, 0.0, 1.0], dtype=np.float32)
+REWARD_SCALE = 10000
+
+class VectorizedTradingEnv(VecEnv):
+    """
+    N independent TradingEnv episodes stepped together with array operations.
+
+    All episodes index into one shared float32 feature matrix and returns array; the
+    per-episode state is just a step index and a balance, so a step is a handful of
+    NumPy operations over N elements regardless of N. Dynamics match TradingEnv:
+      - reset starts an episode at a random step in the first half of the data,
+      - reward = action_sign * return * 10,000,
+      - an episode ends when it reaches the second-to-last row.
+    Finished episodes are reset automatically (as DummyVecEnv does); the observation
+    they ended on (zeros, as in TradingEnv) is in info["terminal_observation"], and
+    info["episode"] carries the episode's total reward and length for SB3's logger.
+    """
+    def __init__(self, X, returns, n_envs=8, initial_balance=10000, seed=None):
+        """
+        Parameters:
+            X (np.array): Feature array (shape: [num_steps, num_features]).
+            returns (np.array): Array of returns for each time step.
+            n_envs (int): Number of parallel episodes.
+            initial_balance (float): Starting balance of every episode.
+            seed (int, optional): Seed for the episode start positions.
+        """
+        self.X = np.ascontiguousarray(X, dtype=np.float32)
+        self.returns = np.ascontiguousarray(returns, dtype=np.float32)
+        if len(self.X) != len(self.returns):
+            raise ValueError("X and returns must have the same length.")
+        if len(self.X) < 4:
+            raise ValueError("Need at least 4 rows of data.")
+        self.initial_balance = initial_balance
+        self.render_mode = None
+        self._rng = np.random.default_rng(seed)
+        observation_space = spaces.Box(low=-np.inf, high=np.inf, shape=(self.X.shape[1],), dtype=np.float32)
+        super(VectorizedTradingEnv, self).__init__(n_envs, observation_space, spaces.Discrete(3))
+
+        self.current_step = np.zeros(n_envs, dtype=np.int64)
+        self.balance = np.full(n_envs, initial_balance, dtype=np.float64)
+        self._last_step = len(self.X) - 1
+        self._actions = np.zeros(n_envs, dtype=np.int64)
+        self._rewards = np.zeros(n_envs, dtype=np.float32)
+        self._dones = np.zeros(n_envs, dtype=bool)
+        self._episode_rewards = np.zeros(n_envs, dtype=np.float64)
+        self._episode_lengths = np.zeros(n_envs, dtype=np.int64)
+        self._terminal_observation = np.zeros(self.X.shape[1], dtype=np.float32)
+
+    def _start_episodes(self, mask=None):
+        count = self.num_envs if mask is None else int(mask.sum())
+        starts = self._rng.integers(0, len(self.X) // 2, size=count)
+        if mask is None:
+            self.current_step[:] = starts
+            self.balance[:] = self.initial_balance
+            self._episode_rewards[:] = 0.0
+            self._episode_lengths[:] = 0
+        else:
+            self.current_step[mask] = starts
+            self.balance[mask] = self.initial_balance
+            self._episode_rewards[mask] = 0.0
+            self._episode_lengths[mask] = 0
+
+    def reset(self):
+        if self._seeds[0] is not None:
+            self._rng = np.random.default_rng(self._seeds[0])
+        self._reset_seeds()
+        self._reset_options()
+        self._start_episodes()
+        return self.X[self.current_step]
+
+    def step_async(self, actions):
+        self._actions[:] = np.asarray(actions).reshape(self.num_envs)
+
+    def step_wait(self):
+        rewards, dones = self._rewards, self._dones
+        np.take(ACTION_SIGN, self._actions, out=rewards)
+        rewards *= self.returns[self.current_step]
+        rewards *= REWARD_SCALE
+        self.balance += rewards
+        self._episode_rewards += rewards
+        self._episode_lengths += 1
+        self.current_step += 1
+        np.greater_equal(self.current_step, self._last_step, out=dones)
+
+        infos = [{} for _ in range(self.num_envs)]
+        if dones.any():
+            for i in np.flatnonzero(dones):
+                infos[i]["terminal_observation"] = self._terminal_observation.copy()
+                infos[i]["episode"] = {"r": float(self._episode_rewards[i]), "l": int(self._episode_lengths[i])}
+            self._start_episodes(dones)
+        # Fresh arrays: SB3 keeps the previous observation while storing the next one.
+        return self.X[self.current_step], rewards.copy(), dones.copy(), infos
+
+    def close(self):
+        pass
+
+    def _target_indices(self, indices):
+        if indices is None:
+            return range(self.num_envs)
+        if isinstance(indices, int):
+            return [indices]
+        return indices
+
+    def get_attr(self, attr_name, indices=None):
+        value = getattr(self, attr_name)
+        return [value for _ in self._target_indices(indices)]
+
+    def set_attr(self, attr_name, value, indices=None):
+        setattr(self, attr_name, value)
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        result = getattr(self, method_name)(*method_args, **method_kwargs)
+        return [result for _ in self._target_indices(indices)]
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        return [False for _ in self._target_indices(indices)]
+
+if __name__ == "__main__":
+    # Example usage: measure raw environment throughput with random actions.
+    import time
+    X = np.random.uniform(low=100, high=200, size=(10000, 3))
+    returns = np.random.uniform(low=-0.01, high=0.01, size=10000)
+    for n_envs in (1, 8, 64, 256):
+        env = VectorizedTradingEnv(X, returns, n_envs=n_envs, seed=0)
+        env.reset()
+        actions = np.random.randint(0, 3, size=(1000, n_envs))
+        start = time.perf_counter()
+        for a in actions:
+            env.step(a)
+        elapsed = time.perf_counter() - start
+        print(f"n_envs={n_envs}: {1000 * n_envs / elapsed:,.0f} env steps/s")
@@ -0,0 +1,187 @@
+# parameter_sweep.py
+import itertools
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from risk.risk_management import get_risk_profile, run_risk_managed_backtest, compute_sharpe_ratio, compute_max_drawdown
+
+# Set in each worker process by _init_worker.
+_WORKER_DATA = {}
+
+def weight_grid(step=0.1):
+    """
+    All (rl_weight, strategy_weight, transformer_weight) triples on a `step` grid summing to 1.
+    """
+    n = int(round(1.0 / step))
+    return [(round(i * step, 10), round(j * step, 10), round((n - i - j) * step, 10))
+            for i in range(n + 1) for j in range(n + 1 - i)]
+
+def build_ensemble_grid(weights=None, thresholds=(0.2,), risk_profiles=("high", "medium", "low")):
+    """
+    Cartesian product of ensemble weights, vote thresholds and risk profiles.
+
+    Parameters:
+        weights (list of tuples, optional): (rl, strategy, transformer) weights; default weight_grid(0.1).
+        thresholds (iterable): Vote thresholds.
+        risk_profiles (iterable): Profile names for get_risk_profile, or risk parameter dicts.
+
+    Returns:
+        list: One dict per combination with keys rl_weight, strategy_weight,
+              transformer_weight, threshold and risk_profile.
+    """
+    weights = weight_grid(0.1) if weights is None else weights
+    return [
+        {"rl_weight": w[0], "strategy_weight": w[1], "transformer_weight": w[2], "threshold": t, "risk_profile": p}
+        for w, t, p in itertools.product(weights, thresholds, risk_profiles)
+    ]
+
+def components_cache_key(df_data, rl_model, lookback, sentiment_score=0.0):
+    """
+    Digest of everything the component actions depend on apart from the ensemble
+    weights: the RL policy parameters, the shared transformer's parameters, the input
+    columns and the lookback / sentiment settings.
+    """
+    import hashlib
+    from models.transformer_model import get_transformer_model
+    h = hashlib.sha256()
+    h.update(repr((lookback, float(sentiment_score))).encode())
+    h.update(np.ascontiguousarray(df_data[["close", "SMA_10", "RSI_14", "return"]].to_numpy(dtype=np.float64)))
+    models = [get_transformer_model()] + ([rl_model.policy] if rl_model is not None else [])
+    for model in models:
+        for name, tensor in model.state_dict().items():
+            h.update(name.encode())
+            h.update(tensor.detach().cpu().contiguous().numpy().tobytes())
+    return h.hexdigest()
+
+def save_components(path, components, returns, key=""):
+    """
+    Cache component actions (see strategies.ensemble.compute_ensemble_components), returns
+    and their components_cache_key as .npz.
+    """
+    np.savez(path, returns=returns, key=np.array(key), **components)
+
+def load_components(path):
+    """
+    Load a component cache written by save_components; returns (components, returns, key).
+    """
+    with np.load(path) as data:
+        key = str(data["key"]) if "key" in data.files else ""
+        return {k: data[k] for k in ("rl", "strategy", "transformer")}, data["returns"], key
+
+def _init_worker(components, returns, initial_balance, scaling):
+    _WORKER_DATA.update(components=components, returns=returns, initial_balance=initial_balance, scaling=scaling)
+
+def _evaluate(combos):
+    from strategies.ensemble import combine_ensemble_actions
+    components = _WORKER_DATA["components"]
+    returns = _WORKER_DATA["returns"]
+    rows = []
+    actions, last_key = None, None
+    for index, combo in combos:
+        # Combos arrive grouped by weights/threshold, so each action vector is built once.
+        key = (combo["rl_weight"], combo["strategy_weight"], combo["transformer_weight"], combo["threshold"])
+        if key != last_key:
+            actions = combine_ensemble_actions(components["rl"], components["strategy"], components["transformer"],
+                                               *key[:3], threshold=key[3])
+            last_key = key
+        profile = combo["risk_profile"]
+        risk_params = get_risk_profile(profile) if isinstance(profile, str) else dict(profile)
+        final_balance, balance_history = run_risk_managed_backtest(
+            actions, returns, _WORKER_DATA["initial_balance"], _WORKER_DATA["scaling"], risk_params)
+        rows.append(dict(
+            {"combination": index, **combo},
+            risk_profile=profile if isinstance(profile, str) else str(profile),
+            final_balance=final_balance,
+            profit=final_balance - _WORKER_DATA["initial_balance"],
+            sharpe=compute_sharpe_ratio(balance_history),
+            max_drawdown=compute_max_drawdown(balance_history),
+            trades=int(np.count_nonzero(actions)),
+        ))
+    return rows
+
+def run_ensemble_sweep(df_data, rl_model, grid, initial_balance=10000, scaling=1000, lookback=20, components=None,
+                       cache_path=None, max_workers=None, chunk_size=64, rng=None):
+    """
+    Evaluate many ensemble weight/threshold/risk-profile combinations on one history.
+
+    The RL, strategy and transformer actions are computed once for every row
+    (compute_ensemble_components), optionally cached to `cache_path`, and shipped once to
+    each worker process. Workers then only combine actions and run the backtest kernel
+    (run_risk_managed_backtest) per combination; no model is evaluated again.
+
+    Parameters:
+        df_data (DataFrame): Columns 'close', 'SMA_10', 'RSI_14' and 'return'.
+        rl_model: Trained RL model (unused when components or a cache are given).
+        grid (list): Combinations from build_ensemble_grid.
+        initial_balance (float): Starting portfolio balance.
+        scaling (float): Scaling factor to convert returns into monetary terms.
+        lookback (int): Lookback window for the transformer decision.
+        components (dict, optional): Precomputed component actions.
+        cache_path (str, optional): .npz file to load components from / save them to; a
+                                    cache whose components_cache_key differs (other data,
+                                    RL model, transformer or lookback) is refused.
+        max_workers (int, optional): Worker processes (default: CPU count; 0 runs in-process).
+        chunk_size (int): Combinations per task.
+        rng: Random source for the placeholder random strategies.
+
+    Returns:
+        DataFrame: One row per combination (`combination` is its index in grid) with
+                   final_balance, profit, sharpe, max_drawdown and trades, sorted by
+                   profit (best first).
+    """
+    from strategies.ensemble import compute_ensemble_components
+
+    returns = df_data["return"].to_numpy(dtype=np.float64)
+    key = None
+    if components is None and cache_path is not None:
+        key = components_cache_key(df_data, rl_model, lookback)
+        if os.path.exists(cache_path):
+            components, _, cached_key = load_components(cache_path)
+            if cached_key != key:
+                raise ValueError(f"Component cache {cache_path} was built for different data, models or "
+                                 "lookback; delete it or use another cache_path.")
+    if components is None:
+        components = compute_ensemble_components(df_data, rl_model, lookback, rng=rng)
+        if cache_path is not None:
+            save_components(cache_path, components, returns, key)
+
+    order = sorted(range(len(grid)), key=lambda i: (grid[i]["rl_weight"], grid[i]["strategy_weight"],
+                                                    grid[i]["transformer_weight"], grid[i]["threshold"]))
+    ordered = [(i, grid[i]) for i in order]
+    chunks = [ordered[i:i + chunk_size] for i in range(0, len(ordered), chunk_size)]
+    init_args = (components, returns, initial_balance, scaling)
+
+    rows = []
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    if max_workers == 0:
+        _init_worker(*init_args)
+        for chunk in chunks:
+            rows.extend(_evaluate(chunk))
+    else:
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=context, initializer=_init_worker,
+                                 initargs=init_args) as executor:
+            for future in as_completed([executor.submit(_evaluate, chunk) for chunk in chunks]):
+                rows.extend(future.result())
+    results = pd.DataFrame(rows).sort_values(["profit", "combination"], ascending=[False, True])
+    return results.reset_index(drop=True)
+
+if __name__ == "__main__":
+    # Example usage: sweep weights, thresholds and risk profiles on simulated data.
+    import time
+    from data.data_pipeline import simulate_data, preprocess_data, compute_indicators
+    from models.rl_model import train_rl_model
+
+    df = compute_indicators(preprocess_data(simulate_data(periods=5000)), columns=["SMA_10", "RSI_14"]).dropna()
+    rl_model = train_rl_model(df[["close", "SMA_10", "RSI_14"]].values, df["return"].values,
+                              total_timesteps=5000, n_envs=8, verbose=0)
+    grid = build_ensemble_grid(thresholds=(0.1, 0.2, 0.3))
+    start = time.perf_counter()
+    results = run_ensemble_sweep(df, rl_model, grid)
+    print(f"{len(results)} combinations in {time.perf_counter() - start:.1f}s")
+    print(results.head(10))
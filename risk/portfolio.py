@@ -0,0 +1,175 @@
+# portfolio.py
+import numpy as np
+import pandas as pd
+
+from risk.risk_management import get_risk_profile, run_risk_managed_backtest, compute_sharpe_ratio, compute_max_drawdown
+
+def align_symbol_columns(frames, column="return", fill_value=0.0):
+    """
+    Align one column of several per-symbol DataFrames into a (T, S) DataFrame.
+
+    Rows are the union of all timestamps; bars a symbol is missing get fill_value
+    (a zero return or a Hold action means that symbol does not trade on that bar).
+
+    Parameters:
+        frames (dict): Symbol -> DataFrame (or Series) indexed by timestamp.
+        column (str): Column to take from each DataFrame.
+        fill_value (float): Value for missing bars.
+
+    Returns:
+        DataFrame: One column per symbol, in the order of `frames`.
+    """
+    columns = {symbol: (frame[column] if isinstance(frame, pd.DataFrame) else frame) for symbol, frame in frames.items()}
+    return pd.concat(columns, axis=1).sort_index().fillna(fill_value)
+
+def run_portfolio_backtest(actions, returns, initial_balance, scaling, risk_params, allocation=None,
+                           return_details=False):
+    """
+    Backtest kernel for S symbols trading out of one shared capital pool.
+
+    Per bar t and symbol s, the rules of run_risk_managed_backtest apply with the
+    portfolio balance:
+      raw_pnl[t, s] = action[t, s] * return[t, s] * scaling, clipped to
+      [-trade_size[s] * stop_loss_pct, trade_size[s] * take_profit_pct] with
+      trade_size[s] = balance * position_size_pct * allocation[s].
+    The clipped P&L of all symbols is added to the balance at once, and the drawdown
+    throttle (position_size_pct - 0.005 per bar beyond max_drawdown_pct, floor 0.01)
+    acts on the portfolio balance, so it shrinks every symbol's trade size.
+
+    Only the bar-to-bar recurrence is sequential: raw P&L is computed for the whole
+    matrix up front and each bar is a handful of vectorized operations across all
+    symbols into preallocated buffers. With S = 1 and the default allocation the
+    result equals run_risk_managed_backtest.
+
+    Parameters:
+        actions (array-like): (T, S) decisions (-1, 0, or 1).
+        returns (array-like): (T, S) returns; NaN means no bar for that symbol (no P&L).
+        initial_balance (float): Starting portfolio balance.
+        scaling (float or array-like): Scaling factor(s) converting returns into
+                                       monetary terms, scalar or one per symbol.
+        risk_params (dict): Risk management parameters (see get_risk_profile).
+        allocation (array-like, optional): Share of position_size_pct given to each
+                                           symbol; default 1/S each.
+        return_details (bool): Also return per-step arrays.
+
+    Returns:
+        tuple: (final_balance, balance_history), plus a dict with the (T, S) raw_pnl and
+               actual_pnl matrices, the per-step position_size_pct and the final
+               position_size_pct if return_details is True.
+    """
+    actions = np.asarray(actions)
+    returns = np.asarray(returns, dtype=np.float64)
+    if actions.ndim == 1:
+        actions = actions[:, None]
+    if returns.ndim == 1:
+        returns = returns[:, None]
+    if actions.shape != returns.shape:
+        raise ValueError(f"actions {actions.shape} and returns {returns.shape} must have the same shape.")
+    if actions.size and not np.isin(actions, (-1, 0, 1)).all():
+        raise ValueError("Actions must be -1, 0, or 1.")
+    n_steps, n_symbols = returns.shape
+    if allocation is None:
+        allocation = np.full(n_symbols, 1.0 / n_symbols)
+    else:
+        allocation = np.asarray(allocation, dtype=np.float64)
+        if allocation.shape != (n_symbols,):
+            raise ValueError(f"allocation must have one weight per symbol ({n_symbols}).")
+    position_size_pct = float(risk_params["position_size_pct"])
+    stop_loss_pct = float(risk_params["stop_loss_pct"])
+    take_profit_pct = float(risk_params["take_profit_pct"])
+    max_drawdown_pct = float(risk_params["max_drawdown_pct"])
+
+    raw_pnl = actions * np.nan_to_num(returns, nan=0.0) * np.asarray(scaling, dtype=np.float64)
+    actual_pnl = np.empty_like(raw_pnl) if return_details else np.empty((1, n_symbols))
+    trade_size = np.empty(n_symbols)
+    max_loss = np.empty(n_symbols)
+    max_gain = np.empty(n_symbols)
+
+    balance = float(initial_balance)
+    peak_balance = balance
+    balance_history = np.empty(n_steps + 1)
+    balance_history[0] = balance
+    sizes = np.empty(n_steps)
+    for t in range(n_steps):
+        np.multiply(allocation, balance * position_size_pct, out=trade_size)
+        np.multiply(trade_size, -stop_loss_pct, out=max_loss)
+        np.multiply(trade_size, take_profit_pct, out=max_gain)
+        # np.clip semantics: min(max(x, lo), hi).
+        pnl = actual_pnl[t if return_details else 0]
+        np.maximum(raw_pnl[t], max_loss, out=pnl)
+        np.minimum(pnl, max_gain, out=pnl)
+        balance += float(pnl.sum()) if n_symbols > 1 else float(pnl[0])
+        if balance > peak_balance:
+            peak_balance = balance
+        if 1.0 - (balance / peak_balance) > max_drawdown_pct:
+            position_size_pct = max(position_size_pct - 0.005, 0.01)
+        balance_history[t + 1] = balance
+        sizes[t] = position_size_pct
+    balance_history = balance_history.tolist()
+    if not return_details:
+        return balance, balance_history
+    details = {
+        "raw_pnl": raw_pnl,
+        "actual_pnl": actual_pnl,
+        "position_size_pct": sizes,
+        "final_position_size_pct": position_size_pct,
+    }
+    return balance, balance_history, details
+
+def portfolio_report(actions, returns, initial_balance=10000, scaling=1000, risk_profile="medium", allocation=None,
+                     symbols=None):
+    """
+    Run run_portfolio_backtest and summarize the portfolio and each symbol's contribution.
+
+    Parameters:
+        actions, returns (DataFrame or array-like): (T, S) matrices; DataFrame columns
+                                                    name the symbols.
+        risk_profile (str or dict): Risk profile name or parameters.
+        symbols (list, optional): Symbol names when plain arrays are passed.
+
+    Returns:
+        tuple: (summary dict, per-symbol DataFrame with pnl, trades and hit_rate)
+    """
+    if symbols is None:
+        symbols = list(returns.columns) if isinstance(returns, pd.DataFrame) else None
+    risk_params = get_risk_profile(risk_profile) if isinstance(risk_profile, str) else dict(risk_profile)
+    final_balance, balance_history, details = run_portfolio_backtest(
+        np.asarray(actions), np.asarray(returns, dtype=np.float64), initial_balance, scaling, risk_params,
+        allocation, return_details=True)
+    actual_pnl = details["actual_pnl"]
+    traded = np.asarray(actions) != 0
+    trades = traded.sum(axis=0)
+    wins = ((actual_pnl > 0) & traded).sum(axis=0)
+    per_symbol = pd.DataFrame({
+        "pnl": actual_pnl.sum(axis=0),
+        "trades": trades,
+        "hit_rate": np.divide(wins, trades, out=np.zeros(len(trades)), where=trades > 0),
+    }, index=symbols)
+    summary = {
+        "final_balance": final_balance,
+        "profit": final_balance - initial_balance,
+        "sharpe": compute_sharpe_ratio(balance_history),
+        "max_drawdown": compute_max_drawdown(balance_history),
+        "final_position_size_pct": details["final_position_size_pct"],
+    }
+    return summary, per_symbol
+
+if __name__ == "__main__":
+    # Example usage: 200 simulated symbols over 5,000 bars with random actions.
+    import time
+
+    rng = np.random.default_rng(0)
+    T, S = 5000, 200
+    returns = pd.DataFrame(rng.normal(0, 0.01, (T, S)), columns=[f"SYM{i}" for i in range(S)])
+    actions = pd.DataFrame(rng.integers(-1, 2, (T, S)), columns=returns.columns)
+
+    start = time.perf_counter()
+    summary, per_symbol = portfolio_report(actions, returns)
+    print(f"{T} bars x {S} symbols in {time.perf_counter() - start:.2f}s")
+    print(summary)
+    print(per_symbol.sort_values("pnl", ascending=False).head())
+
+    # A single symbol reproduces the one-symbol kernel.
+    single = run_portfolio_backtest(actions.iloc[:, :1], returns.iloc[:, :1], 10000, 1000, get_risk_profile("high"))
+    print(single[0] == run_risk_managed_backtest(actions.iloc[:, 0], returns.iloc[:, 0], 10000, 1000,
+                                                 get_risk_profile("high"))[0])
@@ -55,11 +55,8 @@ def compute_sharpe_ratio(balance_history, risk_free_rate=0.0):
     Returns:
         float: Sharpe ratio.
     """
-    returns = []
-    for i in range(1, len(balance_history)):
-        ret = (balance_history[i] - balance_history[i-1]) / balance_history[i-1]
-        returns.append(ret)
-    returns = np.array(returns)
+    balances = np.asarray(balance_history, dtype=np.float64)
+    returns = (balances[1:] - balances[:-1]) / balances[:-1]
     mean_return = np.mean(returns) - risk_free_rate
     std_return = np.std(returns) + 1e-9
     return mean_return / std_return
@@ -72,19 +69,97 @@ def compute_max_drawdown(balance_history):
         balance_history (list or np.array): Portfolio balance over time.
 
     Returns:
-        float: Maximum drawdown (as a fraction of the peak balance).
+        float: Maximum drawdown (as a fraction of the peak balance). NaN balances are
+               skipped, as in the former per-step loop: they neither set the peak nor
+               count as a drawdown.
     """
-    peak = balance_history[0]
-    max_dd = 0.0
-    for x in balance_history:
-        if x > peak:
-            peak = x
-        dd = (peak - x) / peak
-        max_dd = max(max_dd, dd)
-    return max_dd
+    balances = np.asarray(balance_history, dtype=np.float64)
+    peak = np.fmax.accumulate(balances)
+    drawdowns = (peak - balances) / peak
+    return float(np.fmax.reduce(drawdowns, initial=0.0))
+
+def run_risk_managed_backtest(actions, returns, initial_balance, scaling, risk_params, return_details=False,
+                              journal=None):
+    """
+    Backtest kernel: apply the risk-managed P&L recurrence to precomputed actions.
+
+    Implements exactly the per-step rules of simulate_ensemble_profit_with_risk:
+      raw_pnl = action * return * scaling, clipped to
+      [-trade_size * stop_loss_pct, trade_size * take_profit_pct] with
+      trade_size = balance * position_size_pct; whenever the drawdown from the peak
+      balance exceeds max_drawdown_pct, position_size_pct shrinks by 0.005 (floor 0.01).
+    The recurrence is path dependent (each step's limits depend on the balance so far),
+    so it runs as one tight loop over plain Python floats with no per-step DataFrame or
+    NumPy scalar overhead. risk_params is not modified.
+
+    Parameters:
+        actions (array-like): Decisions (-1, 0, or 1), one per bar.
+        returns (array-like): Returns, one per bar.
+        initial_balance (float): Starting portfolio balance.
+        scaling (float): Scaling factor to convert returns into monetary terms.
+        risk_params (dict): Risk management parameters (see get_risk_profile).
+        return_details (bool): Also return per-step arrays.
+        journal (TradeJournal, optional): Receives every step (see risk/trade_journal.py),
+                                          in one batch after the loop.
+
+    Returns:
+        tuple: (final_balance, balance_history), plus a dict of per-step arrays
+               (raw_pnl, actual_pnl, position_size_pct) and the final position_size_pct
+               if return_details is True.
+    """
+    actions = np.asarray(actions)
+    if len(actions) != len(returns):
+        raise ValueError("actions and returns must have the same length.")
+    if len(actions) and not np.isin(actions, (-1, 0, 1)).all():
+        raise ValueError("Actions must be -1, 0, or 1.")
+    position_size_pct = float(risk_params["position_size_pct"])
+    stop_loss_pct = float(risk_params["stop_loss_pct"])
+    take_profit_pct = float(risk_params["take_profit_pct"])
+    max_drawdown_pct = float(risk_params["max_drawdown_pct"])
+
+    balance = float(initial_balance)
+    peak_balance = balance
+    balance_history = [balance]
+    append = balance_history.append
+    details_wanted = return_details or journal is not None
+    if details_wanted:
+        raw_pnls, actual_pnls, sizes = [], [], []
+    for action, ret in zip(actions.tolist(), np.asarray(returns, dtype=np.float64).tolist()):
+        raw_pnl = action * ret * scaling
+        trade_size = balance * position_size_pct
+        max_loss = -trade_size * stop_loss_pct
+        max_gain = trade_size * take_profit_pct
+        # np.clip semantics: min(max(x, lo), hi), and a NaN P&L (NaN return) stays NaN.
+        actual_pnl = raw_pnl if raw_pnl > max_loss or raw_pnl != raw_pnl else max_loss
+        if actual_pnl > max_gain:
+            actual_pnl = max_gain
+        balance += actual_pnl
+        if balance > peak_balance:
+            peak_balance = balance
+        if 1.0 - (balance / peak_balance) > max_drawdown_pct:
+            position_size_pct = max(position_size_pct - 0.005, 0.01)
+        append(balance)
+        if details_wanted:
+            raw_pnls.append(raw_pnl)
+            actual_pnls.append(actual_pnl)
+            sizes.append(position_size_pct)
+    if not details_wanted:
+        return balance, balance_history
+    details = {
+        "raw_pnl": np.array(raw_pnls, dtype=np.float64),
+        "actual_pnl": np.array(actual_pnls, dtype=np.float64),
+        "position_size_pct": np.array(sizes, dtype=np.float64),
+        "final_position_size_pct": position_size_pct,
+    }
+    if journal is not None:
+        journal.record_batch(np.arange(len(actions)), actions, returns, details["raw_pnl"], details["actual_pnl"],
+                             balance_history[1:], details["position_size_pct"])
+    if not return_details:
+        return balance, balance_history
+    return balance, balance_history, details
 
 def simulate_ensemble_profit_with_risk(df_data, rl_model, rl_weight, strategy_weight, transformer_weight,
-                                       initial_balance, scaling, risk_params, lookback):
+                                       initial_balance, scaling, risk_params, lookback, journal=None, debug=False):
     """
     Simulate ensemble trading over historical data while applying risk management.
 
@@ -98,48 +173,38 @@ def simulate_ensemble_profit_with_risk(df_data, rl_model, rl_weight, strategy_we
       scaling (float): Scaling factor to convert returns into monetary terms.
       risk_params (dict): Risk management parameters.
       lookback (int): Lookback window for the transformer decision.
+      journal (TradeJournal, optional): Records the steps (action, return, raw/actual P&L,
+                                        balance) into columnar buffers written in the background.
+      debug (bool): Print the journaled steps as [DEBUG] lines at the end (with no journal,
+                    every step is journaled in memory for this).
 
     Returns:
       tuple: (final_balance, balance_history)
 
     Note:
-      This function calls the ensemble decision function (from strategies.ensemble)
-      using the full DataFrame and the current index.
+      The ensemble actions for every row are computed up front in batch
+      (strategies.ensemble.precompute_ensemble_actions), then run_risk_managed_backtest
+      applies the risk-managed P&L recurrence to them. The transformer decisions are
+      taken in eval mode (deterministic, no dropout); the former per-row loop called the
+      model in training mode, so its transformer votes were randomised by dropout.
     """
-    # Import ensemble decision function from the strategies module.
-    from strategies.ensemble import ensemble_final_decision
+    from strategies.ensemble import precompute_ensemble_actions
 
     if risk_params is None:
         risk_params = get_risk_profile("high")
-        
-    balance = initial_balance
-    peak_balance = balance
-    balance_history = [balance]
-    
-    # Iterate over each row of the DataFrame.
-    for i in range(len(df_data)):
-        # Extract state vector from the DataFrame.
-        state = df_data[['close', 'SMA_10', 'RSI_14']].iloc[i].values
-        ret = df_data['return'].iloc[i]
-        # Call ensemble_final_decision with the full DataFrame and current index.
-        action = ensemble_final_decision(state, df_data, i, rl_model, rl_weight, strategy_weight, transformer_weight, lookback)
-        if action not in [-1, 0, 1]:
-            raise ValueError(f"Ensemble final decision returned invalid action {action}")
-        
-        raw_pnl = action * ret * scaling
-        trade_size = balance * risk_params["position_size_pct"]
-        max_loss = -trade_size * risk_params["stop_loss_pct"]
-        max_gain = trade_size * risk_params["take_profit_pct"]
-        actual_pnl = np.clip(raw_pnl, max_loss, max_gain)
-        balance += actual_pnl
-        
-        if balance > peak_balance:
-            peak_balance = balance
-        drawdown = 1.0 - (balance / peak_balance)
-        if drawdown > risk_params["max_drawdown_pct"]:
-            risk_params["position_size_pct"] = max(risk_params["position_size_pct"] - 0.005, 0.01)
-        
-        balance_history.append(balance)
-        print(f"[DEBUG] Step={i}, action={action}, return={ret:.4f}, raw_pnl={raw_pnl:.2f}, actual_pnl={actual_pnl:.2f}, balance={balance:.2f}")
-    
+
+    actions = precompute_ensemble_actions(df_data, rl_model, rl_weight, strategy_weight, transformer_weight, lookback)
+    returns = df_data['return'].to_numpy(dtype=np.float64)
+    if debug and journal is None:
+        from risk.trade_journal import TradeJournal
+        journal = TradeJournal()
+    balance, balance_history, details = run_risk_managed_backtest(actions, returns, initial_balance, scaling,
+                                                                  risk_params, return_details=True, journal=journal)
+    # The per-row loop adjusted the caller's risk_params in place; keep that behaviour.
+    risk_params["position_size_pct"] = details["final_position_size_pct"]
+    if debug:
+        from risk.trade_journal import format_journal_rows
+        journal.flush()
+        print("\n".join(format_journal_rows(journal.to_frame())))
+
     return balance, balance_history
@@ -0,0 +1,261 @@
+# trade_journal.py
+import glob
+import os
+import queue
+import threading
+
+import numpy as np
+import pandas as pd
+
+JOURNAL_COLUMNS = {
+    "step": np.int64,
+    "action": np.int8,
+    "return": np.float64,
+    "raw_pnl": np.float64,
+    "actual_pnl": np.float64,
+    "balance": np.float64,
+    "position_size_pct": np.float64,
+}
+
+# Verbosity levels.
+OFF, TRADES, STEPS = 0, 1, 2
+
+class TradeJournal:
+    """
+    Columnar record of backtest steps, written in the background.
+
+    Rows go into preallocated per-column NumPy buffers of `capacity` rows. A full buffer
+    is handed to a writer thread, which saves it as one chunk file (chunk_000000.npz with
+    one array per column, or .parquet) while recording continues in a second buffer. No
+    strings are formatted and no I/O happens on the recording path.
+
+    Verbosity selects what is recorded: OFF (0) nothing, TRADES (1) steps with a
+    non-zero action, STEPS (2) every step. Of the selected rows, every `sample_every`-th
+    is kept.
+
+    Without a path the chunks stay in memory; use to_frame() either way. A directory
+    holds exactly one run: one that already contains chunks is refused unless
+    overwrite=True, which deletes the old chunks first.
+    """
+    def __init__(self, path=None, capacity=65536, verbosity=STEPS, sample_every=1, file_format="npz",
+                 overwrite=False):
+        """
+        Parameters:
+            path (str, optional): Output directory for chunk files.
+            capacity (int): Rows per buffer / chunk.
+            verbosity (int): OFF, TRADES or STEPS.
+            sample_every (int): Keep every n-th selected row.
+            file_format (str): "npz" or "parquet" (needs pyarrow or fastparquet).
+            overwrite (bool): Delete chunks of an earlier run in `path` instead of refusing it.
+        """
+        if file_format not in ("npz", "parquet"):
+            raise ValueError("file_format must be 'npz' or 'parquet'.")
+        self.path = path
+        self.capacity = capacity
+        self.verbosity = verbosity
+        self.sample_every = max(int(sample_every), 1)
+        self.file_format = file_format
+        self.rows_seen = 0
+        self.rows_selected = 0
+        self.rows_written = 0
+        self._chunks = []
+        self._chunk_index = 0
+        self._error = None
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+            stale = glob.glob(os.path.join(path, "chunk_*"))
+            if stale and not overwrite:
+                raise FileExistsError(f"{path} already holds a journal ({len(stale)} chunks); "
+                                      "use another directory or overwrite=True.")
+            for chunk in stale:
+                os.remove(chunk)
+        # Two buffers: one being filled, one being written.
+        self._free = queue.Queue()
+        for _ in range(2):
+            self._free.put(self._new_buffer())
+        self._buffer = self._free.get()
+        self._fill = 0
+        self._pending = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name="trade-journal", daemon=True)
+        self._writer.start()
+
+    def _new_buffer(self):
+        return {name: np.empty(self.capacity, dtype=dtype) for name, dtype in JOURNAL_COLUMNS.items()}
+
+    def _select(self, actions):
+        # Boolean mask of the rows to keep among len(actions) new rows.
+        n = len(actions)
+        if self.verbosity <= OFF:
+            mask = np.zeros(n, dtype=bool)
+        elif self.verbosity == TRADES:
+            mask = np.asarray(actions) != 0
+        else:
+            mask = np.ones(n, dtype=bool)
+        if self.sample_every > 1:
+            # Continue the sampling phase across calls.
+            order = np.cumsum(mask) + self.rows_selected
+            self.rows_selected += int(mask.sum())
+            mask &= (order - 1) % self.sample_every == 0
+        else:
+            self.rows_selected += int(mask.sum())
+        self.rows_seen += n
+        return mask
+
+    def record(self, step, action, ret, raw_pnl, actual_pnl, balance, position_size_pct):
+        """
+        Record one step.
+        """
+        if self.verbosity <= OFF or (self.verbosity == TRADES and action == 0):
+            self.rows_seen += 1
+            return
+        self.rows_seen += 1
+        self.rows_selected += 1
+        if (self.rows_selected - 1) % self.sample_every:
+            return
+        i = self._fill
+        buffer = self._buffer
+        buffer["step"][i] = step
+        buffer["action"][i] = action
+        buffer["return"][i] = ret
+        buffer["raw_pnl"][i] = raw_pnl
+        buffer["actual_pnl"][i] = actual_pnl
+        buffer["balance"][i] = balance
+        buffer["position_size_pct"][i] = position_size_pct
+        self._fill = i + 1
+        if self._fill == self.capacity:
+            self._hand_off()
+
+    def record_batch(self, steps, actions, returns, raw_pnl, actual_pnl, balances, position_size_pct):
+        """
+        Record many steps at once (array arguments of equal length).
+        """
+        mask = self._select(actions)
+        if not mask.any():
+            return
+        columns = dict(zip(JOURNAL_COLUMNS, (steps, actions, returns, raw_pnl, actual_pnl, balances,
+                                             position_size_pct)))
+        columns = {name: np.asarray(values)[mask] for name, values in columns.items()}
+        n, offset = int(mask.sum()), 0
+        while offset < n:
+            take = min(self.capacity - self._fill, n - offset)
+            for name, values in columns.items():
+                self._buffer[name][self._fill:self._fill + take] = values[offset:offset + take]
+            self._fill += take
+            offset += take
+            if self._fill == self.capacity:
+                self._hand_off()
+
+    def _hand_off(self):
+        if self._error is not None:
+            raise self._error
+        self._pending.put((self._buffer, self._fill))
+        self._buffer = self._free.get()
+        self._fill = 0
+
+    def _write_loop(self):
+        while True:
+            item = self._pending.get()
+            if item is None:
+                self._pending.task_done()
+                break
+            buffer, rows = item
+            try:
+                # In memory the chunk must outlive the buffer, which is reused.
+                self._write_chunk({name: values[:rows].copy() if self.path is None else values[:rows]
+                                   for name, values in buffer.items()})
+            except Exception as e:
+                self._error = e
+            self._free.put(buffer)
+            self._pending.task_done()
+
+    def _write_chunk(self, columns):
+        if self.path is None:
+            self._chunks.append(columns)
+        elif self.file_format == "npz":
+            np.savez(os.path.join(self.path, f"chunk_{self._chunk_index:06d}.npz"), **columns)
+        else:
+            pd.DataFrame(columns).to_parquet(os.path.join(self.path, f"chunk_{self._chunk_index:06d}.parquet"))
+        self._chunk_index += 1
+        self.rows_written += len(columns["step"])
+
+    def flush(self):
+        """
+        Hand off the partially filled buffer and wait until everything is written.
+        """
+        if self._fill:
+            self._hand_off()
+        self._pending.join()
+        if self._error is not None:
+            raise self._error
+
+    def close(self):
+        """
+        Flush and stop the writer thread.
+        """
+        if self._fill:
+            self._hand_off()
+        self._pending.put(None)
+        self._writer.join()
+        if self._error is not None:
+            raise self._error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def to_frame(self):
+        """
+        All rows written so far (call flush() or close() first) as a DataFrame.
+        """
+        if self.path is None:
+            if not self._chunks:
+                return pd.DataFrame({name: np.empty(0, dtype=dtype) for name, dtype in JOURNAL_COLUMNS.items()})
+            return pd.DataFrame({name: np.concatenate([c[name] for c in self._chunks]) for name in JOURNAL_COLUMNS})
+        return read_journal(self.path)
+
+def read_journal(path):
+    """
+    Load every chunk of a journal directory into one DataFrame, in write order.
+    """
+    frames = []
+    for chunk in sorted(glob.glob(os.path.join(path, "chunk_*"))):
+        if chunk.endswith(".npz"):
+            with np.load(chunk) as data:
+                frames.append(pd.DataFrame({name: data[name] for name in JOURNAL_COLUMNS}))
+        else:
+            frames.append(pd.read_parquet(chunk))
+    if not frames:
+        return pd.DataFrame({name: np.empty(0, dtype=dtype) for name, dtype in JOURNAL_COLUMNS.items()})
+    return pd.concat(frames, ignore_index=True)
+
+def format_journal_rows(df, limit=None):
+    """
+    Render journal rows as the old per-step [DEBUG] lines (for interactive inspection).
+    """
+    rows = df if limit is None else df.tail(limit)
+    return [f"[DEBUG] Step={step}, action={action}, return={ret:.4f}, raw_pnl={raw_pnl:.2f}, "
+            f"actual_pnl={actual_pnl:.2f}, balance={balance:.2f}"
+            for step, action, ret, raw_pnl, actual_pnl, balance in
+            zip(*(rows[c].tolist() for c in ("step", "action", "return", "raw_pnl", "actual_pnl", "balance")))]
+
+if __name__ == "__main__":
+    # Example usage: journal a million-step backtest, keeping every 10th trade.
+    import tempfile
+    import time
+    from risk.risk_management import get_risk_profile, run_risk_managed_backtest
+
+    rng = np.random.default_rng(0)
+    n = 1_000_000
+    actions = rng.integers(-1, 2, n)
+    returns = rng.normal(0, 0.01, n)
+    path = tempfile.mkdtemp()
+    start = time.perf_counter()
+    with TradeJournal(path, verbosity=TRADES, sample_every=10) as journal:
+        balance, _ = run_risk_managed_backtest(actions, returns, 10000, 1000, get_risk_profile("medium"),
+                                               journal=journal)
+    print(f"{n} steps in {time.perf_counter() - start:.2f}s, {journal.rows_written} rows journaled")
+    df = read_journal(path)
+    print(df.tail())
+    print("\n".join(format_journal_rows(df, limit=3)))
@@ -0,0 +1,208 @@
+# walk_forward.py
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from risk.risk_management import get_risk_profile, run_risk_managed_backtest, compute_sharpe_ratio, compute_max_drawdown
+
+RL_FEATURES = ["close", "SMA_10", "RSI_14"]
+
+# Set in each worker process by _init_worker.
+_WORKER_DATA = {}
+
+def walk_forward_folds(n_rows, train_size, test_size, step=None, expanding=False):
+    """
+    Rolling train/test splits over n_rows bars.
+
+    Fold k trains on [train_start, train_end) and tests on the following test_size bars;
+    successive folds move forward by `step` (default test_size, so test windows tile the
+    history without overlap). With expanding=True every fold trains from row 0.
+
+    Returns:
+        list: (train_start, train_end, test_start, test_end) tuples.
+    """
+    step = test_size if step is None else step
+    folds = []
+    train_end = train_size
+    while train_end + test_size <= n_rows:
+        train_start = 0 if expanding else train_end - train_size
+        folds.append((train_start, train_end, train_end, train_end + test_size))
+        train_end += step
+    return folds
+
+def _init_worker(df_data, settings, torch_threads, transformer_config, transformer_state):
+    import torch
+    from models.transformer_model import TransformerMetaModelWithProfit, set_transformer_model
+    torch.set_num_threads(torch_threads)
+    # Score every fold with the parent's transformer, not a fresh random one per worker.
+    transformer = TransformerMetaModelWithProfit(**transformer_config)
+    transformer.load_state_dict(transformer_state)
+    set_transformer_model(transformer.eval())
+    _WORKER_DATA.update(df=df_data, settings=settings)
+
+def _run_fold(fold_id, fold):
+    import torch
+    from models.rl_model import load_or_train_rl_model, train_rl_model
+    from strategies.ensemble import compute_ensemble_components, combine_ensemble_actions
+
+    df, settings = _WORKER_DATA["df"], _WORKER_DATA["settings"]
+    train_start, train_end, test_start, test_end = fold
+    fold_seed = settings["seed"] + fold_id
+    torch.manual_seed(fold_seed)
+    timings = {}
+
+    start = time.perf_counter()
+    train = df.iloc[train_start:train_end]
+    X_train, returns_train = train[RL_FEATURES].values, train["return"].values
+    if settings["cache_dir"] is not None:
+        rl_model = load_or_train_rl_model(X_train, returns_train, initial_balance=settings["initial_balance"],
+                                          total_timesteps=settings["total_timesteps"], n_envs=settings["n_envs"],
+                                          cache_dir=settings["cache_dir"], feature_names=RL_FEATURES)
+    else:
+        # Without a content-addressed cache an existing fold file may belong to other data,
+        # so always train; the model is saved only for inspection.
+        rl_model = train_rl_model(X_train, returns_train, settings["initial_balance"], settings["total_timesteps"],
+                                  n_envs=settings["n_envs"], verbose=0, seed=fold_seed)
+        rl_model.save(os.path.join(settings["model_dir"], f"fold_{fold_id:03d}.zip"))
+    timings["train_seconds"] = time.perf_counter() - start
+
+    # Include lookback - 1 bars before the test window so the first transformer windows are complete.
+    start = time.perf_counter()
+    context_start = max(0, test_start - settings["lookback"] + 1)
+    components = compute_ensemble_components(df.iloc[context_start:test_end], rl_model, settings["lookback"],
+                                             rng=np.random.default_rng(fold_seed))
+    components = {k: v[test_start - context_start:] for k, v in components.items()}
+    actions = combine_ensemble_actions(components["rl"], components["strategy"], components["transformer"],
+                                       *settings["weights"], threshold=settings["threshold"])
+    timings["inference_seconds"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    returns = df["return"].to_numpy(dtype=np.float64)[test_start:test_end]
+    final_balance, balance_history = run_risk_managed_backtest(actions, returns, settings["initial_balance"],
+                                                               settings["scaling"], dict(settings["risk_params"]))
+    timings["backtest_seconds"] = time.perf_counter() - start
+    row = {
+        "fold": fold_id,
+        "train_start": df.index[train_start],
+        "train_end": df.index[train_end - 1],
+        "test_start": df.index[test_start],
+        "test_end": df.index[test_end - 1],
+        "final_balance": final_balance,
+        "profit": final_balance - settings["initial_balance"],
+        "sharpe": compute_sharpe_ratio(balance_history),
+        "max_drawdown": compute_max_drawdown(balance_history),
+        "trades": int(np.count_nonzero(actions)),
+        "pid": os.getpid(),
+        **timings,
+    }
+    return row, test_start, actions
+
+def run_walk_forward(df_data, train_size, test_size, step=None, expanding=False, initial_balance=10000, scaling=1000,
+                     risk_params="medium", rl_weight=0.33, strategy_weight=0.33, transformer_weight=0.34,
+                     threshold=0.2, lookback=20, total_timesteps=50000, n_envs=None, cache_dir=None,
+                     model_dir="models/walk_forward", max_workers=None, torch_threads=1, seed=0):
+    """
+    Walk-forward evaluation of the risk-managed ensemble on out-of-sample windows.
+
+    For every fold the DQN is trained on the training window only (with cache_dir it is
+    loaded or fine-tuned from the content-addressed model cache instead), the ensemble
+    actions are computed for the test window that follows, and the fold is backtested on
+    its own from initial_balance. Folds run in parallel on a process pool.
+
+    The stitched equity curve replays all out-of-sample actions in time order through
+    run_risk_managed_backtest, carrying balance and position sizing from one test window
+    into the next.
+
+    Parameters:
+        df_data (DataFrame): Columns 'close', 'SMA_10', 'RSI_14' and 'return'.
+        train_size, test_size (int): Bars per training / test window.
+        step (int, optional): Bars between fold starts (default test_size).
+        expanding (bool): Train every fold from the first bar.
+        risk_params (str or dict): Risk profile name or parameters.
+        total_timesteps (int): DQN training timesteps per fold.
+        n_envs (int, optional): Use the vectorized training environment.
+        cache_dir (str, optional): Model cache shared by folds (see models/model_cache.py);
+                                   enables reuse and warm starts across runs.
+        model_dir (str): Where freshly trained per-fold models (fold_000.zip, ...) are
+                         saved when cache_dir is not used; they are never loaded back.
+        max_workers (int, optional): Worker processes (default: CPU count).
+        torch_threads (int): torch threads per worker.
+        seed (int): Seed for torch, DQN training and the placeholder random strategies
+                    (offset per fold). Folds are scored with the shared transformer
+                    (get_transformer_model / set_transformer_model) of this process.
+
+    Returns:
+        dict: "folds" (DataFrame of per-fold metrics and timings), "equity" (stitched
+              balance Series, one value after each out-of-sample bar),
+              "actions" (out-of-sample actions Series) and "summary" (dict).
+    """
+    started = time.perf_counter()
+    folds = walk_forward_folds(len(df_data), train_size, test_size, step, expanding)
+    if not folds:
+        raise ValueError("History too short for a single train/test fold.")
+    if isinstance(risk_params, str):
+        risk_params = get_risk_profile(risk_params)
+    settings = {
+        "initial_balance": initial_balance, "scaling": scaling, "risk_params": dict(risk_params),
+        "weights": (rl_weight, strategy_weight, transformer_weight), "threshold": threshold, "lookback": lookback,
+        "total_timesteps": total_timesteps, "n_envs": n_envs, "cache_dir": cache_dir, "model_dir": model_dir,
+        "seed": seed,
+    }
+    os.makedirs(model_dir, exist_ok=True)
+    from models.transformer_model import get_transformer_model
+    transformer = get_transformer_model()
+    transformer_state = {k: v.detach().cpu() for k, v in transformer.state_dict().items()}
+
+    rows, fold_actions = [], {}
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count() or 1, mp_context=context,
+                             initializer=_init_worker, initargs=(df_data, settings, torch_threads, transformer.config,
+                                       transformer_state)) as executor:
+        futures = [executor.submit(_run_fold, i, fold) for i, fold in enumerate(folds)]
+        for future in as_completed(futures):
+            row, test_start, actions = future.result()
+            print(f"Fold {row['fold']}: profit={row['profit']:.2f}, train {row['train_seconds']:.1f}s")
+            rows.append(row)
+            fold_actions[test_start] = actions
+
+    # Stitch: later folds win where test windows overlap (step < test_size).
+    all_actions = np.zeros(len(df_data), dtype=np.int8)
+    covered = np.zeros(len(df_data), dtype=bool)
+    for test_start in sorted(fold_actions):
+        actions = fold_actions[test_start]
+        all_actions[test_start:test_start + len(actions)] = actions
+        covered[test_start:test_start + len(actions)] = True
+    positions = np.flatnonzero(covered)
+    stitched = all_actions[positions]
+    returns = df_data["return"].to_numpy(dtype=np.float64)[positions]
+    final_balance, balance_history = run_risk_managed_backtest(stitched, returns, initial_balance, scaling,
+                                                               dict(risk_params))
+    index = df_data.index[positions]
+    equity = pd.Series(balance_history[1:], index=index, name="balance")
+
+    folds_df = pd.DataFrame(rows).sort_values("fold").reset_index(drop=True)
+    summary = {
+        "folds": len(folds),
+        "out_of_sample_bars": len(stitched),
+        "final_balance": final_balance,
+        "profit": final_balance - initial_balance,
+        "sharpe": compute_sharpe_ratio(balance_history),
+        "max_drawdown": compute_max_drawdown(balance_history),
+        "wall_seconds": time.perf_counter() - started,
+        "fold_seconds": float(folds_df[["train_seconds", "inference_seconds", "backtest_seconds"]].to_numpy().sum()),
+    }
+    return {"folds": folds_df, "equity": equity, "actions": pd.Series(stitched, index=index, name="action"),
+            "summary": summary}
+
+if __name__ == "__main__":
+    # Example usage: walk forward over simulated data with 2,000-bar training windows.
+    from data.data_pipeline import simulate_data, preprocess_data, compute_indicators
+
+    df = compute_indicators(preprocess_data(simulate_data(periods=6000)), columns=["SMA_10", "RSI_14"]).dropna()
+    result = run_walk_forward(df, train_size=2000, test_size=1000, total_timesteps=5000, n_envs=8)
+    print(result["folds"])
+    print(result["summary"])
@@ -4,7 +4,6 @@ import json
 import datetime
 import requests
 import pandas as pd
-from transformers import pipeline
 
 def collect_perplexity_sentiment(ticker, api_key=None):
     """
@@ -89,6 +88,19 @@ def collect_perplexity_sentiment(ticker, api_key=None):
         print("No results from Perplexity API")
         return pd.DataFrame()
 
+_finbert = None
+
+def get_finbert_pipeline():
+    """
+    Return the FinBERT sentiment pipeline, importing transformers and loading the model on
+    first use only (both are slow and most runs never analyse sentiment).
+    """
+    global _finbert
+    if _finbert is None:
+        from transformers import pipeline
+        _finbert = pipeline("sentiment-analysis", model="ProsusAI/finbert", tokenizer="ProsusAI/finbert")
+    return _finbert
+
 def analyze_perplexity_sentiment(perplexity_df, ticker):
     """
     Analyze sentiment from Perplexity API responses using FinBERT.
@@ -105,7 +117,7 @@ def analyze_perplexity_sentiment(perplexity_df, ticker):
         return pd.DataFrame()
     
     print(f"Analyzing Perplexity sentiment data for {ticker}")
-    finbert = pipeline("sentiment-analysis", model="ProsusAI/finbert", tokenizer="ProsusAI/finbert")
+    finbert = get_finbert_pipeline()
     
     def analyze_chunk(text):
         if pd.isna(text) or text == "":
@@ -1,9 +1,8 @@
 # strategies/ensemble.py
 import numpy as np
 import pandas as pd
-# Import helper functions from the models folder (make sure your PYTHONPATH is set correctly)
-from models.rl_model import get_rl_prediction
-from models.transformer_model import get_transformer_decision
+# The RL and transformer helpers (models/) are imported inside ensemble_final_decision so
+# that importing this module does not pull in torch, gym or stable_baselines3.
 
 # ------------------------------
 # Trading Strategy Functions
@@ -102,6 +101,84 @@ strategy_names = [
     "Advanced Momentum & Volatility",
 ]
 
+# ------------------------------
+# Vectorized Strategy Functions
+# ------------------------------
+# Array forms of the strategies above: each takes a (T, n_features) state matrix and
+# returns a length-T int8 signal vector. The scalar functions remain the reference.
+def _band_signal(values, low, high, below, above):
+    """
+    `below` where values < low, `above` where values > high, else 0.
+    """
+    out = np.zeros(len(values), dtype=np.int8)
+    out[values < low] = below
+    out[values > high] = above
+    return out
+
+def momentum_crossover_strategy_vec(states, rng):
+    return _band_signal(states[:, 1], -0.01, 0.01, -1, 1)
+
+def moving_average_crossover_strategy_vec(states, rng):
+    return _band_signal(states[:, 0], 120, 150, 1, -1)
+
+def bollinger_bands_breakout_strategy_vec(states, rng):
+    return _band_signal(states[:, 0], 110, 160, 1, -1)
+
+def mean_reversion_strategy_vec(states, rng):
+    z_score = (states[:, 0] - 130) / 10
+    return _band_signal(z_score, -1, 1, 1, -1)
+
+def vwap_strategy_vec(states, rng):
+    return _band_signal(states[:, 0], 120, 140, 1, -1)
+
+def adx_trend_confirmation_strategy_vec(states, rng):
+    return _band_signal(states[:, 1], -0.02, 0.02, -1, 1)
+
+def ichimoku_cloud_strategy_vec(states, rng):
+    return rng.choice(np.array([-1, 0, 1], dtype=np.int8), size=len(states))
+
+def stochastic_oscillator_strategy_vec(states, rng):
+    return _band_signal(states[:, 1], -0.015, 0.015, -1, 1)
+
+def candlestick_pattern_strategy_vec(states, rng):
+    return rng.choice(np.array([-1, 0, 1], dtype=np.int8), size=len(states))
+
+def ensemble_ml_strategy_vec(states, rng):
+    return _band_signal(states[:, 1], -0.01, 0.01, -1, 1)
+
+def pivot_points_strategy_vec(states, rng):
+    pivot = 130
+    return _band_signal(states[:, 0], pivot - 10, pivot + 10, 1, -1)
+
+def volume_spike_divergence_strategy_vec(states, rng):
+    return _band_signal(states[:, 1], -0.02, 0.02, -1, 1)
+
+def multi_timeframe_confirmation_strategy_vec(states, rng):
+    decision1 = np.where(states[:, 0] > 130, 1, -1).astype(np.int8)
+    decision2 = np.where(states[:, 1] > 0.005, 1, -1).astype(np.int8)
+    return np.where(decision1 == decision2, decision1, 0).astype(np.int8)
+
+def advanced_momentum_volatility_strategy_vec(states, rng):
+    return _band_signal(states[:, 1], -0.02, 0.02, -1, 1)
+
+# Same order as strategy_functions / strategy_names.
+vectorized_strategy_functions = [
+    momentum_crossover_strategy_vec,
+    moving_average_crossover_strategy_vec,
+    bollinger_bands_breakout_strategy_vec,
+    mean_reversion_strategy_vec,
+    vwap_strategy_vec,
+    adx_trend_confirmation_strategy_vec,
+    ichimoku_cloud_strategy_vec,
+    stochastic_oscillator_strategy_vec,
+    candlestick_pattern_strategy_vec,
+    ensemble_ml_strategy_vec,
+    pivot_points_strategy_vec,
+    volume_spike_divergence_strategy_vec,
+    multi_timeframe_confirmation_strategy_vec,
+    advanced_momentum_volatility_strategy_vec,
+]
+
 # ------------------------------
 # Ensemble Helper Functions
 # ------------------------------
@@ -129,6 +206,104 @@ def aggregate_strategy_signals(state):
     total = sum(signal for signal, conf in signals_dict.values())
     return 1 if total > 0 else (-1 if total < 0 else 0)
 
+def compute_strategy_signal_matrix(states, rng=None):
+    """
+    Batch version of compute_all_strategy_signals over a whole feature matrix.
+
+    Parameters:
+        states (np.array): State matrix of shape (T, n_features), one row per bar.
+        rng: Random source for the placeholder random strategies (np.random.Generator
+             or the np.random module; defaults to np.random like the scalar versions).
+
+    Returns:
+        np.array: int8 signal matrix of shape (T, 14), columns ordered as strategy_names.
+    """
+    states = np.asarray(states, dtype=np.float64)
+    if states.ndim == 1:
+        states = states.reshape(1, -1)
+    rng = np.random if rng is None else rng
+    signals = np.empty((len(states), len(vectorized_strategy_functions)), dtype=np.int8)
+    for j, func in enumerate(vectorized_strategy_functions):
+        signals[:, j] = func(states, rng)
+    return signals
+
+def aggregate_strategy_signal_matrix(signal_matrix):
+    """
+    Batch version of aggregate_strategy_signals: sign of the per-row vote sum.
+
+    Returns:
+        np.array: int8 vector of aggregated decisions (-1, 0, or 1), one per row.
+    """
+    return np.sign(signal_matrix.sum(axis=1, dtype=np.int16)).astype(np.int8)
+
+def compute_strategy_votes(states, rng=None):
+    """
+    Compute the (T, 14) strategy signal matrix and the aggregated vote vector in one call.
+
+    Returns:
+        tuple: (signal_matrix, aggregated_votes)
+    """
+    signal_matrix = compute_strategy_signal_matrix(states, rng=rng)
+    return signal_matrix, aggregate_strategy_signal_matrix(signal_matrix)
+
+def combine_ensemble_actions(rl_actions, strategy_actions, transformer_actions, rl_weight=0.33, strategy_weight=0.33,
+                             transformer_weight=0.34, threshold=0.2):
+    """
+    Batch version of the weighted vote in ensemble_final_decision.
+
+    Parameters:
+        rl_actions, strategy_actions, transformer_actions (np.array): Component decisions (-1, 0, or 1).
+        rl_weight, strategy_weight, transformer_weight (float): Component weights.
+        threshold (float): Combined value needed for a Buy (> threshold) or Sell (< -threshold).
+
+    Returns:
+        np.array: int8 vector of final decisions (-1, 0, or 1).
+    """
+    combined_value = (rl_weight * np.asarray(rl_actions, dtype=np.float64) +
+                      strategy_weight * np.asarray(strategy_actions, dtype=np.float64) +
+                      transformer_weight * np.asarray(transformer_actions, dtype=np.float64))
+    return (np.greater(combined_value, threshold).astype(np.int8) -
+            np.less(combined_value, -threshold).astype(np.int8))
+
+def compute_ensemble_components(df, rl_model, lookback=20, rng=None, sentiment_score=0.0):
+    """
+    Batch version of the three component decisions of ensemble_final_decision for every
+    row of df (state = close, SMA_10, RSI_14 as in the simulation loop).
+
+    Uses get_rl_predictions, the vectorized strategy signal matrix and
+    get_transformer_decisions (eval mode) instead of one model call per row.
+
+    Returns:
+        dict: int8 arrays "rl", "strategy" and "transformer", one value per row.
+    """
+    from models.rl_model import get_rl_predictions
+    from models.transformer_model import get_transformer_decisions
+    states = df[['close', 'SMA_10', 'RSI_14']].to_numpy(dtype=np.float64)
+    _, strategy_actions = compute_strategy_votes(states, rng=rng)
+    transformer_actions, _ = get_transformer_decisions(df, lookback, sentiment_score)
+    return {
+        "rl": get_rl_predictions(rl_model, states),
+        "strategy": strategy_actions,
+        "transformer": transformer_actions,
+    }
+
+def precompute_ensemble_actions(df, rl_model, rl_weight=0.33, strategy_weight=0.33, transformer_weight=0.34, lookback=20,
+                                threshold=0.2, rng=None, components=None):
+    """
+    Final ensemble decision for every row of df in one batch.
+
+    Parameters:
+        components (dict, optional): Output of compute_ensemble_components to reuse
+                                     (e.g. when trying several weightings).
+
+    Returns:
+        np.array: int8 vector of decisions (-1, 0, or 1), one per row.
+    """
+    if components is None:
+        components = compute_ensemble_components(df, rl_model, lookback, rng=rng)
+    return combine_ensemble_actions(components["rl"], components["strategy"], components["transformer"],
+                                    rl_weight, strategy_weight, transformer_weight, threshold=threshold)
+
 def ensemble_final_decision(state, df, current_index, rl_model, rl_weight=0.33, strategy_weight=0.33, transformer_weight=0.34, lookback=20):
     """
     Compute the final ensemble trading decision by combining decisions from:
@@ -149,6 +324,8 @@ def ensemble_final_decision(state, df, current_index, rl_model, rl_weight=0.33,
     Returns:
         int: Final decision (-1, 0, or 1).
     """
+    from models.rl_model import get_rl_prediction
+    from models.transformer_model import get_transformer_decision
     rl_action = get_rl_prediction(rl_model, state)
     strategy_action = aggregate_strategy_signals(state)
     transformer_action = get_transformer_decision(df, current_index, lookback)
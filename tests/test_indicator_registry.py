@@ -0,0 +1,19 @@
+# test_indicator_registry.py
+import pytest
+
+from data.data_pipeline import simulate_data, preprocess_data
+from data.indicator_registry import compute_selected_indicators, resolve_indicator_graph
+
+@pytest.mark.parametrize("name", ["MeanStd_20", "TR14", "DX", "EMA_12"])
+def test_internal_node_names_are_rejected(name):
+    df = preprocess_data(simulate_data(periods=100))
+    with pytest.raises(ValueError, match="Unknown indicator"):
+        compute_selected_indicators(df, columns=[name])
+    with pytest.raises(ValueError, match="Unknown indicator"):
+        resolve_indicator_graph([name])
+
+def test_public_columns_only_add_requested_columns():
+    df = preprocess_data(simulate_data(periods=100))
+    before = set(df.columns)
+    out = compute_selected_indicators(df, columns=["ADX_14", "Rolling_STD_20"])
+    assert set(out.columns) - before == {"ADX_14", "Rolling_STD_20"}
@@ -0,0 +1,100 @@
+# startup.py
+import sys
+import time
+
+# Modules that dominate import time; they are only imported by the code paths that need them.
+HEAVY_MODULES = ("torch", "stable_baselines3", "gym", "transformers", "matplotlib")
+
+_STARTED = time.perf_counter()
+_STAGE_TIMES = {}
+
+def record_stage(name, seconds):
+    """
+    Record how long a startup stage took (accumulated if the stage is recorded twice).
+    """
+    _STAGE_TIMES[name] = _STAGE_TIMES.get(name, 0.0) + seconds
+
+def _timed(name, func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    record_stage(name, time.perf_counter() - start)
+    return result
+
+def warm_up(transformer=True, rl_model_path=None, sentiment=False, lookback=20):
+    """
+    Import heavy dependencies and build models ahead of the first trading decision.
+
+    Nothing heavy is loaded when the packages are imported; this moves that cost to a
+    point of the caller's choosing (e.g. before the market opens) instead of the first
+    bar. Each stage is timed and shows up in startup_report().
+
+    Parameters:
+        transformer (bool): Import torch, build the transformer meta-model and run one
+                            forward pass so kernels and allocator pools are initialised.
+        rl_model_path (str, optional): Load this saved DQN model.
+        sentiment (bool): Load the FinBERT sentiment pipeline.
+        lookback (int): Window length for the transformer warm-up pass.
+
+    Returns:
+        dict: The loaded objects ("transformer_model", "rl_model", "finbert"), where requested.
+    """
+    loaded = {}
+    if transformer:
+        def forward_pass(model):
+            import torch
+            was_training = model.training
+            model.eval()
+            try:
+                with torch.inference_mode():
+                    model(torch.zeros(1, lookback, model.embedding.in_features))
+            finally:
+                model.train(was_training)
+
+        _timed("import torch", __import__, "torch")
+        from models.transformer_model import get_transformer_model
+        model = _timed("build transformer model", get_transformer_model)
+        _timed("transformer warm-up pass", forward_pass, model)
+        loaded["transformer_model"] = model
+    if rl_model_path is not None:
+        _timed("import stable_baselines3", __import__, "stable_baselines3")
+        from stable_baselines3 import DQN
+        loaded["rl_model"] = _timed("load RL model", DQN.load, rl_model_path)
+    if sentiment:
+        from sentiment.sentiment_analysis import get_finbert_pipeline
+        loaded["finbert"] = _timed("load FinBERT pipeline", get_finbert_pipeline)
+    return loaded
+
+def startup_report(verbose=True):
+    """
+    Summarise startup cost so far: time since this module was imported, the recorded
+    stage timings, and which heavy dependencies have actually been imported.
+
+    Parameters:
+        verbose (bool): Print the report.
+
+    Returns:
+        dict: elapsed_s, stages (name -> seconds), heavy_modules_loaded, modules_loaded.
+    """
+    report = {
+        "elapsed_s": time.perf_counter() - _STARTED,
+        "stages": dict(_STAGE_TIMES),
+        "heavy_modules_loaded": [m for m in HEAVY_MODULES if m in sys.modules],
+        "modules_loaded": len(sys.modules),
+    }
+    if verbose:
+        print(f"Startup: {report['elapsed_s']:.2f}s elapsed, {report['modules_loaded']} modules loaded")
+        for name, seconds in report["stages"].items():
+            print(f"  {name}: {seconds:.3f}s")
+        print(f"  Heavy modules loaded: {', '.join(report['heavy_modules_loaded']) or 'none'}")
+    return report
+
+if __name__ == "__main__":
+    # Example usage: show the cost of importing the pipeline modules, then of warming up.
+    start = time.perf_counter()
+    import strategies.ensemble
+    import risk.risk_management
+    import data.realtime_data_pipeline
+    record_stage("import pipeline modules", time.perf_counter() - start)
+    startup_report()
+    warm_up()
+    startup_report()